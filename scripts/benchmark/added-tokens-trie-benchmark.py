@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+
+# Added tokens splitting benchmark
+#
+# Measures the `Trie` used by Python ("slow") tokenizers to split texts on their added tokens, for vocabularies of
+# added tokens of increasing size. The added tokens are random lowercase words, which share a lot of prefixes with the
+# words of the texts, and the texts mix regular words with a fraction of added tokens:
+#
+#     python ./scripts/benchmark/added-tokens-trie-benchmark.py --num-added-tokens 10000 100000
+#
+# It prints a markdown table with the time needed to build the trie (adding the tokens and the first split, which
+# builds the matching automaton) and the number of characters split per second. With `--tokenizer`, the table also
+# reports the number of texts per second of `tokenizer.tokenize` after `tokenizer.add_tokens`.
+
+import argparse
+import random
+import string
+import time
+
+from transformers import AutoTokenizer
+from transformers.tokenization_utils import Trie
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--num-added-tokens", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--num-texts", type=int, default=1000)
+    parser.add_argument("--words-per-text", type=int, default=100)
+    parser.add_argument(
+        "--added-tokens-ratio",
+        type=float,
+        default=0.1,
+        help="fraction of the words of the texts that are added tokens",
+    )
+    parser.add_argument("--alphabet-size", type=int, default=10, help="number of letters used to build the words")
+    parser.add_argument("--tokenizer", type=str, default=None, help="also time `tokenize` with this slow tokenizer")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def random_word(rng, args, min_length=3, max_length=12):
+    return "".join(
+        rng.choice(string.ascii_lowercase[: args.alphabet_size]) for _ in range(rng.randint(min_length, max_length))
+    )
+
+
+def get_data(num_added_tokens, args):
+    rng = random.Random(args.seed)
+    added_tokens = list({random_word(rng, args) for _ in range(num_added_tokens)})
+    texts = []
+    for _ in range(args.num_texts):
+        words = [
+            rng.choice(added_tokens) if rng.random() < args.added_tokens_ratio else random_word(rng, args)
+            for _ in range(args.words_per_text)
+        ]
+        texts.append(" ".join(words))
+    return added_tokens, texts
+
+
+def main():
+    args = get_args()
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer, use_fast=False) if args.tokenizer else None
+
+    header = "| added tokens | build (s) | split (chars / s) |"
+    separator = "|-------------:|----------:|------------------:|"
+    if tokenizer is not None:
+        header += " tokenize (texts / s) |"
+        separator += "---------------------:|"
+    print(header)
+    print(separator)
+
+    for num_added_tokens in args.num_added_tokens:
+        added_tokens, texts = get_data(num_added_tokens, args)
+
+        start = time.perf_counter()
+        trie = Trie()
+        for token in added_tokens:
+            trie.add(token)
+        trie.split(texts[0])
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for text in texts:
+            trie.split(text)
+        split = sum(len(text) for text in texts) / (time.perf_counter() - start)
+
+        row = f"| {len(added_tokens):>12} | {build:>9.2f} | {split:>17.0f} |"
+        if tokenizer is not None:
+            tokenizer_copy = AutoTokenizer.from_pretrained(args.tokenizer, use_fast=False)
+            tokenizer_copy.add_tokens(added_tokens)
+            tokenizer_copy.tokenize(texts[0])
+            start = time.perf_counter()
+            for text in texts:
+                tokenizer_copy.tokenize(text)
+            row += f" {len(texts) / (time.perf_counter() - start):>20.0f} |"
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
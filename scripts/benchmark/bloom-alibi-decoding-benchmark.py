@@ -0,0 +1,83 @@
+#!/usr/bin/env python
+
+# Per-token decoding latency benchmark for ALiBi models (BLOOM)
+#
+# Measures how the latency of a single incremental decoding step grows with the context length, i.e. the cost of
+# building the ALiBi bias and the attention mask on top of the attention itself. A randomly initialized model is used
+# so no checkpoint download is needed:
+#
+#     python ./scripts/benchmark/bloom-alibi-decoding-benchmark.py --context-lengths 512 2048 8192 --padding 0.1
+#
+# and here is a possible output:
+#
+# | context length | ms / token |
+# |---------------:|-----------:|
+# |            512 |      2.113 |
+# |           2048 |      3.540 |
+# |           8192 |      9.871 |
+
+import argparse
+import time
+
+import torch
+
+from transformers import BloomConfig, BloomForCausalLM
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--context-lengths", type=int, nargs="+", default=[128, 512, 2048, 4096])
+    parser.add_argument("--batch-size", type=int, default=1)
+    parser.add_argument("--new-tokens", type=int, default=32, help="number of decoding steps to time")
+    parser.add_argument("--padding", type=float, default=0.0, help="fraction of left padding in the prompt")
+    parser.add_argument("--hidden-size", type=int, default=256)
+    parser.add_argument("--n-head", type=int, default=8)
+    parser.add_argument("--n-layer", type=int, default=4)
+    parser.add_argument("--device", type=str, default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--dtype", type=str, default="float32", choices=["float32", "float16", "bfloat16"])
+    return parser.parse_args()
+
+
+def synchronize(device):
+    if device.startswith("cuda"):
+        torch.cuda.synchronize()
+
+
+@torch.no_grad()
+def time_decoding(model, context_length, args):
+    input_ids = torch.randint(0, model.config.vocab_size, (args.batch_size, context_length), device=args.device)
+    attention_mask = torch.ones_like(input_ids)
+    attention_mask[:, : int(context_length * args.padding)] = 0
+
+    outputs = model(input_ids, attention_mask=attention_mask, use_cache=True)
+    past_key_values = outputs.past_key_values
+    next_tokens = outputs.logits[:, -1:].argmax(-1)
+
+    synchronize(args.device)
+    start = time.perf_counter()
+    for _ in range(args.new_tokens):
+        attention_mask = torch.cat([attention_mask, attention_mask.new_ones((args.batch_size, 1))], dim=-1)
+        outputs = model(next_tokens, attention_mask=attention_mask, past_key_values=past_key_values, use_cache=True)
+        past_key_values = outputs.past_key_values
+        next_tokens = outputs.logits[:, -1:].argmax(-1)
+    synchronize(args.device)
+    return (time.perf_counter() - start) / args.new_tokens
+
+
+def main():
+    args = get_args()
+    config = BloomConfig(hidden_size=args.hidden_size, n_head=args.n_head, n_layer=args.n_layer)
+    model = BloomForCausalLM(config).to(device=args.device, dtype=getattr(torch, args.dtype)).eval()
+
+    # warmup
+    time_decoding(model, min(args.context_lengths), args)
+
+    print("| context length | ms / token |")
+    print("|---------------:|-----------:|")
+    for context_length in args.context_lengths:
+        latency = time_decoding(model, context_length, args)
+        print(f"| {context_length:>14} | {latency * 1000:>10.3f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+
+# Batch encoding throughput benchmark for fast tokenizers
+#
+# Compares `tokenizer(texts)` with the chunked encoding of `tokenizer(texts, num_threads=...)`, where the backend
+# tokenizer encodes the next chunks (without holding the GIL) while the first ones are converted to Python objects. The
+# texts are random sentences built from the vocabulary of the tokenizer, so only the tokenizer files need to be
+# available:
+#
+#     python ./scripts/benchmark/fast-tokenizer-threads-benchmark.py --tokenizer bert-base-uncased --num-threads 1 2 4 8 16 32
+#
+# It prints a markdown table with the number of texts encoded per second for each value of `--num-threads` (1 is the
+# default single call to the backend tokenizer), with lists or with `--return-tensors`. The backend tokenizer uses all
+# the cores in both cases, set `RAYON_NUM_THREADS` to limit them when measuring the scaling with the number of cores.
+
+import argparse
+import os
+import random
+import time
+
+from transformers import AutoTokenizer
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokenizer", type=str, default="bert-base-uncased")
+    parser.add_argument("--num-threads", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32])
+    parser.add_argument("--num-texts", type=int, default=100000)
+    parser.add_argument("--words-per-text", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=20000, help="number of texts per call of the tokenizer")
+    parser.add_argument("--return-tensors", type=str, default=None, help="also pad the batches to tensors")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def get_texts(tokenizer, args):
+    rng = random.Random(args.seed)
+    words = [token for token in tokenizer.get_vocab() if token.isalpha()]
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 2 * args.words_per_text)))
+        for _ in range(args.num_texts)
+    ]
+
+
+def time_encoding(tokenizer, texts, num_threads, args):
+    padding = args.return_tensors is not None
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        tokenizer(
+            texts[i : i + args.batch_size],
+            truncation=True,
+            padding=padding,
+            return_tensors=args.return_tensors,
+            num_threads=num_threads,
+        )
+    return time.perf_counter() - start
+
+
+def main():
+    args = get_args()
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer, use_fast=True)
+    texts = get_texts(tokenizer, args)
+
+    print(f"{os.cpu_count()} cores, RAYON_NUM_THREADS={os.environ.get('RAYON_NUM_THREADS', 'unset')}")
+    print()
+    print("| num_threads | texts / s |")
+    print("|------------:|----------:|")
+    for num_threads in args.num_threads:
+        # warmup, which also starts the thread pool
+        time_encoding(tokenizer, texts[: args.batch_size], num_threads, args)
+        duration = time_encoding(tokenizer, texts, num_threads, args)
+        print(f"| {num_threads:>11} | {len(texts) / duration:>9.0f} |")
+
+
+if __name__ == "__main__":
+    main()
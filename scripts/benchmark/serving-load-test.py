@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+
+# Load test of the request batching of `transformers-cli serve`
+#
+# Runs concurrent clients against the `PipelineRequestBatcher` used by the `/forward` endpoint of the serving command.
+# The clients are coroutines of a local event loop awaiting the futures of their requests like the endpoint does, so
+# neither FastAPI nor uvicorn are needed and the numbers don't include the HTTP overhead. Each client sends its next
+# request as soon as it got the response to the previous one, with random texts built from the vocabulary of the
+# tokenizer:
+#
+#     python ./scripts/benchmark/serving-load-test.py --model distilbert-base-uncased-finetuned-sst-2-english \
+#         --concurrency 1 8 32 --max-batch-size 1 8 32
+#
+# It prints a markdown table with the throughput and the 50th, 90th and 99th percentiles of the latency of the
+# requests for each combination of `--max-batch-size` (1 runs the requests one by one) and `--concurrency`.
+
+import argparse
+import asyncio
+import random
+import time
+
+import numpy as np
+
+from transformers import pipeline
+from transformers.commands.serving import PipelineRequestBatcher
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", type=str, default="distilbert-base-uncased-finetuned-sst-2-english")
+    parser.add_argument("--task", type=str, default="text-classification")
+    parser.add_argument("--device", type=int, default=-1)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32], help="number of clients")
+    parser.add_argument("--max-batch-size", type=int, nargs="+", default=[1, 8, 32])
+    parser.add_argument("--max-wait", type=float, default=0.01)
+    parser.add_argument("--max-batch-tokens", type=int, default=None)
+    parser.add_argument("--num-requests", type=int, default=500, help="number of requests per measure")
+    parser.add_argument("--words-per-text", type=int, default=30)
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def get_texts(tokenizer, args):
+    rng = random.Random(args.seed)
+    words = [token for token in tokenizer.get_vocab() if token.isalpha()]
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 2 * args.words_per_text)))
+        for _ in range(args.num_requests)
+    ]
+
+
+async def client(batcher, texts, latencies):
+    while texts:
+        text = texts.pop()
+        start = time.perf_counter()
+        await asyncio.wrap_future(batcher.submit(text))
+        latencies.append(time.perf_counter() - start)
+
+
+async def load_test(batcher, texts, concurrency):
+    texts = list(texts)
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(client(batcher, texts, latencies) for _ in range(concurrency)))
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def main():
+    args = get_args()
+    pipe = pipeline(args.task, model=args.model, device=args.device)
+    texts = get_texts(pipe.tokenizer, args)
+
+    print("| max_batch_size | concurrency | requests / s | p50 (ms) | p90 (ms) | p99 (ms) |")
+    print("|---------------:|------------:|-------------:|---------:|---------:|---------:|")
+    for max_batch_size in args.max_batch_size:
+        batcher = PipelineRequestBatcher(
+            pipe, max_batch_size=max_batch_size, max_wait=args.max_wait, max_batch_tokens=args.max_batch_tokens
+        )
+        for concurrency in args.concurrency:
+            # warmup
+            asyncio.run(load_test(batcher, texts[: 2 * concurrency], concurrency))
+            throughput, latencies = asyncio.run(load_test(batcher, texts, concurrency))
+            p50, p90, p99 = np.percentile(latencies, [50, 90, 99]) * 1000
+            print(
+                f"| {max_batch_size:>14} | {concurrency:>11} | {throughput:>12.1f} | {p50:>8.1f} | {p90:>8.1f} |"
+                f" {p99:>8.1f} |"
+            )
+        batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+
+# Batch encoding throughput benchmark for Python ("slow") tokenizers
+#
+# Compares the serial `tokenizer(texts)` with the process pool used by `tokenizer(texts, num_proc=...)`. The texts are
+# random sentences built from the vocabulary of the tokenizer, so only the tokenizer files need to be available:
+#
+#     python ./scripts/benchmark/slow-tokenizer-batch-encode-benchmark.py --tokenizer bert-base-uncased --num-proc 1 4 8
+#
+# It prints a markdown table with the number of texts encoded per second for each value of `--num-proc`. The speedup is
+# bounded by the number of available CPU cores.
+
+import argparse
+import random
+import time
+
+from transformers import AutoTokenizer
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tokenizer", type=str, default="bert-base-uncased")
+    parser.add_argument("--num-proc", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--num-texts", type=int, default=20000)
+    parser.add_argument("--words-per-text", type=int, default=100)
+    parser.add_argument("--batch-size", type=int, default=1000, help="number of texts per call of the tokenizer")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def get_texts(tokenizer, args):
+    rng = random.Random(args.seed)
+    words = [token for token in tokenizer.get_vocab() if token.isalpha()]
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 2 * args.words_per_text)))
+        for _ in range(args.num_texts)
+    ]
+
+
+def time_encoding(tokenizer, texts, num_proc, args):
+    start = time.perf_counter()
+    for i in range(0, len(texts), args.batch_size):
+        tokenizer(texts[i : i + args.batch_size], truncation=True, num_proc=num_proc)
+    return time.perf_counter() - start
+
+
+def main():
+    args = get_args()
+    tokenizer = AutoTokenizer.from_pretrained(args.tokenizer, use_fast=False)
+    texts = get_texts(tokenizer, args)
+
+    print("| num_proc | texts / s |")
+    print("|---------:|----------:|")
+    for num_proc in args.num_proc:
+        # warmup, which also starts the process pool
+        time_encoding(tokenizer, texts[: args.batch_size], num_proc, args)
+        duration = time_encoding(tokenizer, texts, num_proc, args)
+        print(f"| {num_proc:>8} | {len(texts) / duration:>9.0f} |")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+
+# Short-text latency benchmark for Python ("slow") tokenizers
+#
+# Measures the time of a single `tokenizer.tokenize(text)` and `tokenizer(text)` call on short texts, where the fixed
+# per-call overhead (special tokens handling, lowercasing, word caches) dominates. The texts are random sentences built
+# from the vocabulary of each tokenizer, so only the tokenizer files need to be available:
+#
+#     python ./scripts/benchmark/slow-tokenizer-latency-benchmark.py --tokenizers gpt2 roberta-base bert-base-uncased
+#
+# It prints a markdown table with the mean latency in microseconds of both calls for each tokenizer.
+
+import argparse
+import random
+import time
+
+from transformers import AutoTokenizer
+
+
+def get_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--tokenizers",
+        type=str,
+        nargs="+",
+        default=["gpt2", "roberta-base", "facebook/bart-base", "openai/clip-vit-base-patch32", "openai/whisper-tiny"],
+    )
+    parser.add_argument("--num-texts", type=int, default=2000)
+    parser.add_argument("--words-per-text", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=3, help="number of passes over the texts")
+    parser.add_argument("--seed", type=int, default=42)
+    return parser.parse_args()
+
+
+def get_texts(tokenizer, args):
+    rng = random.Random(args.seed)
+    words = [token.lstrip("Ġ") for token in tokenizer.get_vocab() if token.lstrip("Ġ").isalpha()]
+    return [
+        " ".join(rng.choice(words) for _ in range(rng.randint(1, 2 * args.words_per_text)))
+        for _ in range(args.num_texts)
+    ]
+
+
+def time_calls(function, texts, args):
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for text in texts:
+            function(text)
+    return (time.perf_counter() - start) / (args.repeat * len(texts))
+
+
+def main():
+    args = get_args()
+
+    print("| tokenizer | tokenize (us) | __call__ (us) |")
+    print("|:----------|--------------:|--------------:|")
+    for name in args.tokenizers:
+        tokenizer = AutoTokenizer.from_pretrained(name, use_fast=False)
+        texts = get_texts(tokenizer, args)
+        # warmup, which also fills the word caches
+        time_calls(tokenizer.tokenize, texts[:100], args)
+        tokenize_latency = time_calls(tokenizer.tokenize, texts, args)
+        call_latency = time_calls(tokenizer, texts, args)
+        print(f"| {name} | {tokenize_latency * 1e6:>13.1f} | {call_latency * 1e6:>13.1f} |")
+
+
+if __name__ == "__main__":
+    main()
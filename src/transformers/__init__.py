@@ -611,7 +611,9 @@ _import_structure = {
         "PipedPipelineDataFormat",
         "Pipeline",
         "PipelineDataFormat",
+        "PipelineResultCache",
         "QuestionAnsweringPipeline",
+        "SQLitePipelineResultCache",
         "SummarizationPipeline",
         "TableQuestionAnsweringPipeline",
         "Text2TextGenerationPipeline",
@@ -629,12 +631,14 @@ _import_structure = {
     ],
     "processing_utils": ["ProcessorMixin"],
     "testing_utils": [],
+    "tokenization_cache": ["TokenizationCache"],
     "tokenization_utils": ["PreTrainedTokenizer"],
     "tokenization_utils_base": [
         "AddedToken",
         "BatchEncoding",
         "CharSpan",
         "PreTrainedTokenizerBase",
+        "RaggedArray",
         "SpecialTokensMixin",
         "TokenSpan",
     ],
@@ -952,6 +956,7 @@ else:
         "LineByLineTextDataset",
         "LineByLineWithRefDataset",
         "LineByLineWithSOPTextDataset",
+        "PackedTextIterableDataset",
         "SquadDataset",
         "SquadDataTrainingArguments",
         "TextDataset",
@@ -2455,6 +2460,7 @@ else:
             "RwkvForCausalLM",
             "RwkvModel",
             "RwkvPreTrainedModel",
+            "RwkvStateStore",
         ]
     )
     _import_structure["models.sam"].extend(
@@ -4463,7 +4469,9 @@ if TYPE_CHECKING:
         PipedPipelineDataFormat,
         Pipeline,
         PipelineDataFormat,
+        PipelineResultCache,
         QuestionAnsweringPipeline,
+        SQLitePipelineResultCache,
         SummarizationPipeline,
         TableQuestionAnsweringPipeline,
         Text2TextGenerationPipeline,
@@ -4482,12 +4490,14 @@ if TYPE_CHECKING:
     from .processing_utils import ProcessorMixin
 
     # Tokenization
+    from .tokenization_cache import TokenizationCache
     from .tokenization_utils import PreTrainedTokenizer
     from .tokenization_utils_base import (
         AddedToken,
         BatchEncoding,
         CharSpan,
         PreTrainedTokenizerBase,
+        RaggedArray,
         SpecialTokensMixin,
         TokenSpan,
     )
@@ -4766,6 +4776,7 @@ if TYPE_CHECKING:
             LineByLineTextDataset,
             LineByLineWithRefDataset,
             LineByLineWithSOPTextDataset,
+            PackedTextIterableDataset,
             SquadDataset,
             SquadDataTrainingArguments,
             TextDataset,
@@ -6004,6 +6015,7 @@ if TYPE_CHECKING:
             RwkvForCausalLM,
             RwkvModel,
             RwkvPreTrainedModel,
+            RwkvStateStore,
         )
         from .models.sam import (
             SAM_PRETRAINED_MODEL_ARCHIVE_LIST,
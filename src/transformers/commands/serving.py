@@ -12,10 +12,15 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
+import queue
+import threading
+import time
 from argparse import ArgumentParser, Namespace
+from concurrent.futures import Future
 from typing import Any, List, Optional
 
-from ..pipelines import Pipeline, get_supported_tasks, pipeline
+from ..pipelines import Pipeline, TextClassificationPipeline, get_supported_tasks, pipeline
 from ..utils import logging
 from . import BaseTransformersCLICommand
 
@@ -39,6 +44,9 @@ except (ImportError, AttributeError):
 
 logger = logging.get_logger("transformers-cli/serving")
 
+# Queued after the last request to stop the worker thread of `PipelineRequestBatcher`
+_STOP = object()
+
 
 def serve_command_factory(args: Namespace):
     """
@@ -53,7 +61,153 @@ def serve_command_factory(args: Namespace):
         tokenizer=args.tokenizer,
         device=args.device,
     )
-    return ServeCommand(nlp, args.host, args.port, args.workers)
+    return ServeCommand(
+        nlp,
+        args.host,
+        args.port,
+        args.workers,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait,
+        max_batch_tokens=args.max_batch_tokens,
+    )
+
+
+class PipelineRequestBatcher:
+    """
+    Coalesces the inputs of concurrent requests into batches run through a pipeline by a dedicated worker thread.
+
+    A batch is closed when it holds `max_batch_size` requests, when adding the next request would exceed
+    `max_batch_tokens` padded tokens, or `max_wait` seconds after its first request was received, whichever comes
+    first.
+
+    Args:
+        pipeline ([`Pipeline`]):
+            The pipeline used to run the requests.
+        max_batch_size (`int`, *optional*, defaults to 8):
+            The maximum number of requests in a batch.
+        max_wait (`float`, *optional*, defaults to 0.01):
+            The maximum time in seconds the first request of a batch waits for other requests.
+        max_batch_tokens (`int`, *optional*):
+            The maximum number of tokens of a batch once padded, computed as the number of textual inputs times the
+            length of the longest one. A single request above this limit is run alone.
+    """
+
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        max_batch_tokens: Optional[int] = None,
+    ):
+        if max_batch_size < 1:
+            raise ValueError(f"`max_batch_size` should be a positive integer, got {max_batch_size}.")
+        self.pipeline = pipeline
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.max_batch_tokens = max_batch_tokens
+        tokenizer = pipeline.tokenizer
+        # Without a padding token the pipeline can't batch, the coalesced inputs are then run one by one
+        self._pipeline_batch_size = None if tokenizer is None or tokenizer.pad_token_id is not None else 1
+        self._requests = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name="pipeline-request-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, inputs) -> Future:
+        """
+        Queues the inputs of a request.
+
+        Args:
+            inputs:
+                The inputs of the request, a single input or a list of inputs of the pipeline.
+
+        Return:
+            `concurrent.futures.Future`: A future set to the output of `pipeline(inputs)`, or to the exception it
+            raised.
+        """
+        future = Future()
+        self._requests.put((inputs, future))
+        return future
+
+    def close(self):
+        """
+        Stops the worker thread once the requests already queued have been run.
+        """
+        self._requests.put(_STOP)
+        self._worker.join()
+
+    def _count_tokens(self, inputs):
+        if self.max_batch_tokens is None or self.pipeline.tokenizer is None:
+            return 0, 0
+        items = inputs if isinstance(inputs, list) else [inputs]
+        lengths = [len(self.pipeline.tokenizer(item)["input_ids"]) for item in items if isinstance(item, str)]
+        return len(lengths), max(lengths, default=0)
+
+    def _next_batch(self, pending):
+        request = pending if pending is not None else self._requests.get()
+        if request is _STOP:
+            return [], _STOP
+        batch = [request]
+        num_texts, longest = self._count_tokens(request[0])
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            timeout = deadline - time.monotonic()
+            try:
+                request = self._requests.get(timeout=timeout) if timeout > 0 else self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is _STOP:
+                return batch, request
+            request_texts, request_longest = self._count_tokens(request[0])
+            if (
+                self.max_batch_tokens is not None
+                and (num_texts + request_texts) * max(longest, request_longest) > self.max_batch_tokens
+            ):
+                return batch, request
+            batch.append(request)
+            num_texts, longest = num_texts + request_texts, max(longest, request_longest)
+        return batch, None
+
+    def _run_requests(self, requests):
+        items, slices = [], []
+        for inputs, _ in requests:
+            start = len(items)
+            items.extend(inputs if isinstance(inputs, list) else [inputs])
+            slices.append(slice(start, len(items)))
+        batch_size = self._pipeline_batch_size or len(items)
+        outputs = self.pipeline(items, batch_size=batch_size)
+        results = []
+        for (inputs, _), request_slice in zip(requests, slices):
+            if isinstance(inputs, list):
+                results.append(outputs[request_slice])
+            elif isinstance(self.pipeline, TextClassificationPipeline):
+                # Mirrors the pipeline, which returns a list for a single text
+                results.append(outputs[request_slice])
+            else:
+                results.append(outputs[request_slice.start])
+        return results
+
+    def _set_results(self, requests):
+        try:
+            results = self._run_requests(requests)
+        except Exception as e:
+            if len(requests) == 1:
+                requests[0][1].set_exception(e)
+            else:
+                # Run the requests one by one so that a faulty input only fails its own request
+                for request in requests:
+                    self._set_results([request])
+            return
+        for (_, future), result in zip(requests, results):
+            future.set_result(result)
+
+    def _run(self):
+        pending = None
+        while pending is not _STOP:
+            batch, pending = self._next_batch(pending)
+            # Requests cancelled while waiting in the queue are dropped
+            batch = [request for request in batch if request[1].set_running_or_notify_cancel()]
+            if batch:
+                self._set_results(batch)
 
 
 class ServeModelInfoResult(BaseModel):
@@ -119,9 +273,36 @@ class ServeCommand(BaseTransformersCLICommand):
             default=-1,
             help="Indicate the device to run onto, -1 indicates CPU, >= 0 indicates GPU (default: -1)",
         )
+        serve_parser.add_argument(
+            "--max-batch-size",
+            type=int,
+            default=8,
+            help="Maximum number of concurrent /forward requests run through the pipeline as a single batch.",
+        )
+        serve_parser.add_argument(
+            "--max-wait",
+            type=float,
+            default=0.01,
+            help="Maximum time in seconds a /forward request waits for other requests to be batched with.",
+        )
+        serve_parser.add_argument(
+            "--max-batch-tokens",
+            type=int,
+            default=None,
+            help="Maximum number of tokens of a batch of /forward requests once padded.",
+        )
         serve_parser.set_defaults(func=serve_command_factory)
 
-    def __init__(self, pipeline: Pipeline, host: str, port: int, workers: int):
+    def __init__(
+        self,
+        pipeline: Pipeline,
+        host: str,
+        port: int,
+        workers: int,
+        max_batch_size: int = 8,
+        max_wait: float = 0.01,
+        max_batch_tokens: Optional[int] = None,
+    ):
         self._pipeline = pipeline
 
         self.host = host
@@ -136,6 +317,9 @@ class ServeCommand(BaseTransformersCLICommand):
             )
         else:
             logger.info(f"Serving model over {host}:{port}")
+            self._batcher = PipelineRequestBatcher(
+                pipeline, max_batch_size=max_batch_size, max_wait=max_wait, max_batch_tokens=max_batch_tokens
+            )
             self._app = FastAPI(
                 routes=[
                     APIRoute(
@@ -221,8 +405,8 @@ class ServeCommand(BaseTransformersCLICommand):
             return ServeForwardResult(output=[], attention=[])
 
         try:
-            # Forward through the model
-            output = self._pipeline(inputs)
+            # Forward through the model, batched with the concurrent requests by the worker thread of the batcher
+            output = await asyncio.wrap_future(self._batcher.submit(inputs))
             return ServeForwardResult(output=output)
         except Exception as e:
             raise HTTPException(500, {"error": str(e)})
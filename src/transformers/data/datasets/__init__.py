@@ -17,6 +17,7 @@ from .language_modeling import (
     LineByLineTextDataset,
     LineByLineWithRefDataset,
     LineByLineWithSOPTextDataset,
+    PackedTextIterableDataset,
     TextDataset,
     TextDatasetForNextSentencePrediction,
 )
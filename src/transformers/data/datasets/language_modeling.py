@@ -18,13 +18,15 @@ import pickle
 import random
 import time
 import warnings
-from typing import Dict, List, Optional
+from typing import Dict, Iterator, List, Optional, Tuple, Union
 
+import numpy as np
 import torch
 from filelock import FileLock
-from torch.utils.data import Dataset
+from torch.utils.data import Dataset, IterableDataset
 
 from ...tokenization_utils import PreTrainedTokenizer
+from ...tokenization_utils_base import PreTrainedTokenizerBase
 from ...utils import logging
 
 
@@ -528,3 +530,117 @@ class TextDatasetForNextSentencePrediction(Dataset):
 
     def __getitem__(self, i):
         return self.examples[i]
+
+
+class PackedTextIterableDataset(IterableDataset):
+    """
+    Streaming dataset for language model pretraining. The text files are read and tokenized by batches of lines, and
+    the tokens of all the documents are concatenated, with an end-of-sequence token after each document, and cut in
+    examples of exactly `block_size` tokens. Only one batch of lines is held in memory at a time, whatever the size of
+    the corpus.
+
+    When iterated by several `DataLoader` workers, each worker tokenizes a different share of the batches of lines.
+
+    Args:
+        tokenizer ([`PreTrainedTokenizerBase`]):
+            The tokenizer, preferably a fast one. Its `eos_token` (or `sep_token` if it has none) is used to separate
+            the documents, no other special tokens are added.
+        file_path (`str` or `List[str]`):
+            The text file(s) to read, in order.
+        block_size (`int`):
+            The number of tokens of each example. The last tokens of the corpus, which don't fill a whole example, are
+            dropped.
+        line_by_line (`bool`, *optional*, defaults to `True`):
+            Whether each line is a document. Otherwise, the documents are separated by empty lines (and the end of the
+            files).
+        batch_size (`int`, *optional*, defaults to 1000):
+            The minimal number of lines tokenized at once. Batches are extended to the end of their last document.
+        return_position_ids (`bool`, *optional*, defaults to `False`):
+            Whether to also return `position_ids` which restart from 0 at the start of each document (and of each
+            example), to mark the document boundaries inside the examples.
+    """
+
+    def __init__(
+        self,
+        tokenizer: PreTrainedTokenizerBase,
+        file_path: Union[str, List[str]],
+        block_size: int,
+        line_by_line: bool = True,
+        batch_size: int = 1000,
+        return_position_ids: bool = False,
+    ):
+        self.file_paths = [file_path] if isinstance(file_path, str) else list(file_path)
+        for path in self.file_paths:
+            if os.path.isfile(path) is False:
+                raise ValueError(f"Input file path {path} not found")
+        if block_size <= 0:
+            raise ValueError(f"`block_size` should be a positive integer, got {block_size}")
+
+        self.eos_token_id = tokenizer.eos_token_id if tokenizer.eos_token_id is not None else tokenizer.sep_token_id
+        if self.eos_token_id is None:
+            raise ValueError("The tokenizer needs an `eos_token` or a `sep_token` to separate the documents")
+
+        self.tokenizer = tokenizer
+        self.block_size = block_size
+        self.line_by_line = line_by_line
+        self.batch_size = batch_size
+        self.return_position_ids = return_position_ids
+
+    def _read_batches(self) -> Iterator[Tuple[List[str], List[bool]]]:
+        """
+        Yields batches of non-empty lines with, for each line, whether it is the last one of its document.
+        """
+        lines, ends_document = [], []
+        for path in self.file_paths:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        lines.append(line)
+                        ends_document.append(self.line_by_line)
+                    elif ends_document:
+                        ends_document[-1] = True
+
+                    if len(lines) >= self.batch_size and ends_document[-1]:
+                        yield lines, ends_document
+                        lines, ends_document = [], []
+            if ends_document:
+                ends_document[-1] = True
+        if lines:
+            yield lines, ends_document
+
+    def __iter__(self) -> Iterator[Dict[str, torch.Tensor]]:
+        worker_info = torch.utils.data.get_worker_info()
+        num_workers, worker_id = (1, 0) if worker_info is None else (worker_info.num_workers, worker_info.id)
+
+        # `input_ids` holds the tokens not yielded yet, `document_starts` flags the first token of each document
+        input_ids, document_starts = [], []
+        starts_document = True
+        for index, (lines, ends_document) in enumerate(self._read_batches()):
+            if index % num_workers != worker_id:
+                continue
+            for ids, ends in zip(self.tokenizer(lines, add_special_tokens=False)["input_ids"], ends_document):
+                if ends:
+                    ids = ids + [self.eos_token_id]
+                if not ids:
+                    continue
+                input_ids.extend(ids)
+                document_starts.extend([starts_document] + [False] * (len(ids) - 1))
+                starts_document = ends
+
+            num_examples = len(input_ids) // self.block_size
+            for i in range(0, num_examples * self.block_size, self.block_size):
+                example = {"input_ids": torch.tensor(input_ids[i : i + self.block_size], dtype=torch.long)}
+                if self.return_position_ids:
+                    example["position_ids"] = self._get_position_ids(document_starts[i : i + self.block_size])
+                yield example
+            del input_ids[: num_examples * self.block_size]
+            del document_starts[: num_examples * self.block_size]
+
+    @staticmethod
+    def _get_position_ids(document_starts: List[bool]) -> torch.Tensor:
+        positions = np.arange(len(document_starts))
+        # Index of the start of the document of each token, the first one of the example counting as a start
+        starts = np.where(document_starts, positions, 0)
+        starts = np.maximum.accumulate(starts)
+        return torch.from_numpy(positions - starts)
@@ -2090,6 +2090,12 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
                 If `True`, will temporarily offload the CPU state dict to the hard drive to avoid getting out of CPU
                 RAM if the weight of the CPU state dict + the biggest shard of the checkpoint does not fit. Defaults to
                 `True` when there is some disk offload.
+            layer_streaming (`bool`, *optional*, defaults to `False`):
+                If `True`, the repeated blocks of the model (see `_no_split_modules`) are not loaded in memory: their
+                weights are read from the memory-mapped safetensors checkpoint right before each block runs and
+                released right after, while the weights of the next block are prefetched in a background thread. This
+                allows CPU inference with models that do not fit in RAM. Requires a safetensors checkpoint and is only
+                meant for inference.
             load_in_8bit (`bool`, *optional*, defaults to `False`):
                 If `True`, will convert the loaded model into mixed-8bit quantized model. To use this feature please
                 install `bitsandbytes` compiled with your CUDA version by running `pip install -i
@@ -2183,6 +2189,7 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
         max_memory = kwargs.pop("max_memory", None)
         offload_folder = kwargs.pop("offload_folder", None)
         offload_state_dict = kwargs.pop("offload_state_dict", False)
+        layer_streaming = kwargs.pop("layer_streaming", False)
         load_in_8bit = kwargs.pop("load_in_8bit", False)
         load_in_4bit = kwargs.pop("load_in_4bit", False)
         quantization_config = kwargs.pop("quantization_config", None)
@@ -2239,6 +2246,20 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
             elif not low_cpu_mem_usage:
                 raise ValueError("Passing along a `device_map` requires `low_cpu_mem_usage=True`")
 
+        if layer_streaming:
+            if device_map is not None or load_in_8bit or load_in_4bit or from_tf or from_flax:
+                raise ValueError(
+                    "`layer_streaming=True` is not compatible with `device_map`, `load_in_8bit`, `load_in_4bit`, "
+                    "`from_tf` or `from_flax`."
+                )
+            if use_safetensors is False:
+                raise ValueError("`layer_streaming=True` requires a safetensors checkpoint.")
+            use_safetensors = True
+            if low_cpu_mem_usage is None:
+                low_cpu_mem_usage = True
+            elif not low_cpu_mem_usage:
+                raise ValueError("Passing along `layer_streaming=True` requires `low_cpu_mem_usage=True`")
+
         if low_cpu_mem_usage:
             if device_map is not None:
                 # The max memory utils require PyTorch >= 1.10 to have torch.cuda.mem_get_info.
@@ -2625,7 +2646,7 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
 
         # load pt weights early so that we know which dtype to init the model under
         if from_pt:
-            if not is_sharded and state_dict is None:
+            if not is_sharded and state_dict is None and not layer_streaming:
                 # Time to load the checkpoint
                 state_dict = load_state_dict(resolved_archive_file)
 
@@ -2645,6 +2666,11 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
                         else:
                             if is_sharded and "dtype" in sharded_metadata:
                                 torch_dtype = sharded_metadata["dtype"]
+                            elif layer_streaming:
+                                from .utils.layer_streaming import get_safetensors_checkpoint_dtype
+
+                                checkpoint_file = resolved_archive_file[0] if is_sharded else resolved_archive_file
+                                torch_dtype = get_safetensors_checkpoint_dtype(checkpoint_file)
                             elif not is_sharded:
                                 torch_dtype = get_state_dict_dtype(state_dict)
                             else:
@@ -2679,6 +2705,10 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
 
             if is_sharded:
                 loaded_state_dict_keys = sharded_metadata["all_checkpoint_keys"]
+            elif layer_streaming:
+                from .utils.layer_streaming import get_safetensors_checkpoint_keys
+
+                loaded_state_dict_keys = get_safetensors_checkpoint_keys(resolved_archive_file)
             else:
                 loaded_state_dict_keys = list(state_dict.keys())
             if low_cpu_mem_usage or use_keep_in_fp32_modules:
@@ -2889,6 +2919,30 @@ class PreTrainedModel(nn.Module, ModuleUtilsMixin, GenerationMixin, PushToHubMix
                     " installation instructions."
                 )
                 raise
+        elif from_pt and layer_streaming:
+            # restore default dtype
+            if dtype_orig is not None:
+                torch.set_default_dtype(dtype_orig)
+
+            from .utils.layer_streaming import LayerStreamer
+
+            streamer = LayerStreamer(
+                model,
+                resolved_archive_file if is_sharded else [resolved_archive_file],
+                prefix=cls.base_model_prefix,
+            )
+            streamer.load_resident_weights()
+            streamer.attach()
+            # tied weights (e.g. the LM head) are not in the checkpoint but are shared with a loaded weight
+            model.tie_weights()
+            missing_keys = streamer.get_missing_resident_weights()
+            if len(missing_keys) > 0:
+                raise ValueError(
+                    f"The following weights of {model.__class__.__name__} are missing from the checkpoint at "
+                    f"{pretrained_model_name_or_path} and cannot be initialized with `layer_streaming=True`: "
+                    f"{missing_keys}"
+                )
+            unexpected_keys, mismatched_keys, error_msgs = [], [], []
         elif from_pt:
             # restore default dtype
             if dtype_orig is not None:
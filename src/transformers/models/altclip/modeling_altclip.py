@@ -30,7 +30,12 @@ from ...modeling_outputs import (
     BaseModelOutputWithPoolingAndProjection,
 )
 from ...modeling_utils import PreTrainedModel
-from ...pytorch_utils import apply_chunking_to_forward, find_pruneable_heads_and_indices, prune_linear_layer
+from ...pytorch_utils import (
+    SequencePacking,
+    apply_chunking_to_forward,
+    find_pruneable_heads_and_indices,
+    prune_linear_layer,
+)
 from ...utils import ModelOutput, add_start_docstrings_to_model_forward, logging, replace_return_docstrings
 from .configuration_altclip import AltCLIPConfig, AltCLIPTextConfig, AltCLIPVisionConfig
 
@@ -1328,6 +1333,13 @@ class AltRobertaModel(AltCLIPPreTrainedModel):
             else:
                 token_type_ids = torch.zeros(input_shape, dtype=torch.long, device=device)
 
+        # Packs the sequences of the batch together to skip the computation on padding tokens, see `SequencePacking`
+        packing = None
+        if getattr(self.config, "unpad_inputs", False) and not (self.config.is_decoder or output_attentions):
+            packing = SequencePacking.from_attention_mask(attention_mask)
+            if packing is not None:
+                attention_mask = packing.attention_mask
+
         # We can provide a self-attention mask of dimensions [batch_size, from_seq_length, to_seq_length]
         # ourselves in which case we just need to make it broadcastable to all heads.
         extended_attention_mask: torch.Tensor = self.get_extended_attention_mask(attention_mask, input_shape)
@@ -1357,6 +1369,8 @@ class AltRobertaModel(AltCLIPPreTrainedModel):
             inputs_embeds=inputs_embeds,
             past_key_values_length=past_key_values_length,
         )
+        if packing is not None:
+            embedding_output = packing.pack(embedding_output)
         encoder_outputs = self.encoder(
             embedding_output,
             attention_mask=extended_attention_mask,
@@ -1369,6 +1383,8 @@ class AltRobertaModel(AltCLIPPreTrainedModel):
             output_hidden_states=output_hidden_states,
             return_dict=return_dict,
         )
+        if packing is not None:
+            encoder_outputs = packing.unpack(encoder_outputs)
         sequence_output = encoder_outputs[0]
         pooled_output = self.pooler(sequence_output) if self.pooler is not None else None
 
@@ -83,7 +83,38 @@ def _expand_mask(mask: torch.Tensor, tgt_length: int) -> torch.BoolTensor:
     return expanded_mask.expand(batch_size, 1, tgt_length, src_length)
 
 
-def build_alibi_tensor(attention_mask: torch.Tensor, num_heads: int, dtype: torch.dtype) -> torch.Tensor:
+def build_alibi_slopes(num_heads: int, device: Optional[torch.device] = None) -> torch.Tensor:
+    """
+    Computes the per-head slopes used by ALiBi. The slopes only depend on the number of heads, so they can be computed
+    once and reused for every forward pass (see `BloomModel._get_alibi_slopes`).
+
+    Args:
+        num_heads (`int`, *required*):
+            number of heads
+        device (`torch.device`, *optional*):
+            device on which to create the slopes
+
+    Returns tensor shaped (num_heads,) in `torch.float32`
+    """
+    closest_power_of_2 = 2 ** math.floor(math.log2(num_heads))
+    base = torch.tensor(2 ** (-(2 ** -(math.log2(closest_power_of_2) - 3))), device=device, dtype=torch.float32)
+    powers = torch.arange(1, 1 + closest_power_of_2, device=device, dtype=torch.int32)
+    slopes = torch.pow(base, powers)
+
+    if closest_power_of_2 != num_heads:
+        extra_base = torch.tensor(
+            2 ** (-(2 ** -(math.log2(2 * closest_power_of_2) - 3))), device=device, dtype=torch.float32
+        )
+        num_remaining_heads = min(closest_power_of_2, num_heads - closest_power_of_2)
+        extra_powers = torch.arange(1, 1 + 2 * num_remaining_heads, 2, device=device, dtype=torch.int32)
+        slopes = torch.cat([slopes, torch.pow(extra_base, extra_powers)], dim=0)
+
+    return slopes
+
+
+def build_alibi_tensor(
+    attention_mask: torch.Tensor, num_heads: int, dtype: torch.dtype, slopes: Optional[torch.Tensor] = None
+) -> torch.Tensor:
     """
     Link to paper: https://arxiv.org/abs/2108.12409 Alibi tensor is not causal as the original paper mentions, it
     relies on a translation invariance of softmax for quick implementation: with l being a tensor, and a fixed value
@@ -99,22 +130,13 @@ def build_alibi_tensor(attention_mask: torch.Tensor, num_heads: int, dtype: torc
             number of heads
         dtype (`torch.dtype`, *optional*, default=`torch.bfloat16`):
             dtype of the output tensor
+        slopes (`torch.Tensor`, *optional*):
+            Precomputed slopes of shape (num_heads,) as returned by `build_alibi_slopes`. Computed on the fly if not
+            provided.
     """
     batch_size, seq_length = attention_mask.shape
-    closest_power_of_2 = 2 ** math.floor(math.log2(num_heads))
-    base = torch.tensor(
-        2 ** (-(2 ** -(math.log2(closest_power_of_2) - 3))), device=attention_mask.device, dtype=torch.float32
-    )
-    powers = torch.arange(1, 1 + closest_power_of_2, device=attention_mask.device, dtype=torch.int32)
-    slopes = torch.pow(base, powers)
-
-    if closest_power_of_2 != num_heads:
-        extra_base = torch.tensor(
-            2 ** (-(2 ** -(math.log2(2 * closest_power_of_2) - 3))), device=attention_mask.device, dtype=torch.float32
-        )
-        num_remaining_heads = min(closest_power_of_2, num_heads - closest_power_of_2)
-        extra_powers = torch.arange(1, 1 + 2 * num_remaining_heads, 2, device=attention_mask.device, dtype=torch.int32)
-        slopes = torch.cat([slopes, torch.pow(extra_base, extra_powers)], dim=0)
+    if slopes is None:
+        slopes = build_alibi_slopes(num_heads, device=attention_mask.device)
 
     # Note: alibi will added to the attention bias that will be applied to the query, key product of attention
     # => therefore alibi will have to be of shape (batch_size, num_heads, query_length, key_length)
@@ -329,7 +351,11 @@ class BloomAttention(nn.Module):
         # `float16` has a minimum value of -65504.0, whereas `bfloat16` and `float32` have a minimum value of `-3.4e+38`
         if input_dtype == torch.float16:
             attention_scores = attention_scores.to(torch.float)
-        attn_weights = torch.masked_fill(attention_scores, attention_mask, torch.finfo(attention_scores.dtype).min)
+        if attention_mask is not None:
+            attn_weights = torch.masked_fill(attention_scores, attention_mask, torch.finfo(attention_scores.dtype).min)
+        else:
+            # the padding mask has already been folded into `alibi` (incremental decoding)
+            attn_weights = attention_scores
         attention_probs = F.softmax(attn_weights, dim=-1, dtype=torch.float32).to(input_dtype)
 
         # [batch_size, num_heads, q_length, kv_length]
@@ -632,12 +658,32 @@ class BloomModel(BloomPreTrainedModel):
         self.ln_f = LayerNorm(self.embed_dim, eps=config.layer_norm_epsilon)
 
         self.gradient_checkpointing = False
+        # ALiBi slopes only depend on the number of heads, they are lazily computed once per device
+        self._alibi_slopes = None
 
         # Initialize weights and apply final processing
         self.post_init()
 
+    def _get_alibi_slopes(self, device: torch.device) -> torch.Tensor:
+        if self._alibi_slopes is None or self._alibi_slopes.device != device:
+            self._alibi_slopes = build_alibi_slopes(self.num_heads, device=device)
+        return self._alibi_slopes
+
     def build_alibi_tensor(self, attention_mask: torch.Tensor, num_heads: int, dtype: torch.dtype) -> torch.Tensor:
-        return build_alibi_tensor(attention_mask, num_heads, dtype)
+        slopes = self._get_alibi_slopes(attention_mask.device) if num_heads == self.num_heads else None
+        return build_alibi_tensor(attention_mask, num_heads, dtype, slopes=slopes)
+
+    def _fold_padding_mask_into_alibi(self, alibi: torch.Tensor, attention_mask: torch.Tensor) -> torch.Tensor:
+        """
+        During incremental decoding the query length is 1, so the padding mask can be applied once to the
+        `[batch_size * num_heads, 1, kv_length]` ALiBi bias instead of masking the attention scores in every layer.
+        The bias is then applied together with the query-key product by a single `baddbmm`.
+        """
+        padding_mask = ~(attention_mask.to(torch.bool))
+        if not padding_mask.any():
+            return alibi
+        padding_mask = padding_mask.repeat_interleave(self.num_heads, dim=0)[:, None, :]
+        return alibi.masked_fill(padding_mask, torch.finfo(alibi.dtype).min)
 
     def get_input_embeddings(self):
         return self.word_embeddings
@@ -750,11 +796,16 @@ class BloomModel(BloomPreTrainedModel):
 
         alibi = self.build_alibi_tensor(attention_mask, self.num_heads, dtype=hidden_states.dtype)
 
-        causal_mask = self._prepare_attn_mask(
-            attention_mask,
-            input_shape=(batch_size, seq_length),
-            past_key_values_length=past_key_values_length,
-        )
+        if seq_length == 1 and past_key_values_length > 0:
+            # incremental decoding: the single new query row needs no causal mask, only the padding mask
+            alibi = self._fold_padding_mask_into_alibi(alibi, attention_mask)
+            causal_mask = None
+        else:
+            causal_mask = self._prepare_attn_mask(
+                attention_mask,
+                input_shape=(batch_size, seq_length),
+                past_key_values_length=past_key_values_length,
+            )
 
         for i, (block, layer_past) in enumerate(zip(self.h, past_key_values)):
             if output_hidden_states:
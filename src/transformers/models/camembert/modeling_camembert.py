@@ -35,7 +35,12 @@ from ...modeling_outputs import (
     TokenClassifierOutput,
 )
 from ...modeling_utils import PreTrainedModel
-from ...pytorch_utils import apply_chunking_to_forward, find_pruneable_heads_and_indices, prune_linear_layer
+from ...pytorch_utils import (
+    SequencePacking,
+    apply_chunking_to_forward,
+    find_pruneable_heads_and_indices,
+    prune_linear_layer,
+)
 from ...utils import (
     add_code_sample_docstrings,
     add_start_docstrings,
@@ -865,6 +870,13 @@ class CamembertModel(CamembertPreTrainedModel):
             else:
                 token_type_ids = torch.zeros(input_shape, dtype=torch.long, device=device)
 
+        # Packs the sequences of the batch together to skip the computation on padding tokens, see `SequencePacking`
+        packing = None
+        if getattr(self.config, "unpad_inputs", False) and not (self.config.is_decoder or output_attentions):
+            packing = SequencePacking.from_attention_mask(attention_mask)
+            if packing is not None:
+                attention_mask = packing.attention_mask
+
         # We can provide a self-attention mask of dimensions [batch_size, from_seq_length, to_seq_length]
         # ourselves in which case we just need to make it broadcastable to all heads.
         extended_attention_mask: torch.Tensor = self.get_extended_attention_mask(attention_mask, input_shape)
@@ -894,6 +906,8 @@ class CamembertModel(CamembertPreTrainedModel):
             inputs_embeds=inputs_embeds,
             past_key_values_length=past_key_values_length,
         )
+        if packing is not None:
+            embedding_output = packing.pack(embedding_output)
         encoder_outputs = self.encoder(
             embedding_output,
             attention_mask=extended_attention_mask,
@@ -906,6 +920,8 @@ class CamembertModel(CamembertPreTrainedModel):
             output_hidden_states=output_hidden_states,
             return_dict=return_dict,
         )
+        if packing is not None:
+            encoder_outputs = packing.unpack(encoder_outputs)
         sequence_output = encoder_outputs[0]
         pooled_output = self.pooler(sequence_output) if self.pooler is not None else None
 
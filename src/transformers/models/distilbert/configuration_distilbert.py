@@ -83,6 +83,10 @@ class DistilBertConfig(PretrainedConfig):
         seq_classif_dropout (`float`, *optional*, defaults to 0.2):
             The dropout probabilities used in the sequence classification and the multiple choice model
             [`DistilBertForSequenceClassification`].
+        unpad_inputs (`bool`, *optional*, defaults to `False`):
+            Whether or not to pack the sequences of a padded batch together before running the encoder, so that no
+            compute is spent on padding tokens. The hidden states of the padding tokens are then zeros. Not used when
+            `output_attentions=True`.
 
     Examples:
 
@@ -120,6 +124,7 @@ class DistilBertConfig(PretrainedConfig):
         initializer_range=0.02,
         qa_dropout=0.1,
         seq_classif_dropout=0.2,
+        unpad_inputs=False,
         pad_token_id=0,
         **kwargs,
     ):
@@ -136,6 +141,7 @@ class DistilBertConfig(PretrainedConfig):
         self.initializer_range = initializer_range
         self.qa_dropout = qa_dropout
         self.seq_classif_dropout = seq_classif_dropout
+        self.unpad_inputs = unpad_inputs
         super().__init__(**kwargs, pad_token_id=pad_token_id)
 
 
@@ -39,7 +39,12 @@ from ...modeling_outputs import (
     TokenClassifierOutput,
 )
 from ...modeling_utils import PreTrainedModel
-from ...pytorch_utils import apply_chunking_to_forward, find_pruneable_heads_and_indices, prune_linear_layer
+from ...pytorch_utils import (
+    SequencePacking,
+    apply_chunking_to_forward,
+    find_pruneable_heads_and_indices,
+    prune_linear_layer,
+)
 from ...utils import (
     add_code_sample_docstrings,
     add_start_docstrings,
@@ -189,7 +194,7 @@ class MultiHeadSelfAttention(nn.Module):
             query: torch.tensor(bs, seq_length, dim)
             key: torch.tensor(bs, seq_length, dim)
             value: torch.tensor(bs, seq_length, dim)
-            mask: torch.tensor(bs, seq_length)
+            mask: torch.tensor(bs, seq_length) or torch.tensor(bs, seq_length, seq_length)
 
         Returns:
             weights: torch.tensor(bs, n_heads, seq_length, seq_length) Attention weights context: torch.tensor(bs,
@@ -202,7 +207,7 @@ class MultiHeadSelfAttention(nn.Module):
 
         dim_per_head = self.dim // self.n_heads
 
-        mask_reshp = (bs, 1, 1, k_length)
+        mask_reshp = (bs, 1, 1, k_length) if mask.dim() == 2 else (bs, 1, q_length, k_length)
 
         def shape(x: torch.Tensor) -> torch.Tensor:
             """separate heads"""
@@ -580,7 +585,15 @@ class DistilBertModel(DistilBertPreTrainedModel):
 
         embeddings = self.embeddings(input_ids, inputs_embeds)  # (bs, seq_length, dim)
 
-        return self.transformer(
+        # Packs the sequences of the batch together to skip the computation on padding tokens, see `SequencePacking`
+        packing = None
+        if self.config.unpad_inputs and not output_attentions:
+            packing = SequencePacking.from_attention_mask(attention_mask)
+            if packing is not None:
+                attention_mask = packing.attention_mask  # (num_rows, seq_length, seq_length)
+                embeddings = packing.pack(embeddings)  # (num_rows, seq_length, dim)
+
+        outputs = self.transformer(
             x=embeddings,
             attn_mask=attention_mask,
             head_mask=head_mask,
@@ -589,6 +602,11 @@ class DistilBertModel(DistilBertPreTrainedModel):
             return_dict=return_dict,
         )
 
+        if packing is not None:
+            outputs = packing.unpack(outputs)
+
+        return outputs
+
 
 @add_start_docstrings(
     """DistilBert Model with a `masked language modeling` head on top.""",
@@ -115,6 +115,10 @@ class ElectraConfig(PretrainedConfig):
             relevant if `config.is_decoder=True`.
         classifier_dropout (`float`, *optional*):
             The dropout ratio for the classification head.
+        unpad_inputs (`bool`, *optional*, defaults to `False`):
+            Whether or not to pack the sequences of a padded batch together before running the encoder, so that no
+            compute is spent on padding tokens. The hidden states of the padding tokens are then zeros. Not used when
+            `output_attentions=True` or when the model is used as a decoder.
 
     Examples:
 
@@ -155,6 +159,7 @@ class ElectraConfig(PretrainedConfig):
         position_embedding_type="absolute",
         use_cache=True,
         classifier_dropout=None,
+        unpad_inputs=False,
         **kwargs,
     ):
         super().__init__(pad_token_id=pad_token_id, **kwargs)
@@ -180,6 +185,7 @@ class ElectraConfig(PretrainedConfig):
         self.position_embedding_type = position_embedding_type
         self.use_cache = use_cache
         self.classifier_dropout = classifier_dropout
+        self.unpad_inputs = unpad_inputs
 
 
 class ElectraOnnxConfig(OnnxConfig):
@@ -87,6 +87,10 @@ class RobertaPreLayerNormConfig(PretrainedConfig):
             relevant if `config.is_decoder=True`.
         classifier_dropout (`float`, *optional*):
             The dropout ratio for the classification head.
+        unpad_inputs (`bool`, *optional*, defaults to `False`):
+            Whether or not to pack the sequences of a padded batch together before running the encoder, so that no
+            compute is spent on padding tokens. The hidden states of the padding tokens are then zeros. Not used when
+            `output_attentions=True` or when the model is used as a decoder.
 
     Examples:
 
@@ -124,6 +128,7 @@ class RobertaPreLayerNormConfig(PretrainedConfig):
         position_embedding_type="absolute",
         use_cache=True,
         classifier_dropout=None,
+        unpad_inputs=False,
         **kwargs,
     ):
         super().__init__(pad_token_id=pad_token_id, bos_token_id=bos_token_id, eos_token_id=eos_token_id, **kwargs)
@@ -143,6 +148,7 @@ class RobertaPreLayerNormConfig(PretrainedConfig):
         self.position_embedding_type = position_embedding_type
         self.use_cache = use_cache
         self.classifier_dropout = classifier_dropout
+        self.unpad_inputs = unpad_inputs
 
 
 # Copied from transformers.models.roberta.configuration_roberta.RobertaOnnxConfig with Roberta->RobertaPreLayerNorm
@@ -36,6 +36,7 @@ else:
         "RwkvForCausalLM",
         "RwkvModel",
         "RwkvPreTrainedModel",
+        "RwkvStateStore",
     ]
 
 
@@ -53,6 +54,7 @@ if TYPE_CHECKING:
             RwkvForCausalLM,
             RwkvModel,
             RwkvPreTrainedModel,
+            RwkvStateStore,
         )
 else:
     import sys
@@ -16,9 +16,10 @@
 """PyTorch RWKV model."""
 
 import math
+from collections import OrderedDict
 from dataclasses import dataclass
 from pathlib import Path
-from typing import List, Optional, Tuple, Union
+from typing import Hashable, List, Optional, Sequence, Tuple, Union
 
 import torch
 import torch.utils.checkpoint
@@ -32,12 +33,18 @@ from ...utils import (
     add_start_docstrings,
     add_start_docstrings_to_model_forward,
     is_ninja_available,
+    is_safetensors_available,
     is_torch_cuda_available,
     logging,
 )
 from .configuration_rwkv import RwkvConfig
 
 
+if is_safetensors_available():
+    from safetensors.torch import load as safetensors_load
+    from safetensors.torch import save as safetensors_save
+
+
 logger = logging.get_logger(__name__)
 
 _CHECKPOINT_FOR_DOC = "RWKV/rwkv-4-169m-pile"
@@ -60,6 +67,14 @@ RWKV_PRETRAINED_MODEL_ARCHIVE_LIST = [
 
 rwkv_cuda_kernel = None
 
+# Number of tokens processed at once by the vectorized CPU implementation of the WKV recurrence.
+RWKV_CPU_CHUNK_SIZE = 16
+# Maximum spread of the exponents inside a chunk for which the vectorized CPU implementation is exact in float64.
+RWKV_CPU_MAX_LOG_SPREAD = 600
+# The vectorized CPU implementation only pays off when the per-token work of the sequential one (batch_size x
+# hidden_size) is small enough for the loop overhead to dominate.
+RWKV_CPU_CHUNKED_MAX_WIDTH = 1024
+
 
 def load_wkv_cuda_kernel(context_length):
     from torch.utils.cpp_extension import load as load_kernel
@@ -243,13 +258,108 @@ def rwkv_linear_attention_cpu(time_decay, time_first, key, value, state=None, re
     return output, state
 
 
+def _exclusive_cumsum(tensor):
+    # sum_{i < t} tensor_i along the time dimension
+    return torch.cat([torch.zeros_like(tensor[:, :1]), tensor[:, :-1]], dim=1).cumsum(dim=1)
+
+
+def rwkv_linear_attention_cpu_chunked(
+    time_decay, time_first, key, value, state=None, return_state=False, chunk_size=RWKV_CPU_CHUNK_SIZE
+):
+    # Vectorized version of `rwkv_linear_attention_cpu`, used for the prefill when there is no CUDA kernel. With
+    # w = -exp(time_decay), the (real) numerator before time t of a chunk starting with the state (num, den, max) is
+    #    exp(t * w) * (sum_{i < t} exp(k_i - (i + 1) * w) * v_i + exp(max) * num)
+    # so inside a chunk the recurrence is a cumulative sum. The exponents are taken relative to their maximum over the
+    # chunk and in float64; chunks whose exponents are too spread out for that (they would underflow) fall back to
+    # the sequential implementation.
+    _, seq_length, _ = key.size()
+
+    if state is None:
+        num_state = torch.zeros_like(key[:, 0], dtype=torch.float32)
+        den_state = torch.zeros_like(key[:, 0], dtype=torch.float32)
+        max_state = torch.zeros_like(key[:, 0], dtype=torch.float32) - 1e38
+    else:
+        num_state, den_state, max_state = state
+
+    log_time_decay = -torch.exp(time_decay.double())
+    time_first_double = time_first.double()
+
+    outputs = []
+    for start in range(0, seq_length, chunk_size):
+        current_key = key[:, start : start + chunk_size].double()
+        current_value = value[:, start : start + chunk_size].double()
+        current_length = current_key.size(1)
+        decays = torch.arange(current_length + 1, dtype=torch.float64, device=key.device)[None, :, None]
+        decays = decays * log_time_decay
+
+        log_weights = current_key - decays[:, 1:]
+        reference = log_weights.amax(dim=1, keepdim=True)
+        if (reference - log_weights.amin(dim=1, keepdim=True)).max() > RWKV_CPU_MAX_LOG_SPREAD:
+            output, (num_state, den_state, max_state) = rwkv_linear_attention_cpu(
+                time_decay,
+                time_first,
+                key[:, start : start + chunk_size],
+                value[:, start : start + chunk_size],
+                state=[num_state, den_state, max_state],
+            )
+            outputs.append(output)
+            continue
+
+        weights = torch.exp(log_weights - reference)
+        past_den = _exclusive_cumsum(weights)
+        past_num = _exclusive_cumsum(weights * current_value)
+
+        # wkv computation for every t of the chunk: past tokens of the chunk, incoming state and current token
+        past_log_scale = decays[:, :-1] + reference
+        state_log_weight = max_state.double()[:, None] + decays[:, :-1]
+        current_log_weight = current_key + time_first_double
+        max_for_output = torch.maximum(past_log_scale + torch.log(past_den), state_log_weight)
+        max_for_output = torch.maximum(max_for_output, current_log_weight)
+
+        past_scale = torch.exp(past_log_scale - max_for_output)
+        state_weight = torch.exp(state_log_weight - max_for_output)
+        current_weight = torch.exp(current_log_weight - max_for_output)
+        numerator = past_scale * past_num + state_weight * num_state[:, None] + current_weight * current_value
+        denominator = past_scale * past_den + state_weight * den_state[:, None] + current_weight
+        outputs.append((numerator / denominator).to(key.dtype))
+
+        # Update state for next chunk
+        total_den = past_den[:, -1] + weights[:, -1]
+        total_num = past_num[:, -1] + weights[:, -1] * current_value[:, -1]
+        end_log_scale = decays[:, -1] + reference[:, 0]
+        state_end_log_weight = max_state.double() + decays[:, -1]
+        max_for_state = torch.maximum(end_log_scale + torch.log(total_den), state_end_log_weight)
+
+        end_scale = torch.exp(end_log_scale - max_for_state)
+        state_end_weight = torch.exp(state_end_log_weight - max_for_state)
+        num_state = (end_scale * total_num + state_end_weight * num_state).float()
+        den_state = (end_scale * total_den + state_end_weight * den_state).float()
+        max_state = max_for_state.float()
+
+    output = torch.cat(outputs, dim=1)
+
+    if return_state or state is not None:
+        state = [num_state, den_state, max_state]
+
+    return output, state
+
+
 def rwkv_linear_attention(time_decay, time_first, key, value, state=None, return_state=False):
     no_cuda = any(t.device.type != "cuda" for t in [time_decay, time_first, key, value])
     # Launching the CUDA kernel for just one token will actually be slower (there is no for loop in the CPU version
     # in this case).
     one_token = key.size(1) == 1
-    if rwkv_cuda_kernel is None or no_cuda or one_token:
+    if one_token:
         return rwkv_linear_attention_cpu(time_decay, time_first, key, value, state=state, return_state=return_state)
+    elif rwkv_cuda_kernel is None or no_cuda:
+        # The chunked version keeps more activations around, so it is only used for inference (e.g. prefill).
+        if torch.is_grad_enabled() or key.size(0) * key.size(2) > RWKV_CPU_CHUNKED_MAX_WIDTH:
+            return rwkv_linear_attention_cpu(
+                time_decay, time_first, key, value, state=state, return_state=return_state
+            )
+        return rwkv_linear_attention_cpu_chunked(
+            time_decay, time_first, key, value, state=state, return_state=return_state
+        )
     else:
         return RwkvLinearAttention.apply(time_decay, time_first, key, value, state, return_state)
 
@@ -532,6 +642,108 @@ class RwkvCausalLMOutput(ModelOutput):
     attentions: Optional[Tuple[torch.FloatTensor]] = None
 
 
+class RwkvStateStore:
+    """
+    In-memory store of the recurrent states of [`RwkvModel`], keyed by session. Since the state of RWKV summarizes the
+    whole history of a sequence, restoring it lets a conversation resume without reprocessing the previous tokens. The
+    least recently used sessions are evicted once `max_sessions` states are stored, and states can be serialized to
+    bytes (in the safetensors format) to be persisted elsewhere.
+
+    Args:
+        max_sessions (`int`, *optional*):
+            The maximum number of states kept in memory. If not set, states are never evicted.
+        device (`str` or `torch.device`, *optional*, defaults to `"cpu"`):
+            The device the states are stored on.
+
+    Example:
+
+    ```python
+    >>> from transformers import AutoTokenizer, RwkvForCausalLM, RwkvStateStore
+
+    >>> tokenizer = AutoTokenizer.from_pretrained("RWKV/rwkv-4-169m-pile")
+    >>> model = RwkvForCausalLM.from_pretrained("RWKV/rwkv-4-169m-pile")
+    >>> store = RwkvStateStore(max_sessions=1000)
+
+    >>> inputs = tokenizer("Hello, my dog is", return_tensors="pt")
+    >>> outputs = model(**inputs, use_cache=True)
+    >>> store.save("session-0", outputs.state)
+
+    >>> # later on, only the new tokens need to be processed
+    >>> inputs = tokenizer(" very cute", return_tensors="pt")
+    >>> outputs = model(**inputs, state=store.load("session-0"), use_cache=True)
+    ```
+    """
+
+    def __init__(self, max_sessions: Optional[int] = None, device: Union[str, torch.device] = "cpu"):
+        if max_sessions is not None and max_sessions < 1:
+            raise ValueError(f"`max_sessions` has to be a positive integer, but is {max_sessions}.")
+        self.max_sessions = max_sessions
+        self.device = device
+        self._states = OrderedDict()
+
+    def __len__(self):
+        return len(self._states)
+
+    def __contains__(self, session_id: Hashable):
+        return session_id in self._states
+
+    def save(self, session_id: Hashable, state: List[torch.FloatTensor], batch_index: int = 0):
+        """
+        Stores a copy of the state of the sequence `batch_index` of `state` (as returned by [`RwkvModel`]) under
+        `session_id`, replacing any previous state of that session.
+        """
+        self._states[session_id] = [s[batch_index].detach().to(self.device, copy=True) for s in state]
+        self._states.move_to_end(session_id)
+        if self.max_sessions is not None:
+            while len(self._states) > self.max_sessions:
+                self._states.popitem(last=False)
+
+    def load(self, session_id: Hashable, device: Optional[Union[str, torch.device]] = None) -> List[torch.FloatTensor]:
+        """
+        Returns the state of `session_id`, with a batch dimension of 1, that can be passed as `state` to [`RwkvModel`].
+        The returned tensors are copies: running the model on them does not modify the stored state.
+        """
+        return self.load_batch([session_id], device=device)
+
+    def load_batch(
+        self, session_ids: Sequence[Hashable], device: Optional[Union[str, torch.device]] = None
+    ) -> List[torch.FloatTensor]:
+        """
+        Returns the states of `session_ids` stacked along the batch dimension, in the order of `session_ids`.
+        """
+        missing = [session_id for session_id in session_ids if session_id not in self._states]
+        if len(missing) > 0:
+            raise KeyError(f"No state is stored for the sessions {missing}.")
+        for session_id in session_ids:
+            self._states.move_to_end(session_id)
+        states = [self._states[session_id] for session_id in session_ids]
+        device = self.device if device is None else device
+        return [torch.stack(tensors).to(device) for tensors in zip(*states)]
+
+    def delete(self, session_id: Hashable):
+        """
+        Removes the state of `session_id` from the store, if any.
+        """
+        self._states.pop(session_id, None)
+
+    def to_bytes(self, session_id: Hashable) -> bytes:
+        """
+        Serializes the state of `session_id` to bytes, in the safetensors format.
+        """
+        if session_id not in self._states:
+            raise KeyError(f"No state is stored for the session {session_id}.")
+        state = self._states[session_id]
+        return safetensors_save({f"state_{i}": s.contiguous().cpu() for i, s in enumerate(state)})
+
+    def from_bytes(self, session_id: Hashable, data: bytes):
+        """
+        Restores under `session_id` a state serialized with [`~RwkvStateStore.to_bytes`].
+        """
+        tensors = safetensors_load(data)
+        state = [tensors[f"state_{i}"] for i in range(len(tensors))]
+        self.save(session_id, [s[None] for s in state])
+
+
 RWKV_START_DOCSTRING = r"""
 
     This model inherits from [`PreTrainedModel`]. Check the superclass documentation for the generic methods the
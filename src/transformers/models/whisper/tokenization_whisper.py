@@ -20,7 +20,7 @@ from typing import List, Optional, Tuple, Union
 import numpy as np
 import regex as re
 
-from ...tokenization_utils import AddedToken, PreTrainedTokenizer
+from ...tokenization_utils import AddedToken, LRUCache, PreTrainedTokenizer
 from ...utils import logging
 from .english_normalizer import EnglishTextNormalizer
 
@@ -295,7 +295,7 @@ class WhisperTokenizer(PreTrainedTokenizer):
             bpe_merges = merges_handle.read().split("\n")[1:-1]
         bpe_merges = [tuple(merge.split()) for merge in bpe_merges]
         self.bpe_ranks = dict(zip(bpe_merges, range(len(bpe_merges))))
-        self.cache = {}
+        self.cache = LRUCache()
         self.add_prefix_space = add_prefix_space
 
         if normalizer_file is not None:
@@ -975,6 +975,90 @@ def _decode_asr(tokenizer, model_outputs, *, return_timestamps, return_language,
     return full_text, optional
 
 
+def _count_overlap_matches(sequence_left, sequence_right):
+    """
+    Counts the matching tokens of every overlap of the end of `sequence_left` with the start of `sequence_right`.
+
+    Returns an array `matches` of length `len(sequence_left) + len(sequence_right) - 1` where `matches[i - 1]` is the
+    number of equal tokens when the last `i` positions of `sequence_left` are aligned with the first `i` positions of
+    `sequence_right` (positions outside one of the sequences don't match). Each overlap is a diagonal of the matrix of
+    equal tokens, so all of them are counted at once.
+    """
+    sequence_left = np.asarray(sequence_left)
+    sequence_right = np.asarray(sequence_right)
+    left_length, right_length = len(sequence_left), len(sequence_right)
+    if left_length == 0 or right_length == 0:
+        return np.zeros(max(left_length + right_length - 1, 0), dtype=np.int64)
+    left_indices, right_indices = np.nonzero(sequence_left[:, None] == sequence_right[None, :])
+    # Overlap of length `i` <=> `left_index - right_index == left_length - i`
+    return np.bincount(left_length - left_indices + right_indices - 1, minlength=left_length + right_length - 1)
+
+
+def _find_longest_common_substring(sequence_left, sequence_right):
+    """
+    Finds the longest run of consecutive tokens common to `sequence_left` and `sequence_right`.
+
+    Returns `(index_left, index_right, length)`, the start of the run in both sequences (the last run in
+    `sequence_left`, then in `sequence_right`, when there are several of the same length) and its length, or
+    `(-1, -1, 0)` when the sequences have no token in common. The runs are the consecutive matches along the
+    diagonals of the matrix of equal tokens, all found at once.
+    """
+    sequence_left = np.asarray(sequence_left)
+    sequence_right = np.asarray(sequence_right)
+    if len(sequence_left) == 0 or len(sequence_right) == 0:
+        return -1, -1, 0
+    left_indices, right_indices = np.nonzero(sequence_left[:, None] == sequence_right[None, :])
+    if len(left_indices) == 0:
+        return -1, -1, 0
+    # Sort the matches by diagonal, then along the diagonal
+    diagonals = right_indices - left_indices
+    order = np.lexsort((left_indices, diagonals))
+    left_indices, diagonals = left_indices[order], diagonals[order]
+    # A run starts at each match which doesn't follow the previous one on the same diagonal
+    run_starts = np.ones(len(order), dtype=bool)
+    run_starts[1:] = (diagonals[1:] != diagonals[:-1]) | (left_indices[1:] != left_indices[:-1] + 1)
+    run_lengths = np.bincount(np.cumsum(run_starts) - 1)
+    run_ends = np.flatnonzero(np.append(run_starts[1:], True))
+    longest = run_lengths.max()
+    # The last of the longest runs, by the position of its end in the left sequence, then in the right one
+    longest_ends = run_ends[run_lengths == longest]
+    end_left = left_indices[longest_ends]
+    end_right = end_left + diagonals[longest_ends]
+    best = np.lexsort((end_right, end_left))[-1]
+    return int(end_left[best] + 1 - longest), int(end_right[best] + 1 - longest), int(longest)
+
+
+def _find_overlap_midpoints(left_sequence, right_sequence):
+    """
+    Finds the best overlap of the end of `left_sequence` with the start of `right_sequence`, and returns the indices
+    `(left_mid, right_mid)` of its middle in both sequences: the merged sequence is `left_sequence[:left_mid] +
+    right_sequence[right_mid:]`.
+    """
+    left_length, right_length = len(left_sequence), len(right_sequence)
+    matches = _count_overlap_matches(left_sequence, right_sequence)
+    overlaps = np.arange(1, left_length + right_length)
+    # epsilon to favor long perfect matches
+    matching = np.where(matches > 1, matches / overlaps + overlaps / 10000.0, 0.0)
+    if matching.size > 0 and matching.max() > 0:
+        # The first best overlap
+        i = int(np.argmax(matching)) + 1
+        left_start = max(0, left_length - i)
+        left_stop = min(left_length, left_length + right_length - i)
+        right_start = max(0, i - left_length)
+        right_stop = min(right_length, i)
+    else:
+        left_start, left_stop, right_start, right_stop = left_length, left_length, 0, 0
+
+    # This is a small conflict optimization since those sequences overlap
+    # in audio.
+    # We're going to give more confidence to the left sequence
+    # for the left of the overlap,
+    # and to the right of the sequence, for the right of the overlap
+    left_mid = (left_stop + left_start) // 2
+    right_mid = (right_stop + right_start) // 2
+    return left_mid, right_mid
+
+
 def _find_longest_common_sequence(sequences, token_timestamp_sequences=None):
     # It would be much harder to do O(n) because of fault tolerance.
     # We actually have a really good property which is that the total sequence
@@ -983,7 +1067,6 @@ def _find_longest_common_sequence(sequences, token_timestamp_sequences=None):
     # exactly the same way.
 
     left_sequence = sequences[0]
-    left_length = len(left_sequence)
     total_sequence = []
 
     if token_timestamp_sequences:
@@ -991,10 +1074,7 @@ def _find_longest_common_sequence(sequences, token_timestamp_sequences=None):
         total_token_timestamp_sequence = []
 
     for seq_idx, right_sequence in enumerate(sequences[1:]):
-        # index = 0
-        max_ = 0.0
-        max_indices = (left_length, left_length, 0, 0)
-        # Here we're sliding matches
+        # We're sliding the right sequence along the left one, and scoring each overlap of `i` tokens
         # [a, b, c, d]
         #          [c, d, f]
         # =        [c] == [d]
@@ -1023,46 +1103,9 @@ def _find_longest_common_sequence(sequences, token_timestamp_sequences=None):
         # [f]
         #
         # [a] == [f]
-        right_length = len(right_sequence)
-        for i in range(1, left_length + right_length):
-            # epsilon to favor long perfect matches
-            eps = i / 10000.0
-
-            # Slightly convoluted because we don't want out of bound indices
-            # This will be necessary for a small conflict resolution optimization
-            # later
-            left_start = max(0, left_length - i)
-            left_stop = min(left_length, left_length + right_length - i)
-            left = np.array(left_sequence[left_start:left_stop])
-
-            right_start = max(0, i - left_length)
-            right_stop = min(right_length, i)
-            right = np.array(right_sequence[right_start:right_stop])
-
-            # We can only match subsequences of the same size.
-            if len(left) != len(right):
-                raise RuntimeError(
-                    "There is a bug within whisper `decode_asr` function, please report it. Dropping to prevent bad inference."
-                )
-
-            matches = np.sum(left == right)
-            matching = matches / i + eps
-            if matches > 1 and matching > max_:
-                max_ = matching
-                max_indices = (left_start, left_stop, right_start, right_stop)
-
-        (left_start, left_stop, right_start, right_stop) = max_indices
-
-        # This is a small conflict optimization since those sequences overlap
-        # in audio.
-        # We're going to give more confidence to the left sequence
-        # for the left of the overlap,
-        # and to the right of the sequence, for the right of the overlap
-        left_mid = (left_stop + left_start) // 2
-        right_mid = (right_stop + right_start) // 2
+        left_mid, right_mid = _find_overlap_midpoints(left_sequence, right_sequence)
         total_sequence.extend(left_sequence[:left_mid])
         left_sequence = right_sequence[right_mid:]
-        left_length = len(left_sequence)
 
         if token_timestamp_sequences:
             total_token_timestamp_sequence.extend(left_token_timestamp_sequence[:left_mid])
@@ -42,6 +42,41 @@ def ffmpeg_read(bpayload: bytes, sampling_rate: int) -> np.array:
     return audio
 
 
+def ffmpeg_read_stream(filename: str, sampling_rate: int, block_length_s: float = 1.0):
+    """
+    Helper function to read an audio file through ffmpeg as a generator of blocks of `block_length_s` seconds, so the
+    whole file never needs to be in memory.
+    """
+    ar = f"{sampling_rate}"
+    ac = "1"
+    format_for_conversion = "f32le"
+    size_of_sample = 4
+    ffmpeg_command = [
+        "ffmpeg",
+        "-i",
+        filename,
+        "-ac",
+        ac,
+        "-ar",
+        ar,
+        "-f",
+        format_for_conversion,
+        "-hide_banner",
+        "-loglevel",
+        "quiet",
+        "pipe:1",
+    ]
+    block_len = int(round(sampling_rate * block_length_s)) * size_of_sample
+    leftover = b""
+    for raw in _ffmpeg_stream(ffmpeg_command, block_len):
+        raw = leftover + raw
+        # A read can end in the middle of a sample
+        length = len(raw) - len(raw) % size_of_sample
+        leftover = raw[length:]
+        if length:
+            yield np.frombuffer(raw[:length], dtype=np.float32)
+
+
 def ffmpeg_microphone(
     sampling_rate: int,
     chunk_length_s: float,
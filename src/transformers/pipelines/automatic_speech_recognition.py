@@ -12,11 +12,17 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 from collections import defaultdict
-from typing import TYPE_CHECKING, Dict, Optional, Union
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional, Union
 
 import numpy as np
 import requests
 
+from ..models.whisper.tokenization_whisper import (
+    LANGUAGES,
+    _count_overlap_matches,
+    _find_longest_common_substring,
+    _find_overlap_midpoints,
+)
 from ..utils import is_torch_available, is_torchaudio_available, logging
 from .audio_utils import ffmpeg_read
 from .base import ChunkPipeline
@@ -53,19 +59,61 @@ def rescale_stride(stride, ratio):
     return new_strides
 
 
-def chunk_iter(inputs, feature_extractor, chunk_len, stride_left, stride_right, rescale=True, dtype=None):
-    inputs_len = inputs.shape[0]
+def _slice_chunks(blocks, chunk_len, stride_left, stride_right):
+    """
+    Slices the audio made of the concatenation of `blocks` into chunks of `chunk_len` samples overlapping by
+    `stride_left + stride_right` samples, and yields `(chunk, stride_left, stride_right, is_last)` for each of them.
+
+    A chunk is yielded as soon as it is known not to be the last one, so only the samples of the current chunk and of
+    the last block are kept in memory.
+    """
     step = chunk_len - stride_left - stride_right
-    for chunk_start_idx in range(0, inputs_len, step):
+    if step <= 0:
+        raise ValueError("Chunk length must be superior to stride length")
+    buffer = None
+    # Position of the first sample of `buffer` in the audio
+    buffer_start = 0
+    chunk_start_idx = 0
+    for block in blocks:
+        if buffer is None:
+            buffer = block
+        else:
+            # Drop the samples of the chunks already yielded
+            buffer = np.concatenate([buffer[chunk_start_idx - buffer_start :], block])
+            buffer_start = chunk_start_idx
+        # Without right stride, the last chunk is the one reaching the end of the audio, so we need one more sample
+        # to know it is not the one.
+        while buffer_start + buffer.shape[0] >= chunk_start_idx + chunk_len + (stride_right == 0):
+            chunk = buffer[chunk_start_idx - buffer_start : chunk_start_idx - buffer_start + chunk_len]
+            yield chunk, 0 if chunk_start_idx == 0 else stride_left, stride_right, False
+            chunk_start_idx += step
+
+    if buffer is None:
+        return
+    inputs_len = buffer_start + buffer.shape[0]
+    for chunk_start_idx in range(chunk_start_idx, inputs_len, step):
         chunk_end_idx = chunk_start_idx + chunk_len
-        chunk = inputs[chunk_start_idx:chunk_end_idx]
-        processed = feature_extractor(chunk, sampling_rate=feature_extractor.sampling_rate, return_tensors="pt")
-        if dtype is not None:
-            processed = processed.to(dtype=dtype)
+        chunk = buffer[chunk_start_idx - buffer_start : chunk_end_idx - buffer_start]
         _stride_left = 0 if chunk_start_idx == 0 else stride_left
         # all right strides must be full, otherwise it is the last item
         is_last = chunk_end_idx > inputs_len if stride_right > 0 else chunk_end_idx >= inputs_len
         _stride_right = 0 if is_last else stride_right
+        if chunk.shape[0] > _stride_left:
+            yield chunk, _stride_left, _stride_right, is_last
+        if is_last:
+            break
+
+
+def chunk_iter(inputs, feature_extractor, chunk_len, stride_left, stride_right, rescale=True, dtype=None):
+    """
+    Yields the processed chunks of `inputs`, a waveform or an iterator of consecutive blocks of a waveform.
+    """
+    # A single waveform (a numpy array or a tensor) or blocks of it
+    blocks = [inputs] if hasattr(inputs, "shape") else inputs
+    for chunk, _stride_left, _stride_right, is_last in _slice_chunks(blocks, chunk_len, stride_left, stride_right):
+        processed = feature_extractor(chunk, sampling_rate=feature_extractor.sampling_rate, return_tensors="pt")
+        if dtype is not None:
+            processed = processed.to(dtype=dtype)
 
         chunk_len = chunk.shape[0]
         stride = (chunk_len, _stride_left, _stride_right)
@@ -76,30 +124,70 @@ def chunk_iter(inputs, feature_extractor, chunk_len, stride_left, stride_right,
         if processed_len != chunk.shape[-1] and rescale:
             ratio = processed_len / chunk_len
             stride = rescale_stride([stride], ratio)[0]
-        if chunk.shape[0] > _stride_left:
-            yield {"is_last": is_last, "stride": stride, **processed}
-        if is_last:
-            break
+        yield {"is_last": is_last, "stride": stride, **processed}
+
+
+class _IncrementalDecoder:
+    """
+    Decodes a growing sequence of ids into text, returning only the text that later ids can no longer change: the text
+    up to the last space. Only the ids of the last `window` to `2 * window` tokens are kept once their text is emitted.
+    """
 
+    def __init__(self, decode, window=64):
+        self.decode = decode
+        self.window = window
+        self.ids = []
+        self.emitted = ""
+
+    def add(self, ids):
+        self.ids.extend(ids)
+        text = self.decode(self.ids)
+        stable = text[: text.rfind(" ") + 1]
+        new_text = ""
+        if len(stable) > len(self.emitted) and stable.startswith(self.emitted):
+            new_text = stable[len(self.emitted) :]
+            self.emitted = stable
+
+        if len(self.ids) > 2 * self.window:
+            # Forget the ids of the emitted text, if decoding them separately doesn't change the rest of the text
+            start = len(self.ids) - self.window
+            tail_text = self.decode(self.ids[start:])
+            head_length = len(text) - len(tail_text)
+            if text.endswith(tail_text) and head_length <= len(self.emitted):
+                self.ids = self.ids[start:]
+                self.emitted = self.emitted[head_length:]
+        return new_text
+
+    def flush(self):
+        text = self.decode(self.ids)
+        new_text = text[len(self.emitted) :] if text.startswith(self.emitted) else ""
+        self.ids = []
+        self.emitted = ""
+        return new_text
+
+
+class _IncrementalSequenceMerger:
+    """
+    Merges the overlapping token sequences of consecutive chunks like `_find_longest_common_sequence` of Whisper, one
+    sequence at a time: `add` returns the tokens that the next sequences can no longer change.
+    """
 
-def _fast_find_longest_common_sequence(sequence_left, sequence_right):
-    seq_len_left = len(sequence_left)
-    seq_len_right = len(sequence_right)
-    counter = [[0] * (seq_len_right + 1) for _ in range(seq_len_left + 1)]
-    longest = 0
-    for i in range(seq_len_left):
-        for j in range(seq_len_right):
-            if sequence_left[i] == sequence_right[j]:
-                previous_counter = counter[i][j] + 1
-                counter[i + 1][j + 1] = previous_counter
-                if previous_counter > longest:
-                    longest = previous_counter
+    def __init__(self):
+        self.left_sequence = None
 
-    counter = np.array(counter)
-    # we return the idx of the first element of the longest common sequence in the left sequence
-    index_left = np.argwhere(counter == longest)[-1][0] - longest if longest != 0 else -1
-    index_right = np.argwhere(counter == longest)[-1][1] - longest if longest != 0 else -1
-    return index_left, index_right, longest
+    def add(self, sequence):
+        if self.left_sequence is None:
+            self.left_sequence = sequence
+            return []
+        left_mid, right_mid = _find_overlap_midpoints(self.left_sequence, sequence)
+        stable = self.left_sequence[:left_mid]
+        self.left_sequence = sequence[right_mid:]
+        return stable
+
+    def flush(self):
+        sequence = self.left_sequence if self.left_sequence is not None else []
+        self.left_sequence = None
+        return sequence
 
 
 def _find_longest_common_sequence(sequences, tokenizer):
@@ -113,16 +201,13 @@ def _find_longest_common_sequence(sequences, tokenizer):
     for new_seq in sequences[1:]:
         new_sequence = [tok_id for tok_id in new_seq[0].tolist() if tok_id not in tokenizer.all_special_ids]
 
-        index = 0
-        max_ = 0.0
-        for i in range(1, len(new_sequence) + 1):
-            # epsilon to favor long perfect matches
-            eps = i / 10000.0
-            matches = np.sum(np.array(sequence[-i:]) == np.array(new_sequence[:i]))
-            matching = matches / i + eps
-            if matches > 1 and matching > max_:
-                index = i
-                max_ = matching
+        # Number of matches when the last `i` tokens of `sequence` are aligned with the first `i` of `new_sequence`,
+        # for `i` up to the length of the shortest of them
+        overlaps = np.arange(1, min(len(sequence), len(new_sequence)) + 1)
+        matches = _count_overlap_matches(sequence, new_sequence)[: len(overlaps)]
+        # epsilon to favor long perfect matches
+        matching = np.where(matches > 1, matches / overlaps + overlaps / 10000.0, 0.0)
+        index = int(np.argmax(matching)) + 1 if matching.size > 0 and matching.max() > 0 else 0
         sequence.extend(new_sequence[index:])
     return np.array(sequence)
 
@@ -271,6 +356,97 @@ class AutomaticSpeechRecognitionPipeline(ChunkPipeline):
         """
         return super().__call__(inputs, **kwargs)
 
+    def stream(
+        self,
+        audio: Iterable[np.ndarray],
+        chunk_length_s: float,
+        stride_length_s: Optional[float] = None,
+        generate_kwargs: Optional[Dict] = None,
+        max_new_tokens: Optional[int] = None,
+    ) -> Iterator[Dict]:
+        """
+        Transcribe an audio stream, chunk by chunk, as its blocks come. Only available for CTC models (without
+        language model) and Whisper.
+
+        The audio is chunked like with `chunk_length_s` in [`~AutomaticSpeechRecognitionPipeline.__call__`], but a chunk
+        is run as soon as its samples are read, and the text its right stride can no longer change is returned right
+        away. Only the current chunk and a few tokens are kept in memory, whatever the length of the audio.
+
+        Args:
+            audio (`Iterable[np.ndarray]`):
+                The consecutive blocks of the audio, 1-D arrays of any length at the sampling rate of the feature
+                extractor, e.g. read from a file with `transformers.pipelines.audio_utils.ffmpeg_read_stream`.
+            chunk_length_s (`float`):
+                The length of the chunks run by the model.
+            stride_length_s (`float` or `Tuple[float, float]`, *optional*, defaults to `chunk_length_s / 6`):
+                The length of the stride on the left and right of each chunk.
+            generate_kwargs (`dict`, *optional*):
+                The dictionary of ad-hoc parametrization of `generate_config` to be used for the generation call
+                (Whisper only).
+            max_new_tokens (`int`, *optional*):
+                The maximum numbers of tokens to generate, ignoring the number of tokens in the prompt (Whisper only).
+
+        Return:
+            A generator of dictionaries, one per chunk, with the following keys:
+                - **text** (`str`) -- The new text of the transcription, which can be empty. Joining the texts of all
+                  the chunks gives the whole transcription.
+                - **is_last** (`bool`) -- Whether this is the last chunk of the audio.
+        """
+        if self.type not in {"ctc", "seq2seq_whisper"}:
+            raise ValueError("Streaming is only available for CTC models without language model and Whisper.")
+        if not chunk_length_s:
+            raise ValueError("Streaming requires a `chunk_length_s` to chunk the audio.")
+
+        _, forward_params, _ = self._sanitize_parameters(
+            generate_kwargs=generate_kwargs, max_new_tokens=max_new_tokens
+        )
+        forward_params = {**self._forward_params, **forward_params}
+        forward_params.pop("return_timestamps", None)
+        chunk_len, stride_left, stride_right = self._get_chunk_lengths(chunk_length_s, stride_length_s)
+        rescale = self.type != "seq2seq_whisper"
+
+        if self.type == "ctc":
+            decoder = _IncrementalDecoder(lambda ids: self.tokenizer.decode(ids, skip_special_tokens=False))
+        else:
+            decoder = _IncrementalDecoder(self.tokenizer.decode)
+            merger = _IncrementalSequenceMerger()
+            timestamp_begin = self.tokenizer.convert_tokens_to_ids("<|notimestamps|>") + 1
+            all_special_ids = set(self.tokenizer.all_special_ids)
+            last_language = None
+
+        for model_inputs in chunk_iter(
+            audio, self.feature_extractor, chunk_len, stride_left, stride_right, rescale, self.torch_dtype
+        ):
+            model_outputs = self.forward(model_inputs, **forward_params)
+            is_last = model_outputs["is_last"]
+            if self.type == "ctc":
+                # The stride of the logits, the padding can make them longer than the chunk
+                total_n, left, right = model_outputs["stride"]
+                text = decoder.add(model_outputs["tokens"][0, left : total_n - right].tolist())
+            else:
+                text = ""
+                tokens = []
+                for token in model_outputs["tokens"][0].tolist():
+                    if token in all_special_ids:
+                        language = LANGUAGES.get(self.tokenizer.decode([token])[2:-2], None)
+                        if language is not None:
+                            if last_language is not None and language != last_language:
+                                # Like the chunks of text of `_decode_asr`, the languages are not merged together
+                                if tokens:
+                                    text += decoder.add(merger.add(tokens))
+                                text += decoder.add(merger.flush()) + decoder.flush()
+                                tokens = []
+                            last_language = language
+                    elif token < timestamp_begin:
+                        tokens.append(token)
+                if tokens:
+                    text += decoder.add(merger.add(tokens))
+            if is_last:
+                if self.type == "seq2seq_whisper":
+                    text += decoder.add(merger.flush())
+                text += decoder.flush()
+            yield {"text": text, "is_last": is_last}
+
     def _sanitize_parameters(
         self,
         chunk_length_s=None,
@@ -313,6 +489,28 @@ class AutomaticSpeechRecognitionPipeline(ChunkPipeline):
 
         return preprocess_params, forward_params, postprocess_params
 
+    def _get_chunk_lengths(self, chunk_length_s, stride_length_s=None):
+        """
+        Converts `chunk_length_s` and `stride_length_s` to numbers of samples `(chunk_len, stride_left, stride_right)`.
+        """
+        if stride_length_s is None:
+            stride_length_s = chunk_length_s / 6
+
+        if isinstance(stride_length_s, (int, float)):
+            stride_length_s = [stride_length_s, stride_length_s]
+
+        # XXX: Carefuly, this variable will not exist in `seq2seq` setting.
+        # Currently chunking is not possible at this level for `seq2seq` so
+        # it's ok.
+        align_to = getattr(self.model.config, "inputs_to_logits_ratio", 1)
+        chunk_len = int(round(chunk_length_s * self.feature_extractor.sampling_rate / align_to) * align_to)
+        stride_left = int(round(stride_length_s[0] * self.feature_extractor.sampling_rate / align_to) * align_to)
+        stride_right = int(round(stride_length_s[1] * self.feature_extractor.sampling_rate / align_to) * align_to)
+
+        if chunk_len < stride_left + stride_right:
+            raise ValueError("Chunk length must be superior to stride length")
+        return chunk_len, stride_left, stride_right
+
     def preprocess(self, inputs, chunk_length_s=0, stride_length_s=None, ignore_warning=False):
         if isinstance(inputs, str):
             if inputs.startswith("http://") or inputs.startswith("https://"):
@@ -387,22 +585,7 @@ class AutomaticSpeechRecognitionPipeline(ChunkPipeline):
                     " ignore_warning=True)"
                 )
                 self._preprocess_params["ignore_warning"] = True
-            if stride_length_s is None:
-                stride_length_s = chunk_length_s / 6
-
-            if isinstance(stride_length_s, (int, float)):
-                stride_length_s = [stride_length_s, stride_length_s]
-
-            # XXX: Carefuly, this variable will not exist in `seq2seq` setting.
-            # Currently chunking is not possible at this level for `seq2seq` so
-            # it's ok.
-            align_to = getattr(self.model.config, "inputs_to_logits_ratio", 1)
-            chunk_len = int(round(chunk_length_s * self.feature_extractor.sampling_rate / align_to) * align_to)
-            stride_left = int(round(stride_length_s[0] * self.feature_extractor.sampling_rate / align_to) * align_to)
-            stride_right = int(round(stride_length_s[1] * self.feature_extractor.sampling_rate / align_to) * align_to)
-
-            if chunk_len < stride_left + stride_right:
-                raise ValueError("Chunk length must be superior to stride length")
+            chunk_len, stride_left, stride_right = self._get_chunk_lengths(chunk_length_s, stride_length_s)
 
             rescale = self.type != "seq2seq_whisper"
             # make sure that
@@ -639,7 +822,7 @@ def _find_timestamp_sequence(sequences, tokenizer, feature_extractor, max_source
                         break  # the previous sequence is too far in the past
                     if len(previous_tokens) > 0:
                         # find the longest common sequence between the overlapping parts
-                        index_left, index_right, match_length = _fast_find_longest_common_sequence(
+                        index_left, index_right, match_length = _find_longest_common_substring(
                             sequence[1:relevant_timestamp], previous_tokens
                         )
                         # don't do anything if only 1 token was matched
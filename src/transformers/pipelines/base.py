@@ -13,6 +13,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import collections
+import copy
 import csv
 import importlib
 import json
@@ -36,6 +37,7 @@ from ..modelcard import ModelCard
 from ..models.auto.configuration_auto import AutoConfig
 from ..tokenization_utils import PreTrainedTokenizer
 from ..utils import ModelOutput, add_end_docstrings, infer_framework, is_tf_available, is_torch_available, logging
+from .result_cache import PipelineResultCache, get_result_cache_key
 
 
 GenericTensor = Union[List["GenericTensor"], "torch.Tensor", "tf.Tensor"]
@@ -713,6 +715,22 @@ PIPELINE_INIT_ARGS = r"""
             When the pipeline will use *DataLoader* (when passing a dataset, on GPU for a Pytorch model), the size of
             the batch to use, for inference this is not always beneficial, please read [Batching with
             pipelines](https://huggingface.co/transformers/main_classes/pipelines.html#pipeline-batching) .
+        bucket_window (`int`, *optional*):
+            When the pipeline will use *DataLoader* and batch its inputs, the number of preprocessed inputs which are
+            read ahead and sorted by length, so that inputs of similar lengths are batched together. The outputs are
+            still returned in the order of the inputs.
+        max_batch_tokens (`int`, *optional*):
+            Used with `bucket_window`: the batches are built with as many inputs as possible as long as their size times
+            the length of their longest input does not exceed `max_batch_tokens`, instead of `batch_size` inputs.
+        num_threads (`int`, *optional*):
+            When the pipeline will use *DataLoader*, the number of threads preprocessing the inputs ahead and
+            postprocessing the outputs while the model runs, instead of running the three steps one after the other.
+            This also works with generators and iterable datasets, and the outputs are still returned in the order of
+            the inputs. The inputs are then preprocessed in the main process, `num_workers` is ignored.
+        result_cache ([`~pipelines.PipelineResultCache`], *optional*):
+            A cache of the results of the pipeline, looked up before running the pipeline on a single input or on each
+            input of a list, with the parameters of the call and the name and commit hash of the model. It is not used
+            for generators and datasets, nor when the model samples its generations or is in training mode.
         args_parser ([`~pipelines.ArgumentHandler`], *optional*):
             Reference to the object in charge of parsing supplied pipeline parameters.
         device (`int`, *optional*, defaults to -1):
@@ -724,10 +742,12 @@ PIPELINE_INIT_ARGS = r"""
 
 if is_torch_available():
     from transformers.pipelines.pt_utils import (
+        PipelineBucketIterator,
         PipelineChunkIterator,
         PipelineDataset,
         PipelineIterator,
         PipelinePackIterator,
+        PipelineThreadedIterator,
     )
 
 
@@ -813,6 +833,10 @@ class Pipeline(_ScikitCompat):
         self.call_count = 0
         self._batch_size = kwargs.pop("batch_size", None)
         self._num_workers = kwargs.pop("num_workers", None)
+        self._bucket_window = kwargs.pop("bucket_window", None)
+        self._max_batch_tokens = kwargs.pop("max_batch_tokens", None)
+        self._num_threads = kwargs.pop("num_threads", None)
+        self.result_cache: Optional[PipelineResultCache] = kwargs.pop("result_cache", None)
         self._preprocess_params, self._forward_params, self._postprocess_params = self._sanitize_parameters(**kwargs)
 
         if self.image_processor is None and self.feature_extractor is not None:
@@ -965,6 +989,19 @@ class Pipeline(_ScikitCompat):
                 f" {supported_models}."
             )
 
+    def _set_unpad_inputs(self, unpad_inputs: bool):
+        """
+        Sets `config.unpad_inputs` on models that can pack the sequences of a padded batch together, so that no compute
+        is spent on padding tokens when running with `batch_size > 1`.
+
+        Args:
+            unpad_inputs (`bool`):
+                Whether or not the model should skip the padding tokens.
+        """
+        if self.framework != "pt" or not hasattr(self.model.config, "unpad_inputs"):
+            raise ValueError(f"The model '{self.model.__class__.__name__}' does not support `unpad_inputs`.")
+        self.model.config.unpad_inputs = unpad_inputs
+
     @abstractmethod
     def _sanitize_parameters(self, **pipeline_parameters):
         """
@@ -1031,10 +1068,83 @@ class Pipeline(_ScikitCompat):
                 raise ValueError(f"Framework {self.framework} is not supported")
         return model_outputs
 
+    def _get_model_iterator(
+        self,
+        dataset,
+        num_workers: int,
+        batch_size: int,
+        forward_params,
+        bucket_window: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        iterator_class=None,
+    ):
+        """
+        Returns the iterator of the outputs of `forward` on the preprocessed items of `dataset`, one output per item.
+        With `bucket_window`, items of similar lengths are batched together.
+        """
+        if max_batch_tokens is not None and bucket_window is None:
+            raise ValueError("`max_batch_tokens` can only be used along with `bucket_window`.")
+        iterator_class = iterator_class if iterator_class is not None else PipelineIterator
+
+        # TODO hack by collating feature_extractor and image_processor
+        feature_extractor = self.feature_extractor if self.feature_extractor is not None else self.image_processor
+        if bucket_window is not None and bucket_window > 1 and (batch_size > 1 or max_batch_tokens is not None):
+            dataloader = DataLoader(dataset, num_workers=num_workers, batch_size=1, collate_fn=no_collate_fn)
+            model_iterator = PipelineBucketIterator(
+                dataloader,
+                self.forward,
+                forward_params,
+                collate_fn=pad_collate_fn(self.tokenizer, feature_extractor),
+                batch_size=batch_size,
+                window_size=bucket_window,
+                max_batch_tokens=max_batch_tokens,
+            )
+            if iterator_class is PipelineIterator:
+                return model_iterator
+            # The items are already unbatched, only the packing of the chunks is left
+            return iterator_class(model_iterator, lambda item: item, {})
+
+        collate_fn = no_collate_fn if batch_size == 1 else pad_collate_fn(self.tokenizer, feature_extractor)
+        dataloader = DataLoader(dataset, num_workers=num_workers, batch_size=batch_size, collate_fn=collate_fn)
+        return iterator_class(dataloader, self.forward, forward_params, loader_batch_size=batch_size)
+
+    @staticmethod
+    def _check_num_workers_with_threads(num_workers: int, num_threads: Optional[int]) -> int:
+        if num_threads and num_workers > 0:
+            logger.warning(
+                "With `num_threads`, the inputs are preprocessed by threads of the main process, setting"
+                " `num_workers=0`."
+            )
+            return 0
+        return num_workers
+
+    @staticmethod
+    def _get_max_pending(num_threads: int, batch_size: int, bucket_window: Optional[int]) -> int:
+        # Enough preprocessed inputs to build the next batches while the model runs on the current one
+        return 2 * max(num_threads, batch_size, bucket_window or 1)
+
     def get_iterator(
-        self, inputs, num_workers: int, batch_size: int, preprocess_params, forward_params, postprocess_params
+        self,
+        inputs,
+        num_workers: int,
+        batch_size: int,
+        preprocess_params,
+        forward_params,
+        postprocess_params,
+        bucket_window: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        num_threads: Optional[int] = None,
     ):
-        if isinstance(inputs, collections.abc.Sized):
+        num_workers = self._check_num_workers_with_threads(num_workers, num_threads)
+        if num_threads:
+            dataset = PipelineThreadedIterator(
+                inputs,
+                self.preprocess,
+                preprocess_params,
+                num_threads,
+                max_pending=self._get_max_pending(num_threads, batch_size, bucket_window),
+            )
+        elif isinstance(inputs, collections.abc.Sized):
             dataset = PipelineDataset(inputs, self.preprocess, preprocess_params)
         else:
             if num_workers > 1:
@@ -1048,15 +1158,25 @@ class Pipeline(_ScikitCompat):
         if "TOKENIZERS_PARALLELISM" not in os.environ:
             logger.info("Disabling tokenizer parallelism, we're using DataLoader multithreading already")
             os.environ["TOKENIZERS_PARALLELISM"] = "false"
-        # TODO hack by collating feature_extractor and image_processor
-        feature_extractor = self.feature_extractor if self.feature_extractor is not None else self.image_processor
-        collate_fn = no_collate_fn if batch_size == 1 else pad_collate_fn(self.tokenizer, feature_extractor)
-        dataloader = DataLoader(dataset, num_workers=num_workers, batch_size=batch_size, collate_fn=collate_fn)
-        model_iterator = PipelineIterator(dataloader, self.forward, forward_params, loader_batch_size=batch_size)
+        model_iterator = self._get_model_iterator(
+            dataset, num_workers, batch_size, forward_params, bucket_window, max_batch_tokens
+        )
+        if num_threads:
+            return PipelineThreadedIterator(model_iterator, self.postprocess, postprocess_params, num_threads)
         final_iterator = PipelineIterator(model_iterator, self.postprocess, postprocess_params)
         return final_iterator
 
-    def __call__(self, inputs, *args, num_workers=None, batch_size=None, **kwargs):
+    def __call__(
+        self,
+        inputs,
+        *args,
+        num_workers=None,
+        batch_size=None,
+        bucket_window=None,
+        max_batch_tokens=None,
+        num_threads=None,
+        **kwargs,
+    ):
         if args:
             logger.warning(f"Ignoring args : {args}")
 
@@ -1070,6 +1190,20 @@ class Pipeline(_ScikitCompat):
                 batch_size = 1
             else:
                 batch_size = self._batch_size
+        if bucket_window is None:
+            bucket_window = self._bucket_window
+        if max_batch_tokens is None:
+            max_batch_tokens = self._max_batch_tokens
+        if num_threads is None:
+            num_threads = self._num_threads
+        # Only passed when set, to keep working with `get_iterator` overrides which don't support them
+        iterator_params = {}
+        if bucket_window is not None:
+            iterator_params["bucket_window"] = bucket_window
+        if max_batch_tokens is not None:
+            iterator_params["max_batch_tokens"] = max_batch_tokens
+        if num_threads is not None:
+            iterator_params["num_threads"] = num_threads
 
         preprocess_params, forward_params, postprocess_params = self._sanitize_parameters(**kwargs)
 
@@ -1086,6 +1220,23 @@ class Pipeline(_ScikitCompat):
                 UserWarning,
             )
 
+        is_dataset = Dataset is not None and isinstance(inputs, Dataset)
+        is_generator = isinstance(inputs, types.GeneratorType)
+        if (
+            self.result_cache is not None
+            and not (is_dataset or is_generator)
+            and self._can_cache_results(forward_params)
+        ):
+            return self._call_with_result_cache(
+                inputs, num_workers, batch_size, iterator_params, preprocess_params, forward_params, postprocess_params
+            )
+        return self._run(
+            inputs, num_workers, batch_size, iterator_params, preprocess_params, forward_params, postprocess_params
+        )
+
+    def _run(
+        self, inputs, num_workers, batch_size, iterator_params, preprocess_params, forward_params, postprocess_params
+    ):
         is_dataset = Dataset is not None and isinstance(inputs, Dataset)
         is_generator = isinstance(inputs, types.GeneratorType)
         is_list = isinstance(inputs, list)
@@ -1098,7 +1249,13 @@ class Pipeline(_ScikitCompat):
         if is_list:
             if can_use_iterator:
                 final_iterator = self.get_iterator(
-                    inputs, num_workers, batch_size, preprocess_params, forward_params, postprocess_params
+                    inputs,
+                    num_workers,
+                    batch_size,
+                    preprocess_params,
+                    forward_params,
+                    postprocess_params,
+                    **iterator_params,
                 )
                 outputs = list(final_iterator)
                 return outputs
@@ -1106,7 +1263,13 @@ class Pipeline(_ScikitCompat):
                 return self.run_multi(inputs, preprocess_params, forward_params, postprocess_params)
         elif can_use_iterator:
             return self.get_iterator(
-                inputs, num_workers, batch_size, preprocess_params, forward_params, postprocess_params
+                inputs,
+                num_workers,
+                batch_size,
+                preprocess_params,
+                forward_params,
+                postprocess_params,
+                **iterator_params,
             )
         elif is_iterable:
             return self.iterate(inputs, preprocess_params, forward_params, postprocess_params)
@@ -1114,13 +1277,87 @@ class Pipeline(_ScikitCompat):
             return next(
                 iter(
                     self.get_iterator(
-                        [inputs], num_workers, batch_size, preprocess_params, forward_params, postprocess_params
+                        [inputs],
+                        num_workers,
+                        batch_size,
+                        preprocess_params,
+                        forward_params,
+                        postprocess_params,
+                        **iterator_params,
                     )
                 )
             )
         else:
             return self.run_single(inputs, preprocess_params, forward_params, postprocess_params)
 
+    def _can_cache_results(self, forward_params) -> bool:
+        # Dropout or sampling would give different results for the same inputs
+        if getattr(self.model, "training", False):
+            return False
+        if not self.model.can_generate():
+            return True
+        generate_kwargs = {**forward_params, **forward_params.get("generate_kwargs", {})}
+        generation_config = generate_kwargs.get("generation_config", getattr(self.model, "generation_config", None))
+        return not generate_kwargs.get("do_sample", getattr(generation_config, "do_sample", False))
+
+    def _call_with_result_cache(
+        self, inputs, num_workers, batch_size, iterator_params, preprocess_params, forward_params, postprocess_params
+    ):
+        """
+        Runs the pipeline like `_run`, but only on the inputs whose results are not in `self.result_cache`.
+        """
+        config = self.model.config
+        model_id = (self.__class__.__name__, self.task, self.framework, config.name_or_path, config._commit_hash)
+        if not config.name_or_path:
+            # A model built in memory can only be told apart from another one by its identity
+            model_id += (id(self.model),)
+        is_list = isinstance(inputs, list)
+        items = inputs if is_list else [inputs]
+        keys = [
+            get_result_cache_key(model_id, item, preprocess_params, forward_params, postprocess_params)
+            for item in items
+        ]
+        if None in keys:
+            # Some inputs cannot be hashed
+            return self._run(
+                inputs, num_workers, batch_size, iterator_params, preprocess_params, forward_params, postprocess_params
+            )
+
+        results = {}
+        missing = {}
+        for key, item in zip(keys, items):
+            if key in results or key in missing:
+                continue
+            found, result = self.result_cache.get(key)
+            if found:
+                results[key] = result
+            else:
+                missing[key] = item
+        if missing:
+            missing_inputs = list(missing.values()) if is_list else inputs
+            outputs = self._run(
+                missing_inputs,
+                num_workers,
+                batch_size,
+                iterator_params,
+                preprocess_params,
+                forward_params,
+                postprocess_params,
+            )
+            for key, output in zip(missing, outputs if is_list else [outputs]):
+                self.result_cache.set(key, output)
+                results[key] = output
+
+        if not is_list:
+            return results[keys[0]]
+        # The results of duplicated inputs are copies
+        outputs = []
+        seen = set()
+        for key in keys:
+            outputs.append(copy.deepcopy(results[key]) if key in seen else results[key])
+            seen.add(key)
+        return outputs
+
     def run_multi(self, inputs, preprocess_params, forward_params, postprocess_params):
         return [self.run_single(item, preprocess_params, forward_params, postprocess_params) for item in inputs]
 
@@ -1147,24 +1384,49 @@ class ChunkPipeline(Pipeline):
         return outputs
 
     def get_iterator(
-        self, inputs, num_workers: int, batch_size: int, preprocess_params, forward_params, postprocess_params
+        self,
+        inputs,
+        num_workers: int,
+        batch_size: int,
+        preprocess_params,
+        forward_params,
+        postprocess_params,
+        bucket_window: Optional[int] = None,
+        max_batch_tokens: Optional[int] = None,
+        num_threads: Optional[int] = None,
     ):
         if "TOKENIZERS_PARALLELISM" not in os.environ:
             logger.info("Disabling tokenizer parallelism, we're using DataLoader multithreading already")
             os.environ["TOKENIZERS_PARALLELISM"] = "false"
+        num_workers = self._check_num_workers_with_threads(num_workers, num_threads)
         if num_workers > 1:
             logger.warning(
                 "For ChunkPipeline using num_workers>0 is likely to result in errors since everything is iterable,"
                 " setting `num_workers=1` to guarantee correctness."
             )
             num_workers = 1
-        dataset = PipelineChunkIterator(inputs, self.preprocess, preprocess_params)
-
-        # TODO hack by collating feature_extractor and image_processor
-        feature_extractor = self.feature_extractor if self.feature_extractor is not None else self.image_processor
-        collate_fn = no_collate_fn if batch_size == 1 else pad_collate_fn(self.tokenizer, feature_extractor)
-        dataloader = DataLoader(dataset, num_workers=num_workers, batch_size=batch_size, collate_fn=collate_fn)
-        model_iterator = PipelinePackIterator(dataloader, self.forward, forward_params, loader_batch_size=batch_size)
+        if num_threads:
+            dataset = PipelineThreadedIterator(
+                inputs,
+                self.preprocess,
+                preprocess_params,
+                num_threads,
+                max_pending=self._get_max_pending(num_threads, batch_size, bucket_window),
+                chunked=True,
+            )
+        else:
+            dataset = PipelineChunkIterator(inputs, self.preprocess, preprocess_params)
+        model_iterator = self._get_model_iterator(
+            dataset,
+            num_workers,
+            batch_size,
+            forward_params,
+            bucket_window,
+            max_batch_tokens,
+            iterator_class=PipelinePackIterator,
+        )
+        if num_threads:
+            return PipelineThreadedIterator(model_iterator, self.postprocess, postprocess_params, num_threads)
         final_iterator = PipelineIterator(model_iterator, self.postprocess, postprocess_params)
         return final_iterator
 
@@ -1,8 +1,19 @@
-from typing import Dict
+import os
+from typing import Dict, Optional
 
+import numpy as np
+
+from ..utils import is_tf_available, is_torch_available
 from .base import GenericTensor, Pipeline
 
 
+if is_torch_available():
+    import torch
+
+if is_tf_available():
+    import tensorflow as tf
+
+
 # Can't use @add_end_docstrings(PIPELINE_INIT_ARGS) here because this one does not accept `binary_output`
 class FeatureExtractionPipeline(Pipeline):
     """
@@ -55,12 +66,23 @@ class FeatureExtractionPipeline(Pipeline):
             the associated CUDA device id.
         tokenize_kwargs (`dict`, *optional*):
             Additional dictionary of keyword arguments passed along to the tokenizer.
+        unpad_inputs (`bool`, *optional*):
+            Whether or not the model should skip the padding tokens of the batches (see `batch_size`), by packing the
+            sequences together. Only supported by some models (BERT, RoBERTa, XLM-RoBERTa, ELECTRA and DistilBERT).
+        pooling (`str`, *optional*):
+            Pools the features of the tokens into one vector per input in the model step, by taking their `"mean"`,
+            their `"max"` or the features of the first token (`"cls"`). The padding tokens are ignored.
     """
 
-    def _sanitize_parameters(self, truncation=None, tokenize_kwargs=None, return_tensors=None, **kwargs):
+    def _sanitize_parameters(
+        self, truncation=None, tokenize_kwargs=None, return_tensors=None, unpad_inputs=None, pooling=None, **kwargs
+    ):
         if tokenize_kwargs is None:
             tokenize_kwargs = {}
 
+        if unpad_inputs is not None:
+            self._set_unpad_inputs(unpad_inputs)
+
         if truncation is not None:
             if "truncation" in tokenize_kwargs:
                 raise ValueError(
@@ -70,29 +92,62 @@ class FeatureExtractionPipeline(Pipeline):
 
         preprocess_params = tokenize_kwargs
 
+        forward_params = {}
         postprocess_params = {}
         if return_tensors is not None:
             postprocess_params["return_tensors"] = return_tensors
+        if pooling is not None:
+            if pooling not in {"mean", "max", "cls"}:
+                raise ValueError(f"`pooling` must be one of 'mean', 'max' or 'cls', got {pooling}")
+            forward_params["pooling"] = pooling
+            postprocess_params["pooling"] = pooling
 
-        return preprocess_params, {}, postprocess_params
+        return preprocess_params, forward_params, postprocess_params
 
     def preprocess(self, inputs, **tokenize_kwargs) -> Dict[str, GenericTensor]:
         return_tensors = self.framework
         model_inputs = self.tokenizer(inputs, return_tensors=return_tensors, **tokenize_kwargs)
         return model_inputs
 
-    def _forward(self, model_inputs):
+    def _forward(self, model_inputs, pooling=None):
         model_outputs = self.model(**model_inputs)
+        if pooling is not None:
+            # Only the pooled features leave the model step (and get unbatched)
+            return {"embeddings": self._pool(model_outputs[0], model_inputs.get("attention_mask", None), pooling)}
         return model_outputs
 
-    def postprocess(self, model_outputs, return_tensors=False):
+    def _pool(self, features, attention_mask, pooling):
+        if self.framework == "pt":
+            if attention_mask is None:
+                attention_mask = torch.ones(features.shape[:2], dtype=torch.long, device=features.device)
+            if pooling == "cls":
+                # The first token which is not padding, whatever the padding side
+                first = attention_mask.argmax(dim=1)
+                return features[torch.arange(features.shape[0], device=features.device), first]
+            mask = attention_mask.unsqueeze(-1).to(features.dtype)
+            if pooling == "mean":
+                return (features * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1)
+            return features.masked_fill(mask == 0, torch.finfo(features.dtype).min).max(dim=1).values
+        elif self.framework == "tf":
+            if attention_mask is None:
+                attention_mask = tf.ones(tf.shape(features)[:2], dtype=tf.int32)
+            if pooling == "cls":
+                first = tf.argmax(attention_mask, axis=1)
+                return tf.gather(features, first, axis=1, batch_dims=1)
+            mask = tf.cast(attention_mask, features.dtype)[..., None]
+            if pooling == "mean":
+                return tf.reduce_sum(features * mask, axis=1) / tf.maximum(tf.reduce_sum(mask, axis=1), 1)
+            return tf.reduce_max(tf.where(mask == 0, features.dtype.min, features), axis=1)
+
+    def postprocess(self, model_outputs, return_tensors=False, pooling=None):
         # [0] is the first available tensor, logits or last_hidden_state.
+        features = model_outputs["embeddings"] if pooling is not None else model_outputs[0]
         if return_tensors:
-            return model_outputs[0]
+            return features
         if self.framework == "pt":
-            return model_outputs[0].tolist()
+            return features.tolist()
         elif self.framework == "tf":
-            return model_outputs[0].numpy().tolist()
+            return features.numpy().tolist()
 
     def __call__(self, *args, **kwargs):
         """
@@ -105,3 +160,77 @@ class FeatureExtractionPipeline(Pipeline):
             A nested list of `float`: The features computed by the model.
         """
         return super().__call__(*args, **kwargs)
+
+    def export_embeddings(
+        self,
+        inputs,
+        path: str,
+        pooling: str = "mean",
+        dtype: str = "float32",
+        resume: bool = True,
+        flush_every: Optional[int] = 10000,
+        **kwargs,
+    ) -> Optional[np.memmap]:
+        """
+        Writes the pooled features of `inputs` to a `.npy` file, in the order of the inputs, without keeping them in
+        memory.
+
+        The file is memory-mapped and allocated for all the inputs with the first output. The number of inputs written
+        is saved in a `{path}.progress` file every `flush_every` inputs, so that an interrupted export can be resumed
+        by calling this method again with the same arguments.
+
+        Args:
+            inputs (`List[str]` or `Dataset`):
+                The texts to get the features of, which can be indexed and have a length (e.g. a list or a
+                [`~pipelines.pt_utils.KeyDataset`]).
+            path (`str`):
+                The path of the `.npy` file, an array of shape `[len(inputs), hidden_size]`.
+            pooling (`str`, *optional*, defaults to `"mean"`):
+                How the features of the tokens are pooled into one vector, `"mean"`, `"max"` or `"cls"`.
+            dtype (`str`, *optional*, defaults to `"float32"`):
+                The data type of the vectors in the file, e.g. `"float16"` to halve its size.
+            resume (`bool`, *optional*, defaults to `True`):
+                Whether or not to start from the progress saved in an existing file, instead of starting over.
+            flush_every (`int`, *optional*, defaults to 10000):
+                The number of inputs after which the file is flushed and the progress is saved.
+            kwargs:
+                The other parameters of the pipeline, like `batch_size` or `truncation`.
+
+        Return:
+            `np.memmap`: The memory-mapped array of the features (`None` when there are no inputs).
+        """
+        progress_path = f"{path}.progress"
+        num_inputs = len(inputs)
+        dtype = np.dtype(dtype)
+        embeddings = None
+        start = 0
+        if resume and os.path.exists(path) and os.path.exists(progress_path):
+            embeddings = np.lib.format.open_memmap(path, mode="r+")
+            if embeddings.shape[0] != num_inputs or embeddings.dtype != dtype:
+                raise ValueError(
+                    f"Cannot resume the export to {path} of shape {embeddings.shape} and dtype {embeddings.dtype}, with"
+                    f" {num_inputs} inputs of dtype {dtype}."
+                )
+            with open(progress_path) as f:
+                start = int(f.read())
+
+        def save_progress(num_written):
+            embeddings.flush()
+            with open(f"{progress_path}.tmp", "w") as f:
+                f.write(str(num_written))
+            os.replace(f"{progress_path}.tmp", progress_path)
+
+        outputs = self((inputs[i] for i in range(start, num_inputs)), pooling=pooling, return_tensors=True, **kwargs)
+        for i, output in enumerate(outputs, start=start):
+            vector = output.float().cpu().numpy() if self.framework == "pt" else output.numpy()
+            if embeddings is None:
+                embeddings = np.lib.format.open_memmap(
+                    path, mode="w+", dtype=dtype, shape=(num_inputs, vector.shape[-1])
+                )
+                save_progress(0)
+            embeddings[i] = vector.reshape(-1)
+            if flush_every is not None and (i + 1) % flush_every == 0:
+                save_progress(i + 1)
+        if embeddings is not None:
+            save_progress(num_inputs)
+        return embeddings
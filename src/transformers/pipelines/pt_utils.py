@@ -1,3 +1,7 @@
+import collections
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+
 import numpy as np
 import torch
 from torch.utils.data import Dataset, IterableDataset
@@ -293,6 +297,168 @@ class PipelinePackIterator(PipelineIterator):
         return accumulator
 
 
+def _get_item_length(item) -> int:
+    """
+    Length of a preprocessed item (with a batch dimension of 1): the size of its tensors along the dimension padded by
+    the pipelines when batching.
+    """
+    if isinstance(item, torch.Tensor):
+        return item.shape[1] if item.ndim > 1 else 0
+    lengths = [
+        value.shape[1] for value in item.values() if isinstance(value, (torch.Tensor, np.ndarray)) and value.ndim > 1
+    ]
+    return max(lengths, default=0)
+
+
+class PipelineBucketIterator(PipelineIterator):
+    """
+    Roughly equivalent to
+
+    ```
+    for window in windows of `window_size` items of loader:
+        outputs = [None] * len(window)
+        for indices in batches of the indices of `window`, sorted by length:
+            batched_outputs = infer(collate_fn([window[i] for i in indices]), **params)
+            for i, output in zip(indices, batched_outputs):
+                outputs[i] = output
+        yield from outputs
+    ```
+
+    Items of similar lengths are batched together, which reduces the padding, and the outputs are still returned in
+    the order of `loader`.
+
+        Arguments:
+            loader (`torch.utils.data.DataLoader` or any iterator):
+                The iterator of single (not batched) items.
+            infer (any function):
+                The function to apply of each batch of items.
+            params (`dict`):
+                The parameters passed to `infer` along with every batch
+            collate_fn (any function):
+                The function building a batch from a list of items.
+            batch_size (`int`):
+                The maximum number of items of a batch.
+            window_size (`int`):
+                The number of items read ahead from `loader` and sorted by length.
+            max_batch_tokens (`int`, *optional*):
+                If specified, the batches are not limited by `batch_size` but by their number of items times the length
+                of their longest item (a single item longer than this is batched alone).
+    """
+
+    def __init__(self, loader, infer, params, collate_fn, batch_size, window_size, max_batch_tokens=None):
+        super().__init__(loader, infer, params)
+        self.collate_fn = collate_fn
+        self.batch_size = batch_size
+        self.window_size = window_size
+        self.max_batch_tokens = max_batch_tokens
+
+    def get_batches(self, window):
+        """
+        Splits the indices of the items of `window` into batches of items of similar lengths, longest first.
+        """
+        lengths = [_get_item_length(item) for item in window]
+        indices = sorted(range(len(window)), key=lengths.__getitem__, reverse=True)
+        batches = []
+        batch = []
+        for index in indices:
+            # The first item of a batch is its longest one
+            if self.max_batch_tokens is not None:
+                is_full = (len(batch) + 1) * lengths[batch[0]] > self.max_batch_tokens if batch else False
+            else:
+                is_full = len(batch) == self.batch_size
+            if is_full:
+                batches.append(batch)
+                batch = []
+            batch.append(index)
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def __iter__(self):
+        iterator = iter(self.loader)
+        while True:
+            window = list(itertools.islice(iterator, self.window_size))
+            if not window:
+                return
+            outputs = [None] * len(window)
+            for batch in self.get_batches(window):
+                self._loader_batch_data = self.infer(self.collate_fn([window[i] for i in batch]), **self.params)
+                self._loader_batch_index = 0
+                for index in batch:
+                    outputs[index] = self.loader_batch_item()
+            yield from outputs
+
+
+class PipelineThreadedIterator(PipelineIterator):
+    """
+    Roughly equivalent to
+
+    ```
+    for item in loader:
+        yield infer(item, **params)
+    ```
+
+    but `infer` runs in a pool of `num_threads` threads on up to `max_pending` items read ahead from `loader`, so that
+    it overlaps with the work done on the returned items (like the forward of the model). `loader` itself is only
+    iterated from the current thread, and the outputs are returned in the order of `loader`.
+
+        Arguments:
+            loader (`torch.utils.data.DataLoader` or any iterator):
+                The iterator that will be used to apply `infer` on.
+            infer (any function):
+                The function to apply of each element of `loader`.
+            params (`dict`):
+                The parameters passed to `infer` along with every item
+            num_threads (`int`):
+                The number of threads running `infer`.
+            max_pending (`int`, *optional*):
+                The maximum number of items read ahead from `loader`, defaults to `2 * num_threads`.
+            chunked (`bool`, *optional*, defaults to `False`):
+                Whether `infer` returns an iterator of items (like the `preprocess` of a `ChunkPipeline`), in which
+                case all those items are returned, like [`PipelineChunkIterator`] does.
+    """
+
+    def __init__(self, loader, infer, params, num_threads, max_pending=None, chunked=False):
+        super().__init__(loader, infer, params)
+        self.num_threads = num_threads
+        self.max_pending = max_pending if max_pending is not None else 2 * num_threads
+        self.chunked = chunked
+
+    def _infer(self, item):
+        processed = self.infer(item, **self.params)
+        return list(processed) if self.chunked else [processed]
+
+    def _read_loader(self):
+        # `iter` is only called once: the iterators of the pipelines restart when it is called on them
+        iterator = iter(self.loader)
+        while True:
+            try:
+                yield next(iterator)
+            except StopIteration:
+                return
+
+    def __iter__(self):
+        iterator = self._read_loader()
+        # The first item is processed in the current thread, so that the lazy initializations `infer` may do (like
+        # setting the truncation and padding of a fast tokenizer) don't happen concurrently.
+        for item in itertools.islice(iterator, 1):
+            yield from self._infer(item)
+        pending = collections.deque()
+        executor = ThreadPoolExecutor(self.num_threads)
+        try:
+            for item in iterator:
+                pending.append(executor.submit(self._infer, item))
+                if len(pending) >= self.max_pending:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            # Reached when the iteration is interrupted as well
+            for future in pending:
+                future.cancel()
+            executor.shutdown()
+
+
 class KeyDataset(Dataset):
     def __init__(self, dataset: Dataset, key: str):
         self.dataset = dataset
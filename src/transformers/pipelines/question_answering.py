@@ -42,6 +42,53 @@ if is_torch_available():
     from ..models.auto.modeling_auto import MODEL_FOR_QUESTION_ANSWERING_MAPPING
 
 
+def _decode_spans_batched(
+    start: np.ndarray, end: np.ndarray, topk: int, max_answer_len: int, desired_tokens: np.ndarray
+) -> Tuple:
+    """
+    Finds the `topk` best spans across a batch of features, given the start and end probabilities of their tokens.
+
+    Only the spans of at most `max_answer_len` tokens are scored: the score of the span of length `length + 1` starting
+    at `s` is `start[:, s] * end[:, s + length]`, so the candidates are a `[batch, seq, max_answer_len]` band of the
+    outer product of `start` and `end` rather than the whole `[batch, seq, seq]` product.
+
+    Args:
+        start (`np.ndarray`): Start probabilities of the tokens of each feature, of shape `[batch, seq]`.
+        end (`np.ndarray`): End probabilities of the tokens of each feature, of shape `[batch, seq]`.
+        topk (`int`): Indicates how many possible answer span(s) to extract from the model output.
+        max_answer_len (`int`): Maximum size of the answer to extract from the model's output.
+        desired_tokens (`np.ndarray`): Mask of the tokens which can be part of the answer, of shape `[batch, seq]`.
+
+    Returns:
+        `Tuple[np.ndarray]`: The feature, start, end and score of the spans, from the best one.
+    """
+    seq_len = start.shape[-1]
+    max_answer_len = max(min(max_answer_len, seq_len), 1)
+    # ends[b, s, length] = end[b, s + length]
+    padding = np.zeros(end.shape[:-1] + (max_answer_len - 1,), dtype=end.dtype)
+    ends = np.lib.stride_tricks.sliding_window_view(np.concatenate([end, padding], axis=-1), max_answer_len, axis=-1)
+    desired_padding = np.zeros(padding.shape, dtype=bool)
+    desired_ends = np.lib.stride_tricks.sliding_window_view(
+        np.concatenate([desired_tokens, desired_padding], axis=-1), max_answer_len, axis=-1
+    )
+    candidates = start[..., None] * ends
+    desired_spans = desired_tokens[..., None] & desired_ends
+
+    #  Inspired by Chen & al. (https://github.com/facebookresearch/DrQA)
+    scores_flat = np.where(desired_spans, candidates, -np.inf).reshape(-1)
+    if topk == 1:
+        idx_sort = np.argmax(scores_flat)[None]
+    elif len(scores_flat) <= topk:
+        idx_sort = np.argsort(-scores_flat)
+    else:
+        idx = np.argpartition(-scores_flat, topk)[0:topk]
+        idx_sort = idx[np.argsort(-scores_flat[idx])]
+    idx_sort = idx_sort[scores_flat[idx_sort] > -np.inf]
+
+    features, starts, lengths = np.unravel_index(idx_sort, candidates.shape)
+    return features, starts, starts + lengths, scores_flat[idx_sort]
+
+
 def decode_spans(
     start: np.ndarray, end: np.ndarray, topk: int, max_answer_len: int, undesired_tokens: np.ndarray
 ) -> Tuple:
@@ -67,29 +114,71 @@ def decode_spans(
     if end.ndim == 1:
         end = end[None]
 
-    # Compute the score of each tuple(start, end) to be the real answer
-    outer = np.matmul(np.expand_dims(start, -1), np.expand_dims(end, 1))
+    desired_tokens = np.broadcast_to(np.asarray(undesired_tokens).reshape(-1) != 0, start[:1].shape)
+    _, starts, ends, scores = _decode_spans_batched(start[:1], end[:1], topk, max_answer_len, desired_tokens)
+    return starts, ends, scores
 
-    # Remove candidate with end < start and end - start > max_answer_len
-    candidates = np.tril(np.triu(outer), max_answer_len - 1)
 
-    #  Inspired by Chen & al. (https://github.com/facebookresearch/DrQA)
-    scores_flat = candidates.flatten()
-    if topk == 1:
-        idx_sort = [np.argmax(scores_flat)]
-    elif len(scores_flat) < topk:
-        idx_sort = np.argsort(-scores_flat)
-    else:
-        idx = np.argpartition(-scores_flat, topk)[0:topk]
-        idx_sort = idx[np.argsort(-scores_flat[idx])]
+def _select_starts_ends_batched(
+    start,
+    end,
+    p_mask,
+    attention_mask,
+    min_null_score=1000000,
+    top_k=1,
+    handle_impossible_answer=False,
+    max_answer_len=15,
+):
+    """
+    Like `select_starts_ends()`, but for the outputs of all the features of an example at once, which can have
+    different lengths: returns the `top_k` best spans across all the features with their feature index.
+
+    Args:
+        start (`List[np.ndarray]`): Individual start logits for each token of each feature.
+        end (`List[np.ndarray]`): Individual end logits for each token of each feature.
+        p_mask (`List[np.ndarray]`): A mask with 1 for values that cannot be in the answer for each feature
+        attention_mask (`List[np.ndarray]`): The attention mask generated by the tokenizer for each feature (or `None`)
+        min_null_score(`float`): The minimum null (empty) answer score seen so far.
+        topk (`int`): Indicates how many possible answer span(s) to extract from the model output.
+        handle_impossible_answer(`bool`): Whether to allow null (empty) answers
+        max_answer_len (`int`): Maximum size of the answer to extract from the model's output.
+    """
+    start = [np.asarray(feature_start).reshape(-1) for feature_start in start]
+    end = [np.asarray(feature_end).reshape(-1) for feature_end in end]
+    seq_len = max(len(feature_start) for feature_start in start)
+    dtype = start[0].dtype if np.issubdtype(start[0].dtype, np.floating) else np.float64
+
+    # The features are padded to the longest one, the padding doesn't count in the softmax
+    padded_start = np.full((len(start), seq_len), -np.inf, dtype=dtype)
+    padded_end = np.full((len(start), seq_len), -np.inf, dtype=dtype)
+    desired_tokens = np.zeros((len(start), seq_len), dtype=bool)
+    for i, (feature_start, feature_end) in enumerate(zip(start, end)):
+        length = len(feature_start)
+        # Ensure padded tokens & question tokens cannot belong to the set of candidate answers.
+        feature_desired_tokens = np.abs(np.asarray(p_mask[i]).reshape(-1) - 1)
+        if attention_mask[i] is not None:
+            feature_desired_tokens = feature_desired_tokens & np.asarray(attention_mask[i]).reshape(-1)
+        desired_tokens[i, :length] = feature_desired_tokens != 0
+
+        # Make sure non-context indexes in the tensor cannot contribute to the softmax
+        padded_start[i, :length] = np.where(desired_tokens[i, :length], feature_start, -10000.0)
+        padded_end[i, :length] = np.where(desired_tokens[i, :length], feature_end, -10000.0)
 
-    starts, ends = np.unravel_index(idx_sort, candidates.shape)[1:]
-    desired_spans = np.isin(starts, undesired_tokens.nonzero()) & np.isin(ends, undesired_tokens.nonzero())
-    starts = starts[desired_spans]
-    ends = ends[desired_spans]
-    scores = candidates[0, starts, ends]
+    # Normalize logits and spans to retrieve the answer
+    start = np.exp(padded_start - padded_start.max(axis=-1, keepdims=True))
+    start = start / start.sum(axis=-1, keepdims=True)
 
-    return starts, ends, scores
+    end = np.exp(padded_end - padded_end.max(axis=-1, keepdims=True))
+    end = end / end.sum(axis=-1, keepdims=True)
+
+    if handle_impossible_answer:
+        min_null_score = min(min_null_score, (start[:, 0] * end[:, 0]).min().item())
+
+    # Mask CLS
+    start[:, 0] = end[:, 0] = 0.0
+
+    features, starts, ends, scores = _decode_spans_batched(start, end, top_k, max_answer_len, desired_tokens)
+    return features, starts, ends, scores, min_null_score
 
 
 def select_starts_ends(
@@ -116,33 +205,9 @@ def select_starts_ends(
         handle_impossible_answer(`bool`): Whether to allow null (empty) answers
         max_answer_len (`int`): Maximum size of the answer to extract from the model's output.
     """
-    # Ensure padded tokens & question tokens cannot belong to the set of candidate answers.
-    undesired_tokens = np.abs(np.array(p_mask) - 1)
-
-    if attention_mask is not None:
-        undesired_tokens = undesired_tokens & attention_mask
-
-    # Generate mask
-    undesired_tokens_mask = undesired_tokens == 0.0
-
-    # Make sure non-context indexes in the tensor cannot contribute to the softmax
-    start = np.where(undesired_tokens_mask, -10000.0, start)
-    end = np.where(undesired_tokens_mask, -10000.0, end)
-
-    # Normalize logits and spans to retrieve the answer
-    start = np.exp(start - start.max(axis=-1, keepdims=True))
-    start = start / start.sum()
-
-    end = np.exp(end - end.max(axis=-1, keepdims=True))
-    end = end / end.sum()
-
-    if handle_impossible_answer:
-        min_null_score = min(min_null_score, (start[0, 0] * end[0, 0]).item())
-
-    # Mask CLS
-    start[0, 0] = end[0, 0] = 0.0
-
-    starts, ends, scores = decode_spans(start, end, top_k, max_answer_len, undesired_tokens)
+    _, starts, ends, scores, min_null_score = _select_starts_ends_batched(
+        [start], [end], [p_mask], [attention_mask], min_null_score, top_k, handle_impossible_answer, max_answer_len
+    )
     return starts, ends, scores, min_null_score
 
 
@@ -527,44 +592,58 @@ class QuestionAnsweringPipeline(ChunkPipeline):
     ):
         min_null_score = 1000000  # large and positive
         answers = []
-        for output in model_outputs:
-            start_ = output["start"]
-            end_ = output["end"]
-            example = output["example"]
-            p_mask = output["p_mask"]
-            attention_mask = (
+        # The spans of all the features are decoded at once
+        features, starts, ends, scores, min_null_score = _select_starts_ends_batched(
+            [output["start"] for output in model_outputs],
+            [output["end"] for output in model_outputs],
+            [output["p_mask"] for output in model_outputs],
+            [
                 output["attention_mask"].numpy() if output.get("attention_mask", None) is not None else None
-            )
-
-            starts, ends, scores, min_null_score = select_starts_ends(
-                start_, end_, p_mask, attention_mask, min_null_score, top_k, handle_impossible_answer, max_answer_len
-            )
+                for output in model_outputs
+            ],
+            min_null_score,
+            top_k,
+            handle_impossible_answer,
+            max_answer_len,
+        )
 
-            if not self.tokenizer.is_fast:
-                char_to_word = np.array(example.char_to_word_offset)
-
-                # Convert the answer (tokens) back to the original text
-                # Score: score from the model
-                # Start: Index of the first character of the answer in the context string
-                # End: Index of the character following the last character of the answer in the context string
-                # Answer: Plain text of the answer
-                for s, e, score in zip(starts, ends, scores):
-                    token_to_orig_map = output["token_to_orig_map"]
-                    answers.append(
-                        {
-                            "score": score.item(),
-                            "start": np.where(char_to_word == token_to_orig_map[s])[0][0].item(),
-                            "end": np.where(char_to_word == token_to_orig_map[e])[0][-1].item(),
-                            "answer": " ".join(example.doc_tokens[token_to_orig_map[s] : token_to_orig_map[e] + 1]),
-                        }
-                    )
-            else:
-                # Convert the answer (tokens) back to the original text
-                # Score: score from the model
-                # Start: Index of the first character of the answer in the context string
-                # End: Index of the character following the last character of the answer in the context string
-                # Answer: Plain text of the answer
-                question_first = bool(self.tokenizer.padding_side == "right")
+        if not self.tokenizer.is_fast:
+            example = model_outputs[0]["example"]
+            # The words go from their first to their last character in `char_to_word`, which is sorted
+            char_to_word = np.array(example.char_to_word_offset)
+            word_starts = np.searchsorted(char_to_word, np.arange(len(example.doc_tokens)), side="left")
+            word_ends = np.searchsorted(char_to_word, np.arange(len(example.doc_tokens)), side="right") - 1
+
+            # Convert the answer (tokens) back to the original text
+            # Score: score from the model
+            # Start: Index of the first character of the answer in the context string
+            # End: Index of the character following the last character of the answer in the context string
+            # Answer: Plain text of the answer
+            for feature, s, e, score in zip(features, starts, ends, scores):
+                token_to_orig_map = model_outputs[feature]["token_to_orig_map"]
+                answers.append(
+                    {
+                        "score": score.item(),
+                        "start": word_starts[token_to_orig_map[s]].item(),
+                        "end": word_ends[token_to_orig_map[e]].item(),
+                        "answer": " ".join(example.doc_tokens[token_to_orig_map[s] : token_to_orig_map[e] + 1]),
+                    }
+                )
+        else:
+            # Convert the answer (tokens) back to the original text
+            # Score: score from the model
+            # Start: Index of the first character of the answer in the context string
+            # End: Index of the character following the last character of the answer in the context string
+            # Answer: Plain text of the answer
+            question_first = bool(self.tokenizer.padding_side == "right")
+
+            # Sometimes the max probability token is in the middle of a word so:
+            # - we start by finding the right word containing the token with `token_to_word`
+            # - then we convert this word in a character span with `word_to_chars`
+            sequence_index = 1 if question_first else 0
+            for feature, s, e, score in zip(features, starts, ends, scores):
+                output = model_outputs[feature]
+                example = output["example"]
                 enc = output["encoding"]
 
                 # Encoding was *not* padded, input_ids *might*.
@@ -576,24 +655,19 @@ class QuestionAnsweringPipeline(ChunkPipeline):
                 else:
                     offset = 0
 
-                # Sometimes the max probability token is in the middle of a word so:
-                # - we start by finding the right word containing the token with `token_to_word`
-                # - then we convert this word in a character span with `word_to_chars`
-                sequence_index = 1 if question_first else 0
-                for s, e, score in zip(starts, ends, scores):
-                    s = s - offset
-                    e = e - offset
-
-                    start_index, end_index = self.get_indices(enc, s, e, sequence_index, align_to_words)
-
-                    answers.append(
-                        {
-                            "score": score.item(),
-                            "start": start_index,
-                            "end": end_index,
-                            "answer": example.context_text[start_index:end_index],
-                        }
-                    )
+                s = s - offset
+                e = e - offset
+
+                start_index, end_index = self.get_indices(enc, s, e, sequence_index, align_to_words)
+
+                answers.append(
+                    {
+                        "score": score.item(),
+                        "start": start_index,
+                        "end": end_index,
+                        "answer": example.context_text[start_index:end_index],
+                    }
+                )
 
         if handle_impossible_answer:
             answers.append({"score": min_null_score, "start": 0, "end": 0, "answer": ""})
@@ -0,0 +1,240 @@
+# coding=utf-8
+# Copyright 2023 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import copy
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+class PipelineResultCache:
+    """
+    In-memory cache of the results of a [`Pipeline`], which evicts the least recently used results when it holds more
+    than `max_size` of them. It is used by the pipeline when passed as its `result_cache` argument.
+
+    The results are copied when they are stored and when they are returned, so they can be modified by the caller. The
+    cache is thread-safe and keeps track of its hits and misses.
+
+    Example:
+
+    ```python
+    >>> from transformers import PipelineResultCache, pipeline
+
+    >>> cache = PipelineResultCache(max_size=100000)
+    >>> classifier = pipeline("sentiment-analysis", result_cache=cache)
+    >>> outputs = classifier(["I love this movie", "I hate this movie", "I love this movie"])
+    >>> cache.stats()["misses"]
+    2
+    ```
+
+    Args:
+        max_size (`int`, *optional*, defaults to 10000):
+            The maximum number of results kept in the cache.
+    """
+
+    def __init__(self, max_size: int = 10000):
+        if max_size < 1:
+            raise ValueError(f"`max_size` must be at least 1, got {max_size}")
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._results = OrderedDict()
+
+    def get(self, key: str) -> Tuple[bool, Any]:
+        """
+        Returns whether the result of `key` is in the cache, and the result itself (`None` when it is not).
+        """
+        with self._lock:
+            found, result = self._get(key)
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return found, result
+
+    def set(self, key: str, result: Any):
+        """
+        Stores the `result` of `key`, evicting the least recently used results if the cache is full.
+        """
+        with self._lock:
+            self._set(key, result)
+
+    def clear(self):
+        """
+        Removes all the results from the cache and resets its statistics.
+        """
+        with self._lock:
+            self._clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """The fraction of the lookups which found their result in the cache."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the number of results in the cache, its hits, misses, evictions and hit rate.
+        """
+        return {
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hit_rate,
+        }
+
+    def __len__(self):
+        with self._lock:
+            return self._len()
+
+    # Storage methods, called with the lock held
+
+    def _get(self, key: str) -> Tuple[bool, Any]:
+        if key not in self._results:
+            return False, None
+        self._results.move_to_end(key)
+        return True, copy.deepcopy(self._results[key])
+
+    def _set(self, key: str, result: Any):
+        self._results[key] = copy.deepcopy(result)
+        self._results.move_to_end(key)
+        while len(self._results) > self.max_size:
+            self._results.popitem(last=False)
+            self.evictions += 1
+
+    def _clear(self):
+        self._results.clear()
+
+    def _len(self) -> int:
+        return len(self._results)
+
+
+class SQLitePipelineResultCache(PipelineResultCache):
+    """
+    [`PipelineResultCache`] storing the results in a SQLite database, so that they are shared between processes and
+    kept across restarts. The results are pickled, and the least recently used ones are evicted when the database holds
+    more than `max_size` of them.
+
+    The keys include the name and the commit hash of the model, but not its weights: clear the cache when a local model
+    is modified.
+
+    Args:
+        path (`str`):
+            The path of the database file, created if it does not exist.
+        max_size (`int`, *optional*, defaults to 1000000):
+            The maximum number of results kept in the database.
+        timeout (`float`, *optional*, defaults to 30):
+            How long to wait, in seconds, for another process writing to the database.
+    """
+
+    def __init__(self, path: str, max_size: int = 1000000, timeout: float = 30):
+        super().__init__(max_size=max_size)
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._connection = sqlite3.connect(path, timeout=timeout, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, result BLOB, last_used INTEGER)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used)")
+            # The number of results is kept up to date by triggers, `COUNT(*)` scans the whole table
+            self._connection.execute("CREATE TABLE IF NOT EXISTS size (count INTEGER)")
+            self._connection.execute(
+                "INSERT INTO size SELECT COUNT(*) FROM results WHERE NOT EXISTS (SELECT 1 FROM size)"
+            )
+            self._connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_insert AFTER INSERT ON results"
+                " BEGIN UPDATE size SET count = count + 1; END"
+            )
+            self._connection.execute(
+                "CREATE TRIGGER IF NOT EXISTS results_delete AFTER DELETE ON results"
+                " BEGIN UPDATE size SET count = count - 1; END"
+            )
+
+    def _next_use(self) -> int:
+        # A counter shared by the processes using the database, which orders the uses of the results
+        row = self._connection.execute("SELECT MAX(last_used) FROM results").fetchone()
+        return (row[0] or 0) + 1
+
+    def _get(self, key: str) -> Tuple[bool, Any]:
+        row = self._connection.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return False, None
+        self._connection.execute("UPDATE results SET last_used = ? WHERE key = ?", (self._next_use(), key))
+        return True, pickle.loads(row[0])
+
+    def _set(self, key: str, result: Any):
+        try:
+            result = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Results which cannot be pickled are not cached
+            return
+        with self._connection:
+            self._connection.execute("BEGIN IMMEDIATE")
+            self._connection.execute(
+                "INSERT INTO results (key, result, last_used) VALUES (?, ?, ?) ON CONFLICT (key) DO UPDATE SET"
+                " result = excluded.result, last_used = excluded.last_used",
+                (key, result, self._next_use()),
+            )
+            num_evicted = self._len() - self.max_size
+            if num_evicted > 0:
+                self._connection.execute(
+                    "DELETE FROM results WHERE key IN (SELECT key FROM results ORDER BY last_used LIMIT ?)",
+                    (num_evicted,),
+                )
+                self.evictions += num_evicted
+
+    def _clear(self):
+        self._connection.execute("DELETE FROM results")
+
+    def _len(self) -> int:
+        return self._connection.execute("SELECT count FROM size").fetchone()[0]
+
+    def close(self):
+        """Closes the connection to the database."""
+        self._connection.close()
+
+
+def get_result_cache_key(*parts) -> Optional[str]:
+    """
+    Returns a hash of `parts` (the inputs and parameters of a pipeline call) to use as a key of a
+    [`PipelineResultCache`], or `None` if they cannot be pickled.
+    """
+    try:
+        data = pickle.dumps(_normalize(parts), protocol=4)
+    except Exception:
+        return None
+    return hashlib.sha256(data).hexdigest()
+
+
+def _normalize(obj):
+    # The same parameters can be passed in any order
+    if isinstance(obj, dict):
+        return ("__dict__", tuple(sorted(((repr(k), _normalize(v)) for k, v in obj.items()), key=lambda x: x[0])))
+    if isinstance(obj, (list, tuple)):
+        return type(obj).__name__, tuple(_normalize(item) for item in obj)
+    return obj
@@ -88,11 +88,16 @@ class TextClassificationPipeline(Pipeline):
             else MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING
         )
 
-    def _sanitize_parameters(self, return_all_scores=None, function_to_apply=None, top_k="", **tokenizer_kwargs):
+    def _sanitize_parameters(
+        self, return_all_scores=None, function_to_apply=None, top_k="", unpad_inputs=None, **tokenizer_kwargs
+    ):
         # Using "" as default argument because we're going to use `top_k=None` in user code to declare
         # "No top_k"
         preprocess_params = tokenizer_kwargs
 
+        if unpad_inputs is not None:
+            self._set_unpad_inputs(unpad_inputs)
+
         postprocess_params = {}
         if hasattr(self.model.config, "return_all_scores") and return_all_scores is None:
             return_all_scores = self.model.config.return_all_scores
@@ -143,6 +148,10 @@ class TextClassificationPipeline(Pipeline):
                 - `"sigmoid"`: Applies the sigmoid function on the output.
                 - `"softmax"`: Applies the softmax function on the output.
                 - `"none"`: Does not apply any function on the output.
+            unpad_inputs (`bool`, *optional*):
+                Whether or not the model should skip the padding tokens of the batches (see `batch_size`), by packing
+                the sequences together. Only supported by some models (BERT, RoBERTa, XLM-RoBERTa, ELECTRA and
+                DistilBERT).
 
         Return:
             A list or a list of list of `dict`: Each result comes as list of dictionaries with the following keys:
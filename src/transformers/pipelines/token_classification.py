@@ -71,6 +71,14 @@ class AggregationStrategy(ExplicitEnum):
             model_max_length. Works only with fast tokenizers and `aggregation_strategy` different from `NONE`. The
             value of this argument defines the number of overlapping tokens between chunks. In other words, the model
             will shift forward by `tokenizer.model_max_length - stride` tokens each step.
+        overlap_strategy (`str`, *optional*, defaults to `"entities"`):
+            How the predictions of the overlapping chunks are merged when `stride` is provided.
+
+                - "entities" : The entities are aggregated in each chunk, and the longest (then the most likely) of
+                  the overlapping entities is kept.
+                - "tokens" : The scores of each token are taken from the chunk in which it is the furthest from the
+                  edges, the tokens in the first half of an overlap coming from the first chunk. The entities are then
+                  aggregated once on the whole text, so a word or an entity can span several chunks.
         aggregation_strategy (`str`, *optional*, defaults to `"none"`):
             The strategy to fuse (or not) tokens based on the model prediction.
 
@@ -151,6 +159,7 @@ class TokenClassificationPipeline(ChunkPipeline):
         aggregation_strategy: Optional[AggregationStrategy] = None,
         offset_mapping: Optional[List[Tuple[int, int]]] = None,
         stride: Optional[int] = None,
+        overlap_strategy: Optional[str] = None,
     ):
         preprocess_params = {}
         if offset_mapping is not None:
@@ -191,7 +200,12 @@ class TokenClassificationPipeline(ChunkPipeline):
             postprocess_params["aggregation_strategy"] = aggregation_strategy
         if ignore_labels is not None:
             postprocess_params["ignore_labels"] = ignore_labels
+        if overlap_strategy is not None:
+            if overlap_strategy not in {"entities", "tokens"}:
+                raise ValueError(f"`overlap_strategy` must be 'entities' or 'tokens', got {overlap_strategy}")
+            postprocess_params["overlap_strategy"] = overlap_strategy
         if stride is not None:
+            postprocess_params["stride"] = stride
             if stride >= self.tokenizer.model_max_length:
                 raise ValueError(
                     "`stride` must be less than `tokenizer.model_max_length` (or even lower if the tokenizer adds special tokens)"
@@ -256,7 +270,7 @@ class TokenClassificationPipeline(ChunkPipeline):
             return_tensors=self.framework,
             truncation=truncation,
             return_special_tokens_mask=True,
-            return_offsets_mapping=self.tokenizer.is_fast,
+            return_offsets_mapping=self.tokenizer.is_fast or self.tokenizer._supports_offsets_mapping,
             **tokenizer_params,
         )
         inputs.pop("overflow_to_sample_mapping", None)
@@ -295,43 +309,213 @@ class TokenClassificationPipeline(ChunkPipeline):
             **model_inputs,
         }
 
-    def postprocess(self, all_outputs, aggregation_strategy=AggregationStrategy.NONE, ignore_labels=None):
+    def postprocess(
+        self,
+        all_outputs,
+        aggregation_strategy=AggregationStrategy.NONE,
+        ignore_labels=None,
+        overlap_strategy="entities",
+        stride=None,
+    ):
         if ignore_labels is None:
             ignore_labels = ["O"]
+        sentence = all_outputs[0]["sentence"]
+        chunks = [self._gather_tokens(sentence, model_outputs, aggregation_strategy) for model_outputs in all_outputs]
+        if overlap_strategy == "tokens" and len(chunks) > 1:
+            chunks = [self._merge_overlapping_tokens(chunks, stride)]
+
         all_entities = []
-        for model_outputs in all_outputs:
-            logits = model_outputs["logits"][0].numpy()
-            sentence = all_outputs[0]["sentence"]
-            input_ids = model_outputs["input_ids"][0]
-            offset_mapping = (
-                model_outputs["offset_mapping"][0] if model_outputs["offset_mapping"] is not None else None
-            )
-            special_tokens_mask = model_outputs["special_tokens_mask"][0].numpy()
+        for tokens in chunks:
+            all_entities.extend(self._aggregate_tokens(tokens, aggregation_strategy, ignore_labels))
+        if len(chunks) > 1:
+            all_entities = self.aggregate_overlapping_entities(all_entities)
+        return all_entities
 
-            maxes = np.max(logits, axis=-1, keepdims=True)
-            shifted_exp = np.exp(logits - maxes)
-            scores = shifted_exp / shifted_exp.sum(axis=-1, keepdims=True)
+    def _gather_tokens(self, sentence: str, model_outputs: dict, aggregation_strategy: AggregationStrategy) -> dict:
+        """
+        Array version of `gather_pre_entities`: the scores, words, offsets and subword flags of the tokens of a chunk
+        which are not special tokens.
+        """
+        logits = model_outputs["logits"][0].numpy()
+        input_ids = np.asarray(model_outputs["input_ids"][0])
+        special_tokens_mask = np.asarray(model_outputs["special_tokens_mask"][0])
+
+        maxes = np.max(logits, axis=-1, keepdims=True)
+        shifted_exp = np.exp(logits - maxes)
+        scores = shifted_exp / shifted_exp.sum(axis=-1, keepdims=True)
+
+        index = np.flatnonzero(special_tokens_mask == 0)
+        input_ids = input_ids[index]
+        words = self.tokenizer.convert_ids_to_tokens(input_ids.tolist())
+        tokens = {"index": index, "scores": scores[index], "words": words, "starts": None, "ends": None}
+        tokens["is_subword"] = np.zeros(len(index), dtype=bool)
+        if model_outputs["offset_mapping"] is None:
+            return tokens
+
+        offsets = np.asarray(model_outputs["offset_mapping"][0]).reshape(-1, 2)[index].astype(np.int64)
+        starts, ends = offsets[:, 0], offsets[:, 1]
+        tokens["starts"], tokens["ends"] = starts, ends
+        is_unk = input_ids == self.tokenizer.unk_token_id
+        if len(index) > 0 and aggregation_strategy in {
+            AggregationStrategy.FIRST,
+            AggregationStrategy.AVERAGE,
+            AggregationStrategy.MAX,
+        }:
+            tokens["is_subword"] = self._is_subword(sentence, words, starts, ends) & ~is_unk
+        # Unknown tokens are replaced by the text they come from
+        for i in np.flatnonzero(is_unk):
+            words[i] = sentence[starts[i] : ends[i]]
+        return tokens
+
+    def _is_subword(self, sentence: str, words: List[str], starts: np.ndarray, ends: np.ndarray) -> np.ndarray:
+        num_chars = len(sentence)
+        if getattr(self.tokenizer, "_tokenizer", None) and getattr(
+            self.tokenizer._tokenizer.model, "continuing_subword_prefix", None
+        ):
+            # This is a BPE, word aware tokenizer, there is a correct way
+            # to fuse tokens: the subwords are longer than the text they come from
+            lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+            text_lengths = np.maximum(np.clip(ends, 0, num_chars) - np.clip(starts, 0, num_chars), 0)
+            return lengths != text_lengths
+
+        # This is a fallback heuristic, see `gather_pre_entities`: a token is a subword when there is no space just
+        # before or at its start.
+        warnings.warn("Tokenizer does not support real words, using fallback heuristic", UserWarning)
+        is_space = np.frombuffer(sentence.encode("utf-32-le"), dtype=np.uint32) == ord(" ")
+        is_space = np.append(is_space, False)
+        return (starts > 0) & ~is_space[np.clip(starts - 1, 0, num_chars)] & ~is_space[np.clip(starts, 0, num_chars)]
+
+    def _merge_overlapping_tokens(self, chunks: List[dict], stride: int) -> dict:
+        """
+        Merges the tokens of overlapping chunks into the tokens of the whole text. The `stride` tokens of an overlap
+        come from the end of the first chunk for the first half, and from the start of the next chunk for the rest.
+        """
+        lengths = [len(tokens["scores"]) for tokens in chunks]
+        # Number of overlapping tokens taken from the first chunk of each overlap
+        overlaps = [(min(stride, left, right) + 1) // 2 for left, right in zip(lengths[:-1], lengths[1:])]
+        dropped_ends = [min(stride, left, right) - kept for left, right, kept in zip(lengths, lengths[1:], overlaps)]
+        slices = [
+            slice(overlaps[i - 1] if i > 0 else 0, length - (dropped_ends[i] if i < len(dropped_ends) else 0))
+            for i, length in enumerate(lengths)
+        ]
+        merged = {}
+        for key in ["index", "scores", "starts", "ends", "is_subword"]:
+            merged[key] = np.concatenate([tokens[key][token_slice] for tokens, token_slice in zip(chunks, slices)])
+        merged["words"] = [
+            word for tokens, token_slice in zip(chunks, slices) for word in tokens["words"][token_slice]
+        ]
+        return merged
+
+    def _aggregate_tokens(
+        self, tokens: dict, aggregation_strategy: AggregationStrategy, ignore_labels: List[str]
+    ) -> List[dict]:
+        """
+        Array version of `aggregate` followed by the filtering of `ignore_labels`: the entities are only built for the
+        tokens or groups which are kept.
+        """
+        scores = tokens["scores"]
+        num_tokens = len(scores)
+        if num_tokens == 0:
+            return []
+        id2label = self.model.config.id2label
+        labels = [id2label[i] for i in range(scores.shape[-1])]
+        words = tokens["words"]
+        starts = tokens["starts"].tolist() if tokens["starts"] is not None else [None] * num_tokens
+        ends = tokens["ends"].tolist() if tokens["ends"] is not None else [None] * num_tokens
 
-            if self.framework == "tf":
-                input_ids = input_ids.numpy()
-                offset_mapping = offset_mapping.numpy() if offset_mapping is not None else None
+        if aggregation_strategy == AggregationStrategy.NONE:
+            entity_ids = scores.argmax(axis=-1)
+            entity_scores = scores[np.arange(num_tokens), entity_ids]
+            kept_labels = np.array([label not in ignore_labels for label in labels])
+            index = tokens["index"].tolist()
+            return [
+                {
+                    "entity": labels[entity_ids[i]],
+                    "score": entity_scores[i],
+                    "index": index[i],
+                    "word": words[i],
+                    "start": starts[i],
+                    "end": ends[i],
+                }
+                for i in np.flatnonzero(kept_labels[entity_ids])
+            ]
 
-            pre_entities = self.gather_pre_entities(
-                sentence, input_ids, scores, offset_mapping, special_tokens_mask, aggregation_strategy
+        # The units are the tokens for SIMPLE, and the words made of the tokens between `bounds` otherwise
+        if aggregation_strategy == AggregationStrategy.SIMPLE:
+            bounds = np.arange(num_tokens + 1)
+            unit_scores = scores
+        else:
+            is_word_start = ~tokens["is_subword"]
+            is_word_start[0] = True
+            bounds = np.append(np.flatnonzero(is_word_start), num_tokens)
+            unit_scores = self._aggregate_word_scores(scores, bounds, aggregation_strategy)
+        entity_ids = unit_scores.argmax(axis=-1)
+        entity_scores = unit_scores[np.arange(len(entity_ids)), entity_ids]
+
+        # Same grouping as `group_entities`: a group starts with a new tag or a B- entity
+        bis, tags = zip(*(self.get_tag(label) for label in labels))
+        tag_ids = np.unique(tags, return_inverse=True)[1][entity_ids]
+        is_group_start = np.array(bis)[entity_ids] == "B"
+        is_group_start[0] = True
+        is_group_start[1:] |= tag_ids[1:] != tag_ids[:-1]
+        group_bounds = np.append(np.flatnonzero(is_group_start), len(entity_ids))
+
+        entity_groups = []
+        for group_start, group_end in zip(group_bounds[:-1], group_bounds[1:]):
+            entity_group = labels[entity_ids[group_start]].split("-")[-1]
+            if entity_group in ignore_labels:
+                continue
+            # Like `group_sub_entities`: `np.add.reduceat` would not round the sums of the scores the same way
+            if group_end - group_start > 1:
+                group_score = np.nanmean(entity_scores[group_start:group_end])
+            else:
+                group_score = entity_scores[group_start]
+            if aggregation_strategy == AggregationStrategy.SIMPLE:
+                unit_words = words[group_start:group_end]
+            else:
+                unit_words = [
+                    self.tokenizer.convert_tokens_to_string(words[bounds[unit] : bounds[unit + 1]])
+                    for unit in range(group_start, group_end)
+                ]
+            entity_groups.append(
+                {
+                    "entity_group": entity_group,
+                    "score": group_score,
+                    "word": self.tokenizer.convert_tokens_to_string(unit_words),
+                    "start": starts[bounds[group_start]],
+                    "end": ends[bounds[group_end] - 1],
+                }
             )
-            grouped_entities = self.aggregate(pre_entities, aggregation_strategy)
-            # Filter anything that is in self.ignore_labels
-            entities = [
-                entity
-                for entity in grouped_entities
-                if entity.get("entity", None) not in ignore_labels
-                and entity.get("entity_group", None) not in ignore_labels
-            ]
-            all_entities.extend(entities)
-        num_chunks = len(all_outputs)
-        if num_chunks > 1:
-            all_entities = self.aggregate_overlapping_entities(all_entities)
-        return all_entities
+        return entity_groups
+
+    def _aggregate_word_scores(
+        self, scores: np.ndarray, bounds: np.ndarray, aggregation_strategy: AggregationStrategy
+    ) -> np.ndarray:
+        """
+        Array version of `aggregate_word`: the scores of each word made of the tokens between `bounds`.
+        """
+        word_starts = bounds[:-1]
+        if aggregation_strategy == AggregationStrategy.FIRST:
+            return scores[word_starts]
+        elif aggregation_strategy == AggregationStrategy.MAX:
+            # The scores of the first token with the highest score of each word
+            token_max = scores.max(axis=-1)
+            word_max = np.maximum.reduceat(token_max, word_starts)
+            word_ids = np.repeat(np.arange(len(word_starts)), np.diff(bounds))
+            candidates = np.where(token_max == word_max[word_ids], np.arange(len(scores)), len(scores))
+            return scores[np.minimum.reduceat(candidates, word_starts)]
+        elif aggregation_strategy == AggregationStrategy.AVERAGE:
+            return self._nanmean_segments(scores, bounds)
+        else:
+            raise ValueError("Invalid aggregation_strategy")
+
+    @staticmethod
+    def _nanmean_segments(values: np.ndarray, bounds: np.ndarray) -> np.ndarray:
+        """`np.nanmean(values[start:end], axis=0)` for each pair of consecutive `bounds`."""
+        is_nan = np.isnan(values)
+        totals = np.add.reduceat(np.where(is_nan, 0, values), bounds[:-1])
+        counts = np.add.reduceat(~is_nan, bounds[:-1], dtype=np.intp)
+        return (totals / counts).astype(values.dtype)
 
     def aggregate_overlapping_entities(self, entities):
         if len(entities) == 0:
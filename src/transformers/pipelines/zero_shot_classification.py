@@ -2,13 +2,16 @@ from typing import List, Union
 
 import numpy as np
 
-from ..tokenization_utils import TruncationStrategy
+from ..tokenization_utils import BatchEncoding, TruncationStrategy
 from ..utils import add_end_docstrings, logging
 from .base import PIPELINE_INIT_ARGS, ArgumentHandler, ChunkPipeline
 
 
 logger = logging.get_logger(__name__)
 
+# Number of sets of candidate labels whose hypotheses are kept tokenized (or embedded) between calls
+_MAX_CACHED_LABEL_SETS = 32
+
 
 class ZeroShotClassificationArgumentHandler(ArgumentHandler):
     """
@@ -81,12 +84,25 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
 
     The models that this pipeline can use are models that have been fine-tuned on an NLI task. See the up-to-date list
     of available models on [huggingface.co/models](https://huggingface.co/models?search=nli).
+
+    The hypotheses of the candidate labels are tokenized once per set of labels and template and reused across calls,
+    and each sequence is tokenized once for all its labels. Use `batch_size=len(candidate_labels)` to run all the
+    premise/hypothesis pairs of a sequence in a single padded forward.
+
+    Text encoders that are not sequence classification models (e.g. [`CLIPTextModelWithProjection`] or a sentence
+    embedding model loaded with [`AutoModel`]) are used as dual encoders instead: the sequence and the hypotheses are
+    embedded separately (with the `text_embeds` of the model, or the mean of its last hidden states), the embeddings of
+    the hypotheses are computed once per set of labels and template, and the labels are scored by cosine similarity.
     """
 
     def __init__(self, args_parser=ZeroShotClassificationArgumentHandler(), *args, **kwargs):
         self._args_parser = args_parser
         super().__init__(*args, **kwargs)
-        if self.entailment_id == -1:
+        # Not an NLI model, the sequences and the hypotheses are embedded separately
+        self._dual_encoder = not self.model.__class__.__name__.endswith("ForSequenceClassification")
+        self._hypotheses_cache = {}
+        self._can_build_pairs = None
+        if self.entailment_id == -1 and not self._dual_encoder:
             logger.warning(
                 "Failed to determine 'entailment' label id from the label2id mapping in the model config. Setting to "
                 "-1. Define a descriptive label2id mapping in the model config to ensure correct outputs."
@@ -106,13 +122,7 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
         Parse arguments and tokenize only_first so that hypothesis (label) is not truncated
         """
         return_tensors = self.framework
-        if self.tokenizer.pad_token is None:
-            # Override for tokenizers not supporting padding
-            logger.error(
-                "Tokenizer was not supporting padding necessary for zero-shot, attempting to use "
-                " `pad_token=eos_token`"
-            )
-            self.tokenizer.pad_token = self.tokenizer.eos_token
+        self._ensure_pad_token()
         try:
             inputs = self.tokenizer(
                 sequence_pairs,
@@ -141,6 +151,67 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
 
         return inputs
 
+    def _ensure_pad_token(self):
+        if self.tokenizer.pad_token is None:
+            # Override for tokenizers not supporting padding
+            logger.error(
+                "Tokenizer was not supporting padding necessary for zero-shot, attempting to use "
+                " `pad_token=eos_token`"
+            )
+            self.tokenizer.pad_token = self.tokenizer.eos_token
+
+    def _get_cached(self, key, compute):
+        """
+        Returns the value cached for a set of candidate labels and a template, computing it with `compute` if needed.
+        """
+        if key not in self._hypotheses_cache:
+            if len(self._hypotheses_cache) >= _MAX_CACHED_LABEL_SETS:
+                # Forget the oldest set of labels
+                self._hypotheses_cache.pop(next(iter(self._hypotheses_cache)))
+            self._hypotheses_cache[key] = compute()
+        return self._hypotheses_cache[key]
+
+    def _build_pairs(self, sequence_ids, hypotheses_ids):
+        pairs = []
+        for hypothesis_ids in hypotheses_ids:
+            # Without padding, the attention mask is all ones (and asking for it would go through `pad`)
+            pair = self.tokenizer.prepare_for_model(
+                sequence_ids,
+                hypothesis_ids,
+                add_special_tokens=True,
+                truncation=TruncationStrategy.ONLY_FIRST,
+                return_attention_mask=False,
+            )
+            if "attention_mask" in self.tokenizer.model_input_names:
+                pair["attention_mask"] = [1] * len(pair["input_ids"])
+            pairs.append(BatchEncoding(pair, tensor_type=self.framework, prepend_batch_axis=True))
+        return pairs
+
+    def _tokenize_pairs(self, sequence, hypotheses, hypothesis_template):
+        """
+        Tokenizes the premise/hypothesis pairs of `sequence`, from the tokenized sequence and the cached tokenized
+        hypotheses when the tokenizer can build the pairs from the ids of their sequences.
+        """
+        self._ensure_pad_token()
+        if self._can_build_pairs is not False:
+            hypotheses_ids = self._get_cached(
+                ("ids", hypothesis_template, tuple(hypotheses)),
+                lambda: self.tokenizer(hypotheses, add_special_tokens=False)["input_ids"],
+            )
+            sequence_ids = self.tokenizer(sequence, add_special_tokens=False, verbose=False)["input_ids"]
+            if self._can_build_pairs is None:
+                # Some fast tokenizers only know how to add their special tokens in their backend, check once
+                # that the pairs are the same as when tokenizing the texts.
+                built = self._build_pairs(sequence_ids, hypotheses_ids[:1])[0]
+                tokenized = self._parse_and_tokenize([[sequence, hypotheses[0]]])
+                self._can_build_pairs = all(
+                    key in built and np.array_equal(np.asarray(built[key]), np.asarray(tokenized[key]))
+                    for key in tokenized
+                )
+            if self._can_build_pairs:
+                return self._build_pairs(sequence_ids, hypotheses_ids)
+        return [self._parse_and_tokenize([[sequence, hypothesis]]) for hypothesis in hypotheses]
+
     def _sanitize_parameters(self, **kwargs):
         if kwargs.get("multi_class", None) is not None:
             kwargs["multi_label"] = kwargs["multi_class"]
@@ -157,6 +228,8 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
         postprocess_params = {}
         if "multi_label" in kwargs:
             postprocess_params["multi_label"] = kwargs["multi_label"]
+        if "similarity_scale" in kwargs:
+            postprocess_params["similarity_scale"] = kwargs["similarity_scale"]
         return preprocess_params, {}, postprocess_params
 
     def __call__(
@@ -186,7 +259,10 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
                 Whether or not multiple candidate labels can be true. If `False`, the scores are normalized such that
                 the sum of the label likelihoods for each sequence is 1. If `True`, the labels are considered
                 independent and probabilities are normalized for each candidate by doing a softmax of the entailment
-                score vs. the contradiction score.
+                score vs. the contradiction score. With a dual encoder, the scores are the cosine similarities of the
+                sequence and the hypotheses.
+            similarity_scale (`float`, *optional*, defaults to 100.0):
+                With a dual encoder, the factor of the cosine similarities in the softmax over the candidate labels.
 
         Return:
             A `dict` or a list of `dict`: Each result comes as a dictionary with the following keys:
@@ -206,10 +282,24 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
 
     def preprocess(self, inputs, candidate_labels=None, hypothesis_template="This example is {}."):
         sequence_pairs, sequences = self._args_parser(inputs, candidate_labels, hypothesis_template)
+        hypotheses = [hypothesis for _, hypothesis in sequence_pairs]
 
-        for i, (candidate_label, sequence_pair) in enumerate(zip(candidate_labels, sequence_pairs)):
-            model_input = self._parse_and_tokenize([sequence_pair])
+        if self._dual_encoder:
+            # The hypotheses are embedded in `postprocess`, once per set of labels
+            self._ensure_pad_token()
+            model_input = self.tokenizer(sequences[0], return_tensors=self.framework, truncation=True)
+            yield {
+                "candidate_labels": candidate_labels,
+                "hypotheses": hypotheses,
+                "hypothesis_template": hypothesis_template,
+                "sequence": sequences[0],
+                "is_last": True,
+                **model_input,
+            }
+            return
 
+        model_inputs = self._tokenize_pairs(sequences[0], hypotheses, hypothesis_template)
+        for i, (candidate_label, model_input) in enumerate(zip(candidate_labels, model_inputs)):
             yield {
                 "candidate_label": candidate_label,
                 "sequence": sequences[0],
@@ -218,11 +308,20 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
             }
 
     def _forward(self, inputs):
-        candidate_label = inputs["candidate_label"]
-        sequence = inputs["sequence"]
-        model_inputs = {k: inputs[k] for k in self.tokenizer.model_input_names}
+        model_inputs = {k: inputs[k] for k in self.tokenizer.model_input_names if k in inputs}
         outputs = self.model(**model_inputs)
 
+        if self._dual_encoder:
+            model_outputs = {k: v for k, v in inputs.items() if k not in model_inputs}
+            if "text_embeds" in outputs:
+                model_outputs["text_embeds"] = outputs["text_embeds"]
+            else:
+                model_outputs["last_hidden_state"] = outputs[0]
+                model_outputs["attention_mask"] = model_inputs.get("attention_mask", None)
+            return model_outputs
+
+        candidate_label = inputs["candidate_label"]
+        sequence = inputs["sequence"]
         model_outputs = {
             "candidate_label": candidate_label,
             "sequence": sequence,
@@ -231,7 +330,52 @@ class ZeroShotClassificationPipeline(ChunkPipeline):
         }
         return model_outputs
 
-    def postprocess(self, model_outputs, multi_label=False):
+    def _get_embeddings(self, model_outputs):
+        if "text_embeds" in model_outputs:
+            embeddings = model_outputs["text_embeds"].numpy()
+        else:
+            # Mean of the hidden states of the tokens which are not padding
+            hidden_states = model_outputs["last_hidden_state"].numpy()
+            attention_mask = model_outputs.get("attention_mask", None)
+            if attention_mask is None:
+                embeddings = hidden_states.mean(axis=1)
+            else:
+                attention_mask = attention_mask.numpy()[..., None].astype(hidden_states.dtype)
+                embeddings = (hidden_states * attention_mask).sum(axis=1) / attention_mask.sum(axis=1)
+        return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True)
+
+    def _get_hypotheses_embeddings(self, hypotheses, hypothesis_template):
+        def embed_hypotheses():
+            model_inputs = self._parse_and_tokenize(hypotheses, truncation=True)
+            return self._get_embeddings(self.forward(model_inputs))
+
+        return self._get_cached(("embeddings", hypothesis_template, tuple(hypotheses)), embed_hypotheses)
+
+    def _postprocess_dual_encoder(self, model_outputs, multi_label=False, similarity_scale=100.0):
+        output = model_outputs[0]
+        candidate_labels = output["candidate_labels"]
+        sequence_embeddings = self._get_embeddings(output)
+        hypotheses_embeddings = self._get_hypotheses_embeddings(output["hypotheses"], output["hypothesis_template"])
+        similarities = sequence_embeddings @ hypotheses_embeddings.T
+
+        if multi_label or len(candidate_labels) == 1:
+            scores = similarities
+        else:
+            logits = similarity_scale * similarities
+            scores = np.exp(logits - logits.max(-1, keepdims=True))
+            scores = scores / scores.sum(-1, keepdims=True)
+
+        top_inds = list(reversed(scores[0].argsort()))
+        return {
+            "sequence": output["sequence"],
+            "labels": [candidate_labels[i] for i in top_inds],
+            "scores": scores[0, top_inds].tolist(),
+        }
+
+    def postprocess(self, model_outputs, multi_label=False, similarity_scale=100.0):
+        if self._dual_encoder:
+            return self._postprocess_dual_encoder(model_outputs, multi_label, similarity_scale)
+
         candidate_labels = [outputs["candidate_label"] for outputs in model_outputs]
         sequences = [outputs["sequence"] for outputs in model_outputs]
         logits = np.concatenate([output["logits"].numpy() for output in model_outputs])
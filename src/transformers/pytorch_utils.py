@@ -19,7 +19,7 @@ from packaging import version
 from safetensors.torch import storage_ptr, storage_size
 from torch import nn
 
-from .utils import logging
+from .utils import ModelOutput, logging
 
 
 ALL_LAYERNORM_LAYERS = [nn.LayerNorm]
@@ -239,6 +239,92 @@ def apply_chunking_to_forward(
     return forward_fn(*input_tensors)
 
 
+class SequencePacking:
+    """
+    Packs the sequences of a padded batch into as few rows as possible (first-fit decreasing), so that an encoder does
+    not spend most of its compute on padding tokens when the lengths of the sequences are skewed. Sequences sharing a
+    row are kept from attending to each other with a block-diagonal self-attention mask, so the outputs of the real
+    tokens are the same as with the padded batch as long as the model uses absolute position embeddings (computed
+    before packing).
+
+    Args:
+        attention_mask (`torch.Tensor` of shape `(batch_size, seq_length)`):
+            The padding mask of the batch, with 1 for the tokens to attend to and 0 for padding tokens. Both right and
+            left padding are supported.
+    """
+
+    def __init__(self, attention_mask: torch.Tensor):
+        self.batch_size, self.seq_length = attention_mask.shape
+        lengths = attention_mask.ne(0).sum(-1)
+
+        rows, offsets, row_lengths = [0] * self.batch_size, [0] * self.batch_size, []
+        sequence_lengths = lengths.tolist()
+        for index in sorted(range(self.batch_size), key=lambda i: -sequence_lengths[i]):
+            length = sequence_lengths[index]
+            for row, row_length in enumerate(row_lengths):
+                if row_length + length <= self.seq_length:
+                    break
+            else:
+                row = len(row_lengths)
+                row_lengths.append(0)
+            rows[index], offsets[index] = row, row_lengths[row]
+            row_lengths[row] += length
+        self.num_rows = len(row_lengths)
+
+        device = attention_mask.device
+        # positions of the real tokens in the flattened padded batch (grouped by sequence) and in the packed one
+        self.indices = attention_mask.flatten().ne(0).nonzero().squeeze(-1)
+        starts = torch.tensor([row * self.seq_length + offset for row, offset in zip(rows, offsets)], device=device)
+        first_tokens = nn.functional.pad(lengths.cumsum(0)[:-1], (1, 0))
+        token_positions = torch.arange(len(self.indices), device=device) - first_tokens.repeat_interleave(lengths)
+        self.packed_indices = starts.repeat_interleave(lengths) + token_positions
+
+        segment_ids = torch.zeros(self.num_rows * self.seq_length, dtype=torch.long, device=device)
+        segment_ids[self.packed_indices] = torch.arange(1, self.batch_size + 1, device=device).repeat_interleave(
+            lengths
+        )
+        segment_ids = segment_ids.view(self.num_rows, self.seq_length)
+        attention_mask_3d = (segment_ids[:, :, None] == segment_ids[:, None, :]) & (segment_ids[:, None, :] != 0)
+        self.attention_mask = attention_mask_3d.to(attention_mask.dtype)
+
+    @classmethod
+    def from_attention_mask(cls, attention_mask: torch.Tensor) -> Optional["SequencePacking"]:
+        """
+        Returns the packing of the batch described by `attention_mask`, or `None` if packing would not save any row.
+        """
+        if attention_mask.dim() != 2:
+            return None
+        packing = cls(attention_mask)
+        return packing if packing.num_rows < packing.batch_size else None
+
+    def pack(self, hidden_states: torch.Tensor) -> torch.Tensor:
+        """
+        Packs `hidden_states` of shape `(batch_size, seq_length, ...)` into a tensor of shape `(num_rows, seq_length,
+        ...)`.
+        """
+        feature_shape = hidden_states.shape[2:]
+        packed = hidden_states.new_zeros((self.num_rows * self.seq_length,) + feature_shape)
+        packed[self.packed_indices] = hidden_states.reshape((-1,) + feature_shape)[self.indices]
+        return packed.view((self.num_rows, self.seq_length) + feature_shape)
+
+    def unpack(self, outputs):
+        """
+        Reverts [`~SequencePacking.pack`] on a tensor, or on all the tensors of a tuple or a [`~utils.ModelOutput`].
+        The padding positions of the unpacked tensors are filled with zeros.
+        """
+        if isinstance(outputs, ModelOutput):
+            for key, value in outputs.items():
+                outputs[key] = self.unpack(value)
+            return outputs
+        elif isinstance(outputs, (tuple, list)):
+            return type(outputs)(self.unpack(output) for output in outputs)
+
+        feature_shape = outputs.shape[2:]
+        unpacked = outputs.new_zeros((self.batch_size * self.seq_length,) + feature_shape)
+        unpacked[self.indices] = outputs.reshape((-1,) + feature_shape)[self.packed_indices]
+        return unpacked.view((self.batch_size, self.seq_length) + feature_shape)
+
+
 def find_pruneable_heads_and_indices(
     heads: List[int], n_heads: int, head_size: int, already_pruned_heads: Set[int]
 ) -> Tuple[Set[int], torch.LongTensor]:
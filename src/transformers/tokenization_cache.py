@@ -0,0 +1,313 @@
+# coding=utf-8
+# Copyright 2023 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Persistent cache of tokenizer outputs. The outputs are stored on disk in memory-mapped NumPy files, in a directory
+specific to the tokenizer and to the arguments it is called with, so that the same corpus is only tokenized once across
+runs.
+"""
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from typing import Any, Dict, List, Union
+
+import numpy as np
+from filelock import FileLock
+
+from .tokenization_utils_base import BatchEncoding, PreTrainedTokenizerBase, RaggedArray
+from .utils import logging
+
+
+logger = logging.get_logger(__name__)
+
+SEGMENT_INFO_FILE = "segment.json"
+CACHE_INFO_FILE = "cache_info.json"
+
+# Arguments applied to the whole batch after the cached encodings are retrieved
+_BATCH_KWARGS = ("padding", "pad_to_multiple_of", "return_tensors", "verbose")
+
+
+def _hash_file(path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def get_tokenizer_fingerprint(tokenizer: PreTrainedTokenizerBase, **kwargs) -> str:
+    """
+    Returns a hash of everything that changes the output of `tokenizer(text, **kwargs)` for a given text: the class of
+    the tokenizer, its vocabulary and added tokens, its normalization settings and the call arguments.
+    """
+    state = {
+        "class": tokenizer.__class__.__name__,
+        "init_kwargs": tokenizer.init_kwargs,
+        "special_tokens": tokenizer.special_tokens_map_extended,
+        "added_tokens": tokenizer.get_added_vocab(),
+        "padding_side": tokenizer.padding_side,
+        "truncation_side": tokenizer.truncation_side,
+        "model_max_length": tokenizer.model_max_length,
+        "do_lower_case": getattr(tokenizer, "do_lower_case", None),
+        "call_kwargs": kwargs,
+    }
+    if tokenizer.is_fast:
+        # Contains the vocabulary, the merges, the normalizer, the pre-tokenizer and the post-processor
+        state["backend_tokenizer"] = tokenizer.backend_tokenizer.to_str()
+    else:
+        state["vocab_files"] = {}
+        for name in tokenizer.vocab_files_names:
+            path = tokenizer.init_kwargs.get(name)
+            if isinstance(path, str) and os.path.isfile(path):
+                state["vocab_files"][name] = _hash_file(path)
+        if not state["vocab_files"]:
+            state["vocab"] = sorted(tokenizer.get_vocab().items())
+
+    serialized = json.dumps(state, sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(serialized.encode("utf-8")).hexdigest()
+
+
+def _hash_input(text) -> bytes:
+    return hashlib.blake2b(json.dumps(text, ensure_ascii=False).encode("utf-8"), digest_size=16).digest()
+
+
+class _Segment:
+    """
+    One immutable shard of the cache: the hashes of its texts, sorted, and one [`RaggedArray`] per output key whose
+    rows are in the same order, all memory-mapped.
+    """
+
+    def __init__(self, path: str):
+        with open(os.path.join(path, SEGMENT_INFO_FILE), encoding="utf-8") as f:
+            info = json.load(f)
+        self.scalar_keys = set(info["scalar_keys"])
+        self.hashes = np.load(os.path.join(path, "hashes.npy"), mmap_mode="r")
+        self.arrays = {
+            key: RaggedArray(
+                np.load(os.path.join(path, f"{key}.values.npy"), mmap_mode="r"),
+                np.load(os.path.join(path, f"{key}.offsets.npy"), mmap_mode="r"),
+            )
+            for key in info["keys"]
+        }
+
+    def find(self, hashes: np.ndarray) -> np.ndarray:
+        """
+        Returns the row of each of `hashes` in this segment, or -1 when it is not in it.
+        """
+        rows = np.searchsorted(self.hashes, hashes)
+        found = rows < len(self.hashes)
+        found[found] = self.hashes[rows[found]] == hashes[found]
+        return np.where(found, rows, -1)
+
+    def get(self, key: str, row: int):
+        value = self.arrays[key][row]
+        if key in self.scalar_keys:
+            return value[0].item()
+        # Offset mappings are lists of tuples
+        return [tuple(item) for item in value.tolist()] if value.ndim > 1 else value.tolist()
+
+    @staticmethod
+    def write(path: str, entries: Dict[bytes, Dict[str, Any]]):
+        hashes = sorted(entries)
+        keys = list(entries[hashes[0]].keys())
+        scalar_keys = [key for key in keys if not isinstance(entries[hashes[0]][key], (list, tuple))]
+
+        tmp_path = f"{path}.tmp-{uuid.uuid4().hex}"
+        os.makedirs(tmp_path)
+        np.save(os.path.join(tmp_path, "hashes.npy"), np.array(hashes, dtype="S16"))
+        for key in keys:
+            rows = [entries[h][key] for h in hashes]
+            if key in scalar_keys:
+                rows = [[row] for row in rows]
+            array = RaggedArray.from_sequences(rows)
+            np.save(os.path.join(tmp_path, f"{key}.values.npy"), array.values)
+            np.save(os.path.join(tmp_path, f"{key}.offsets.npy"), array.offsets)
+        with open(os.path.join(tmp_path, SEGMENT_INFO_FILE), "w", encoding="utf-8") as f:
+            json.dump({"keys": keys, "scalar_keys": scalar_keys, "num_rows": len(hashes)}, f)
+        # Readers only see complete segments
+        os.rename(tmp_path, path)
+
+
+class TokenizationCache:
+    """
+    Persistent cache of the outputs of a tokenizer, keyed by the hash of each text. Calling the cache like the
+    tokenizer returns the same encodings, but only the texts that were never seen before with the same tokenizer and
+    the same arguments are actually tokenized. Cached encodings are read from memory-mapped files and are shared
+    between processes and runs.
+
+    The cache directory holds one subdirectory per fingerprint of the tokenizer (vocabulary, added tokens,
+    normalization settings) and of the call arguments, so a change of any of them never serves stale encodings.
+    Padding and tensor conversion (`padding`, `pad_to_multiple_of` and `return_tensors`) are applied to the whole batch
+    after the lookup, so they can change between calls without invalidating the cache.
+
+    Example:
+
+    ```python
+    >>> from transformers import AutoTokenizer, TokenizationCache
+
+    >>> tokenizer = AutoTokenizer.from_pretrained("bert-base-uncased")
+    >>> cache = TokenizationCache(tokenizer, "./tokenization_cache")
+    >>> batch = cache(["Hello world!", "How are you?"], truncation=True, max_length=128)
+    >>> cache.flush()
+    ```
+
+    Args:
+        tokenizer ([`PreTrainedTokenizerBase`]):
+            The tokenizer whose outputs are cached.
+        cache_dir (`str` or `os.PathLike`):
+            The directory in which the encodings are stored.
+        max_pending (`int`, *optional*, defaults to 100000):
+            The number of new encodings kept in memory before they are written to disk as a new segment. The pending
+            encodings are also written by [`~TokenizationCache.flush`] and when the cache is used as a context
+            manager.
+    """
+
+    def __init__(
+        self, tokenizer: PreTrainedTokenizerBase, cache_dir: Union[str, os.PathLike], max_pending: int = 100000
+    ):
+        self.tokenizer = tokenizer
+        self.cache_dir = str(cache_dir)
+        self.max_pending = max_pending
+        # Segments and pending encodings of each fingerprint
+        self._segments: Dict[str, Dict[str, _Segment]] = {}
+        self._pending: Dict[str, Dict[bytes, Dict[str, Any]]] = {}
+        self._pending_kwargs: Dict[str, Dict[str, Any]] = {}
+
+    def _get_segments(self, fingerprint: str) -> List[_Segment]:
+        directory = os.path.join(self.cache_dir, fingerprint)
+        segments = self._segments.setdefault(fingerprint, {})
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if name.startswith("segment-") and ".tmp-" not in name and name not in segments:
+                    segments[name] = _Segment(os.path.join(directory, name))
+        return list(segments.values())
+
+    def _write(self, fingerprint: str):
+        entries = self._pending.pop(fingerprint, None)
+        call_kwargs = self._pending_kwargs.pop(fingerprint, None)
+        if not entries:
+            return
+        directory = os.path.join(self.cache_dir, fingerprint)
+        os.makedirs(directory, exist_ok=True)
+        with FileLock(os.path.join(directory, ".lock")):
+            info_file = os.path.join(directory, CACHE_INFO_FILE)
+            if not os.path.isfile(info_file):
+                with open(info_file, "w", encoding="utf-8") as f:
+                    json.dump(
+                        {"tokenizer_class": self.tokenizer.__class__.__name__, "call_kwargs": call_kwargs},
+                        f,
+                        default=str,
+                        indent=2,
+                    )
+            _Segment.write(os.path.join(directory, f"segment-{uuid.uuid4().hex}"), entries)
+        logger.info(f"Wrote {len(entries)} encodings to the tokenization cache in {directory}")
+
+    def flush(self):
+        """
+        Writes the pending encodings to disk.
+        """
+        for fingerprint in list(self._pending):
+            self._write(fingerprint)
+
+    def clear(self):
+        """
+        Deletes all the encodings of this cache, on disk and in memory.
+        """
+        self._segments = {}
+        self._pending = {}
+        self._pending_kwargs = {}
+        if os.path.isdir(self.cache_dir):
+            shutil.rmtree(self.cache_dir)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
+
+    def __call__(self, text, text_pair=None, **kwargs) -> BatchEncoding:
+        """
+        Encodes `text` (and `text_pair`) like `self.tokenizer(text, text_pair, **kwargs)`, reading the encodings of the
+        texts already in the cache instead of tokenizing them. The result does not hold the `tokenizers.Encoding`
+        objects of fast tokenizers, so the alignment methods of [`BatchEncoding`] are not available.
+        """
+        if kwargs.get("return_overflowing_tokens", False):
+            raise ValueError("The tokenization cache does not support `return_overflowing_tokens=True`.")
+        batch_kwargs = {key: kwargs.pop(key) for key in _BATCH_KWARGS if key in kwargs}
+        is_batched = isinstance(text, (list, tuple)) and not (
+            kwargs.get("is_split_into_words", False) and (len(text) == 0 or not isinstance(text[0], (list, tuple)))
+        )
+        texts = text if is_batched else [text]
+        text_pairs = text_pair if is_batched or text_pair is None else [text_pair]
+        inputs = texts if text_pairs is None else [list(pair) for pair in zip(texts, text_pairs)]
+
+        fingerprint = get_tokenizer_fingerprint(self.tokenizer, **kwargs)
+        hashes = np.array([_hash_input(example) for example in inputs], dtype="S16")
+
+        # Look up the hashes in the segments on disk, then in the pending encodings
+        segment_of = np.full(len(hashes), -1)
+        row_of = np.full(len(hashes), -1)
+        segments = self._get_segments(fingerprint)
+        for index, segment in enumerate(segments):
+            missing = segment_of == -1
+            rows = segment.find(hashes[missing])
+            found = rows != -1
+            segment_of[np.flatnonzero(missing)[found]] = index
+            row_of[np.flatnonzero(missing)[found]] = rows[found]
+
+        pending = self._pending.setdefault(fingerprint, {})
+        self._pending_kwargs[fingerprint] = kwargs
+        misses = {}
+        for i in np.flatnonzero(segment_of == -1):
+            key = hashes[i].ljust(16, b"\x00")
+            if key not in pending and key not in misses:
+                misses[key] = i
+        if misses:
+            miss_indices = list(misses.values())
+            miss_texts = [texts[i] for i in miss_indices]
+            miss_pairs = [text_pairs[i] for i in miss_indices] if text_pairs is not None else None
+            encodings = self.tokenizer(miss_texts, miss_pairs, **kwargs)
+            for j, key in enumerate(misses):
+                pending[key] = {name: values[j] for name, values in encodings.items()}
+            logger.info(f"Tokenized {len(misses)} texts missing from the tokenization cache")
+
+        data = {}
+        for i in range(len(hashes)):
+            if segment_of[i] != -1:
+                segment = segments[segment_of[i]]
+                encoding = {key: segment.get(key, row_of[i]) for key in segment.arrays}
+            else:
+                encoding = pending[hashes[i].ljust(16, b"\x00")]
+            for key, value in encoding.items():
+                data.setdefault(key, []).append(value)
+
+        if len(pending) >= self.max_pending:
+            self._write(fingerprint)
+
+        # Like the tokenizer, a single text gets a batch axis only when tensors are returned
+        if not is_batched and batch_kwargs.get("return_tensors") is None:
+            data = {key: values[0] for key, values in data.items()}
+        if batch_kwargs.get("padding", False) not in (False, "do_not_pad") or "pad_to_multiple_of" in batch_kwargs:
+            return self.tokenizer.pad(
+                data,
+                padding=batch_kwargs.get("padding", False),
+                max_length=kwargs.get("max_length"),
+                pad_to_multiple_of=batch_kwargs.get("pad_to_multiple_of"),
+                return_attention_mask=kwargs.get("return_attention_mask"),
+                return_tensors=batch_kwargs.get("return_tensors"),
+                verbose=batch_kwargs.get("verbose", True),
+            )
+        return BatchEncoding(data, tensor_type=batch_kwargs.get("return_tensors"))
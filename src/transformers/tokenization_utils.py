@@ -18,10 +18,15 @@
 """
 import bisect
 import itertools
+import math
 import re
 import unicodedata
+import weakref
 from collections import OrderedDict
-from typing import Any, Dict, List, Optional, Tuple, Union, overload
+from concurrent.futures import ProcessPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, Union, overload
+
+import numpy as np
 
 from .tokenization_utils_base import (
     ENCODE_KWARGS_DOCSTRING,
@@ -34,11 +39,28 @@ from .tokenization_utils_base import (
     PreTokenizedInput,
     PreTokenizedInputPair,
     PreTrainedTokenizerBase,
+    RaggedArray,
     TextInput,
     TextInputPair,
     TruncationStrategy,
 )
-from .utils import PaddingStrategy, TensorType, add_end_docstrings, logging
+from .utils import (
+    PaddingStrategy,
+    TensorType,
+    add_end_docstrings,
+    is_tf_available,
+    is_torch_available,
+    logging,
+    to_numpy,
+    to_py_obj,
+)
+
+
+if TYPE_CHECKING:
+    if is_torch_available():
+        import torch
+    if is_tf_available():
+        import tensorflow as tf
 
 
 logger = logging.get_logger(__name__)
@@ -48,15 +70,46 @@ SPECIAL_TOKENS_MAP_FILE = "special_tokens_map.json"
 ADDED_TOKENS_FILE = "added_tokens.json"
 TOKENIZER_CONFIG_FILE = "tokenizer_config.json"
 
+# Process pools used to encode batches with `num_proc`, per tokenizer and number of processes. The workers receive a copy
+# of the tokenizer once, when the pool is created.
+_TOKENIZER_PROCESS_POOLS = weakref.WeakKeyDictionary()
+_WHITESPACE_PATTERN = re.compile(r"\s*")
+_NON_WHITESPACE_PATTERN = re.compile(r"\S+")
+_worker_tokenizer = None
+
+
+def _init_tokenizer_worker(tokenizer):
+    global _worker_tokenizer
+    _worker_tokenizer = tokenizer
+
+
+def _batch_get_input_ids_in_worker(batch_text_or_text_pairs, is_split_into_words, kwargs):
+    return _worker_tokenizer._batch_get_input_ids(
+        batch_text_or_text_pairs, is_split_into_words=is_split_into_words, **kwargs
+    )
+
 
 class Trie:
     """
     Trie in Python. Creates a Trie out of a list of words. The trie is used to split on `added_tokens` in one pass
     Loose reference https://en.wikipedia.org/wiki/Trie
+
+    Matching is done with an Aho-Corasick automaton (https://en.wikipedia.org/wiki/Aho%E2%80%93Corasick_algorithm)
+    built lazily from the trie, so that splitting stays linear in the length of the text even with a very large
+    number of added tokens.
     """
 
     def __init__(self):
         self.data = {}
+        self._automaton = None
+
+    def __getstate__(self):
+        # The automaton is rebuilt on the first call to `split`
+        return {"data": self.data}
+
+    def __setstate__(self, state):
+        self.data = state["data"]
+        self._automaton = None
 
     def add(self, word: str):
         """
@@ -86,13 +139,58 @@ class Trie:
             ref[char] = char in ref and ref[char] or {}
             ref = ref[char]
         ref[""] = 1
+        self._automaton = None
+
+    def _build_automaton(self):
+        """
+        Converts `data` into an Aho-Corasick automaton. Nodes are numbered in breadth-first order (0 is the root) and
+        described by four lists:
+
+            - `transitions`: the children of the node, as a mapping from a char to a node.
+            - `fail`: the node of the longest proper suffix of the node's prefix which is also a prefix in the trie.
+            - `depth`: the length of the node's prefix.
+            - `match`: the length of the longest word that is a suffix of the node's prefix (0 if there is none).
+        """
+        transitions = [{}]
+        fail = [0]
+        depth = [0]
+        match = [0]
+        # Breadth-first traversal of `data`, `refs[node]` is the dict of `data` representing `node`
+        refs = [self.data]
+        node = 0
+        while node < len(refs):
+            children = transitions[node]
+            child_depth = depth[node] + 1
+            for char, child_ref in refs[node].items():
+                if char == "":
+                    continue
+                child = len(refs)
+                refs.append(child_ref)
+                transitions.append({})
+                children[char] = child
+                depth.append(child_depth)
+
+                # The failure link of a child of the root is the root, the others follow the failure links of
+                # their parent until a node can be extended with `char`.
+                child_fail = 0
+                if node:
+                    state = fail[node]
+                    while char not in transitions[state] and state:
+                        state = fail[state]
+                    child_fail = transitions[state].get(char, 0)
+                fail.append(child_fail)
+                match.append(child_depth if "" in child_ref else match[child_fail])
+            node += 1
+        self._automaton = (transitions, fail, depth, match)
+        return self._automaton
 
     def split(self, text: str) -> List[str]:
         """
         Will look for the words added to the trie within `text`. Output is the original string splitted along the
         boundaries of the words found.
 
-        This trie will match the longest possible word first !
+        This trie will match the leftmost word first, and the longest one if several words start at the same
+        position !
 
         Example:
 
@@ -108,135 +206,54 @@ class Trie:
         ["[CLS]", " This is a ", "extra_id_100"]
         ```
         """
+        transitions, fail, depth, match = self._automaton or self._build_automaton()
+        root = transitions[0]
+
         # indexes are counted left of the chars index.
         # "hello", index 0, is left of h, index 1 is between h and e.
         # index 5 is right of the "o".
 
-        # States are going to capture every possible start (indexes as above)
-        # as keys, and have as values, a pointer to the position in the trie
-        # where we're at. This is a partial match for now.
-        # This enables to keep track of multiple matches while we're iterating
-        # the string
-        # If the trie contains, "blowing", and "lower" and we encounter the
-        # string "blower", we need to split into ["b", "lower"].
-        # This is where we need to keep track of multiple possible starts.
-        states = OrderedDict()
-
         # This will contain every indices where we need
         # to cut.
         # We force to cut at offset 0 and len(text) (added later)
         offsets = [0]
 
-        # This is used by the lookahead which needs to skip over
-        # some text where the full match exceeded the place in the initial
-        # for loop
-        skip = 0
-        # Main loop, Giving this algorithm O(n) complexity
-        for current, current_char in enumerate(text):
-            if skip and current < skip:
-                # Prevents the lookahead for matching twice
-                # like extra_id_100 and id_100
-                continue
-
-            # This will track every state
-            # that stop matching, we need to stop tracking them.
-            # If we look at "lowball", we're going to match "l" (add it to states), "o", "w", then
-            # fail on "b", we need to remove 0 from the valid states.
-            to_remove = set()
-            # Whenever we found a match, we need to drop everything
-            # this is a greedy algorithm, it will match on the first found token
-            reset = False
-
-            # In this case, we already have partial matches (But unfinished)
-            for start, trie_pointer in states.items():
-                if "" in trie_pointer:
-                    # This is a final match, we need to reset and
-                    # store the results in `offsets`.
-
-                    # Lookahead to match longest first
-                    # Important in case of extra_id_1 vs extra_id_100
-                    # Here we are also actively looking for other earlier partial
-                    # matches
-                    # "[CLS]", "L", we need to match CLS even if L is special
-                    for lookstart, looktrie_pointer in states.items():
-                        if lookstart > start:
-                            # This partial match is later, we can stop looking
-                            break
-                        elif lookstart < start:
-                            # This partial match is earlier, the trie pointer
-                            # was already updated, so index is + 1
-                            lookahead_index = current + 1
-                            end = current + 1
-                        else:
-                            # Here lookstart == start and
-                            #      looktrie_pointer == trie_pointer
-                            # It wasn't updated yet so indices are current ones
-                            lookahead_index = current
-                            end = current
-                        next_char = text[lookahead_index] if lookahead_index < len(text) else None
-                        if "" in looktrie_pointer:
-                            start = lookstart
-                            end = lookahead_index
-                            skip = lookahead_index
-
-                        while next_char in looktrie_pointer:
-                            looktrie_pointer = looktrie_pointer[next_char]
-                            lookahead_index += 1
-                            if "" in looktrie_pointer:
-                                start = lookstart
-                                end = lookahead_index
-                                skip = lookahead_index
-
-                            if lookahead_index == len(text):
-                                # End of string
-                                break
-                            next_char = text[lookahead_index]
-                        # End lookahead
-
-                    # Storing and resetting
-                    offsets.append(start)
-                    offsets.append(end)
-                    reset = True
-                    break
-                elif current_char in trie_pointer:
-                    # The current character being looked at has a match within the trie
-                    # update the pointer (it will be stored back into states later).
-                    trie_pointer = trie_pointer[current_char]
-
-                    # Storing back the new pointer into the states.
-                    # Partial matches got longer by one.
-                    states[start] = trie_pointer
+        # `state` is the node of the longest suffix of `text[:current]` which is a prefix of a word, `start` and
+        # `end` delimit the best match found so far and not stored in `offsets` yet (`start` is -1 if there is none).
+        # If the trie contains "blowing" and "lower" and we encounter the string "blower", we need to split into
+        # ["b", "lower"]: the failure links move from the partial match "blow" to "low" without going back.
+        state = 0
+        current = 0
+        start = end = -1
+        while current < len(text) or start >= 0:
+            if current < len(text):
+                char = text[current]
+                current += 1
+                if not state:
+                    # Fast path for chars that can't start a word
+                    state = root.get(char, 0)
                 else:
-                    # The new character has not match in the trie, we need
-                    # to stop keeping track of this partial match.
-                    # We can't do it directly within the loop because of how
-                    # python iteration works
-                    to_remove.add(start)
-
-            # Either clearing the full start (we found a real match)
-            # Or clearing only the partial matches that didn't work.
-            if reset:
-                states = {}
-            else:
-                for start in to_remove:
-                    del states[start]
-
-            # If this character is a starting character within the trie
-            # start keeping track of this partial match.
-            if current >= skip and current_char in self.data:
-                states[current] = self.data[current_char]
-
-        # We have a cut at the end with states.
-        for start, trie_pointer in states.items():
-            if "" in trie_pointer:
-                # This is a final match, we need to reset and
-                # store the results in `offsets`.
-                end = len(text)
-                offsets.append(start)
-                offsets.append(end)
-                # Longest cut is always the one with lower start so the first
-                # item so we need to break.
-                break
+                    while char not in transitions[state] and state:
+                        state = fail[state]
+                    state = transitions[state].get(char, 0)
+
+                length = match[state]
+                # Matches ending later with the same start are longer, so they replace the current one
+                if length and (start < 0 or current - length <= start):
+                    start = current - length
+                    end = current
+
+                if start < 0 or current - depth[state] <= start:
+                    # A longer match starting at (or before) `start` is still possible
+                    continue
+
+            # Storing and resetting: the chars after `end` that were already read have to be looked at again, as
+            # the partial matches they are part of might have started inside the stored match.
+            offsets.append(start)
+            offsets.append(end)
+            current = end
+            state = 0
+            start = -1
 
         return self.cut_text(text, offsets)
 
@@ -265,6 +282,35 @@ class Trie:
         return tokens
 
 
+class LRUCache(OrderedDict):
+    """
+    Dictionary keeping at most `max_size` items, evicting the least recently used ones. Used by the BPE tokenizers to
+    cache the tokenization of words, which would otherwise grow without bound on large corpora.
+
+    Args:
+        max_size (`int`, *optional*, defaults to 65536):
+            The maximum number of items in the cache.
+    """
+
+    def __init__(self, *args, max_size: int = 65536, **kwargs):
+        self.max_size = max_size
+        super().__init__(*args, **kwargs)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+    def __reduce__(self):
+        return (self.__class__, (list(self.items()),), {"max_size": self.max_size})
+
+
 def _is_whitespace(char):
     """Checks whether `char` is a whitespace character."""
     # \t, \n, and \r are technically control characters but we treat them
@@ -316,6 +362,31 @@ def _is_start_of_word(text):
     return bool(_is_control(first_char) | _is_punctuation(first_char) | _is_whitespace(first_char))
 
 
+def _normalize_for_alignment(text: str) -> Tuple[str, List[int]]:
+    """
+    Lowercases `text` and removes its accents, so that the tokens of a tokenizer normalizing its inputs can be found in
+    it. Returns the normalized text and the index in `text` of each of its characters.
+    """
+    if text.isascii():
+        return text.lower(), range(len(text))
+    chars = []
+    index = []
+    for i, char in enumerate(text):
+        char = unicodedata.normalize("NFKD", char)
+        char = "".join(c for c in char if not unicodedata.combining(c)).lower()
+        chars.append(char)
+        index.extend([i] * len(char))
+    return "".join(chars), index
+
+
+def _concatenate_to_ragged_array(arrays: List[np.ndarray]) -> RaggedArray:
+    """Concatenates one-dimensional int32 arrays in a [`RaggedArray`]."""
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(array) for array in arrays], out=offsets[1:])
+    values = np.concatenate(arrays) if arrays else np.zeros(0, dtype=np.int32)
+    return RaggedArray(values, offsets)
+
+
 def _insert_one_token_to_ordered_list(token_list: List[str], new_token: str):
     """
     Inserts one token to an ordered list if it does not already exist. Note: token_list must be sorted.
@@ -352,6 +423,13 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
         self.added_tokens_decoder: Dict[int, str] = {}
         self.unique_no_split_tokens: List[str] = []
         self.tokens_trie = Trie()
+        # Structures derived from the special tokens used by `tokenize`, see `_get_no_split_structures`
+        self._no_split_structures = None
+        # Lookup tables used when decoding, see `_get_special_ids` and `_get_decode_tables`
+        self._special_ids = None
+        self._decode_tables = None
+        # Normalized text of each token, used to compute the offsets, see `_align_tokens`
+        self._token_texts = LRUCache()
 
         self._decode_use_source_tokenizer = False
 
@@ -366,6 +444,14 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
         """
         raise NotImplementedError
 
+    @property
+    def _supports_offsets_mapping(self) -> bool:
+        # Tokenizers with their own encoding methods (like the ones also taking bounding boxes) don't compute offsets
+        return (
+            type(self)._encode_plus is PreTrainedTokenizer._encode_plus
+            and type(self)._batch_encode_plus is PreTrainedTokenizer._batch_encode_plus
+        )
+
     def get_added_vocab(self) -> Dict[str, int]:
         """
         Returns the added tokens in the vocabulary as a dictionary of token to index.
@@ -443,9 +529,23 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
             else:
                 self.unique_no_split_tokens = sorted(set(self.unique_no_split_tokens).union(set(tokens_to_add)))
         self._create_trie(self.unique_no_split_tokens)
+        # the workers of the process pools have a copy of the tokenizer without the new tokens
+        self._shutdown_process_pools()
 
         return len(tokens_to_add)
 
+    def _get_process_pool(self, num_proc: int) -> ProcessPoolExecutor:
+        pools = _TOKENIZER_PROCESS_POOLS.setdefault(self, {})
+        if num_proc not in pools:
+            pools[num_proc] = ProcessPoolExecutor(
+                max_workers=num_proc, initializer=_init_tokenizer_worker, initargs=(self,)
+            )
+        return pools[num_proc]
+
+    def _shutdown_process_pools(self):
+        for pool in _TOKENIZER_PROCESS_POOLS.pop(self, {}).values():
+            pool.shutdown(wait=False)
+
     def _create_trie(self, unique_no_split_tokens):
         trie = Trie()
         for token in unique_no_split_tokens:
@@ -454,6 +554,83 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
             else:
                 trie.add(token)
         self.tokens_trie = trie
+        self._no_split_structures = None
+        self._token_texts = LRUCache()
+
+    def _get_no_split_structures(self):
+        """
+        Returns the set of tokens that are never split, the mapping from special tokens to their `AddedToken` and, if
+        the tokenizer lowercases its inputs, the regex matching the special tokens. They are computed once and reset
+        when tokens are added or when the special tokens change.
+        """
+        do_lower_case = getattr(self, "do_lower_case", False)
+        special_tokens = self._get_special_tokens_key()
+        cache_key = (id(self.unique_no_split_tokens), len(self.unique_no_split_tokens), do_lower_case, special_tokens)
+        if self._no_split_structures is None or self._no_split_structures[0] != cache_key:
+            # Simple mapping string => AddedToken for special tokens with specific tokenization behaviors
+            all_special_tokens_extended = {
+                str(t): t for t in self.all_special_tokens_extended if isinstance(t, AddedToken)
+            }
+            lower_case_pattern = None
+            if do_lower_case:
+                escaped_special_toks = [
+                    re.escape(s_tok) for s_tok in (self.unique_no_split_tokens + self.all_special_tokens)
+                ]
+                lower_case_pattern = re.compile(r"(" + r"|".join(escaped_special_toks) + r")|" + r"(.+?)")
+            self._no_split_structures = (
+                cache_key,
+                set(self.unique_no_split_tokens),
+                all_special_tokens_extended,
+                lower_case_pattern,
+            )
+        return self._no_split_structures[1:]
+
+    def _get_special_tokens_key(self) -> List[Any]:
+        # Changes whenever one of the special tokens is set
+        special_tokens = [getattr(self, f"_{attr}") for attr in self.SPECIAL_TOKENS_ATTRIBUTES]
+        return [tuple(t) if isinstance(t, (list, tuple)) else t for t in special_tokens]
+
+    def _get_special_ids(self) -> set:
+        """
+        Returns `self.all_special_ids` as a set. It is computed once and reset when tokens are added or when the
+        special tokens change.
+        """
+        cache_key = (id(self.added_tokens_encoder), len(self.added_tokens_encoder), self._get_special_tokens_key())
+        if self._special_ids is None or self._special_ids[0] != cache_key:
+            self._special_ids = (cache_key, set(self.all_special_ids))
+        return self._special_ids[1]
+
+    def _get_decode_tables(self) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        Returns the token of each id of the vocabulary as an object array, and boolean arrays flagging the special and
+        the added tokens, so that the ids of a sequence are converted to tokens with a single indexing. They are
+        computed once and reset when tokens are added or when the special tokens change. Returns `None` if some ids of
+        the vocabulary cannot be converted to tokens.
+        """
+        cache_key = (
+            id(self.added_tokens_encoder),
+            len(self.added_tokens_encoder),
+            self._get_special_tokens_key(),
+            self._decode_use_source_tokenizer,
+        )
+        if self._decode_tables is None or self._decode_tables[0] != cache_key:
+            tables = None
+            size = max([len(self)] + [index + 1 for index in self.added_tokens_decoder])
+            try:
+                tokens = self.convert_ids_to_tokens(list(range(size)))
+            except Exception:
+                tokens = None
+            if tokens is not None and all(isinstance(token, str) for token in tokens):
+                pieces = np.empty(size, dtype=object)
+                pieces[:] = tokens
+                is_special = np.zeros(size, dtype=bool)
+                is_special[[index for index in self._get_special_ids() if 0 <= index < size]] = True
+                is_added = np.fromiter(
+                    (token in self.added_tokens_encoder for token in tokens), dtype=bool, count=size
+                )
+                tables = (pieces, is_special, is_added)
+            self._decode_tables = (cache_key, tables)
+        return self._decode_tables[1]
 
     def num_special_tokens_to_add(self, pair: bool = False) -> int:
         """
@@ -494,10 +671,7 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
         Returns:
             `List[str]`: The list of tokens.
         """
-        # Simple mapping string => AddedToken for special tokens with specific tokenization behaviors
-        all_special_tokens_extended = {
-            str(t): t for t in self.all_special_tokens_extended if isinstance(t, AddedToken)
-        }
+        no_split_token, all_special_tokens_extended, lower_case_pattern = self._get_no_split_structures()
 
         text, kwargs = self.prepare_for_tokenization(text, **kwargs)
 
@@ -505,15 +679,10 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
             logger.warning(f"Keyword arguments {kwargs} not recognized.")
 
         # TODO: should this be in the base class?
-        if hasattr(self, "do_lower_case") and self.do_lower_case:
+        if lower_case_pattern is not None:
             # convert non-special tokens to lowercase
-            escaped_special_toks = [
-                re.escape(s_tok) for s_tok in (self.unique_no_split_tokens + self.all_special_tokens)
-            ]
-            pattern = r"(" + r"|".join(escaped_special_toks) + r")|" + r"(.+?)"
-            text = re.sub(pattern, lambda m: m.groups()[0] or m.groups()[1].lower(), text)
+            text = lower_case_pattern.sub(lambda m: m.groups()[0] or m.groups()[1].lower(), text)
 
-        no_split_token = set(self.unique_no_split_tokens)
         tokens = self.tokens_trie.split(text)
         # ["This is something", "<special_token_1>", "  else"]
         for i, token in enumerate(tokens):
@@ -557,6 +726,175 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
         """
         raise NotImplementedError
 
+    def _get_token_text(self, token: str, no_split_token: set) -> str:
+        """
+        Returns the normalized text of a token (see `_normalize_for_alignment`), as found in the texts it is obtained
+        from.
+        """
+        if token not in self._token_texts:
+            if token in no_split_token:
+                text = token
+            else:
+                text = self.convert_tokens_to_string([token])
+                if not isinstance(text, str):
+                    text = token
+                # The continuation prefix of WordPiece tokens is only removed after another token
+                if token.startswith("##") and len(token) > 2 and text.startswith("##"):
+                    text = text[2:]
+            self._token_texts[token] = _normalize_for_alignment(text)[0].strip()
+        return self._token_texts[token]
+
+    def _align_tokens(self, text: str, tokens: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the tokens of `text` in it, in order, and returns the `(start, end)` character offsets of each token as an
+        int32 array of shape `(len(tokens), 2)`, and the index of the word of each token as an int32 array.
+
+        The text and the tokens are compared lowercased and without accents. The tokens which cannot be found (unknown
+        tokens, parts of a character split by a byte-level BPE, text changed by `prepare_for_tokenization`) span the
+        text between the tokens found around them, or one word each if there are as many words. A new word starts
+        after a whitespace, between a letter or digit and another character, and around added tokens.
+        """
+        no_split_token = self._get_no_split_structures()[0]
+        normalized, index = _normalize_for_alignment(text)
+        offsets = [None] * len(tokens)
+
+        def to_offsets(start, end):
+            # Converts a span of the normalized text to a span of `text`
+            if start >= end:
+                start = index[start] if start < len(index) else len(text)
+                return start, start
+            return index[start], index[end - 1] + 1
+
+        def set_pending_offsets(pending, start, end):
+            words = [match.span() for match in _NON_WHITESPACE_PATTERN.finditer(normalized, start, end)]
+            if len(words) == len(pending) > 1:
+                for i, word in zip(pending, words):
+                    offsets[i] = to_offsets(*word)
+            else:
+                span = to_offsets(words[0][0], words[-1][1]) if words else to_offsets(end, end)
+                for i in pending:
+                    offsets[i] = span
+
+        cursor = 0
+        pending = []
+        for i, token in enumerate(tokens):
+            token_text = self._get_token_text(token, no_split_token)
+            start = _WHITESPACE_PATTERN.match(normalized, cursor).end()
+            if not token_text:
+                start = -1
+            elif pending:
+                # The tokens not found yet cover the text before this one
+                start = normalized.find(token_text, cursor, start + len(token_text) + 100 * len(pending))
+            elif not normalized.startswith(token_text, start):
+                start = -1
+            if start < 0:
+                pending.append(i)
+                continue
+            if pending:
+                set_pending_offsets(pending, cursor, start)
+                pending = []
+            cursor = start + len(token_text)
+            offsets[i] = to_offsets(start, cursor)
+        if pending:
+            set_pending_offsets(pending, cursor, len(normalized))
+
+        word_ids = np.zeros(len(tokens), dtype=np.int32)
+        word_id = -1
+        previous_end = None
+        previous_added = False
+        # Empty tokens (like a lone whitespace marker) are part of the word of the next token
+        empty = []
+        for i, (start, end) in enumerate(offsets):
+            added = tokens[i] in no_split_token
+            if start == end and not added:
+                empty.append(i)
+                continue
+            if (
+                previous_end is None
+                or added
+                or previous_added
+                or start > previous_end
+                or (start == previous_end and start > 0 and not (text[start - 1] + text[start : start + 1]).isalnum())
+            ):
+                word_id += 1
+            word_ids[empty + [i]] = word_id
+            empty = []
+            previous_end = end
+            previous_added = added
+        word_ids[empty] = max(word_id, 0)
+        offsets = np.array(offsets, dtype=np.int32).reshape(len(tokens), 2)
+        return offsets, word_ids
+
+    def _get_input_ids_and_alignment(
+        self, text: Union[TextInput, PreTokenizedInput], is_split_into_words: bool = False, **kwargs
+    ) -> Tuple[List[int], Tuple[np.ndarray, np.ndarray]]:
+        """
+        Tokenizes and converts to ids a text, or a list of words with `is_split_into_words=True`, like `get_input_ids`
+        in `_encode_plus`, and also returns the character offsets and word ids of its tokens (see `_align_tokens`). The
+        offsets are relative to each word when `is_split_into_words=True`, and the word ids are their indices.
+        """
+        if isinstance(text, str):
+            tokens = self.tokenize(text, **kwargs)
+            return self.convert_tokens_to_ids(tokens), self._align_tokens(text, tokens)
+        elif is_split_into_words and isinstance(text, (list, tuple)) and len(text) > 0 and isinstance(text[0], str):
+            tokens = []
+            offsets = []
+            word_ids = []
+            for i, word in enumerate(text):
+                word_tokens = self.tokenize(word, is_split_into_words=True, **kwargs)
+                tokens.extend(word_tokens)
+                offsets.append(self._align_tokens(word, word_tokens)[0])
+                word_ids.append(np.full(len(word_tokens), i, dtype=np.int32))
+            return self.convert_tokens_to_ids(tokens), (np.concatenate(offsets), np.concatenate(word_ids))
+        raise ValueError(
+            f"Input {text} is not valid. `return_offsets_mapping=True` is only available for strings, or lists of"
+            " strings with `is_split_into_words=True`."
+        )
+
+    @staticmethod
+    def _get_placeholder_ids(ids: List[int], pair_ids: Optional[List[int]] = None) -> Tuple[List[int], List[int]]:
+        """
+        Returns the placeholder ids `-1 - i` of the i-th token of `ids + pair_ids`. Once given to `prepare_for_model`,
+        they give the position of each token in its outputs whatever the truncation and the special tokens added (see
+        `_resolve_placeholder_ids`).
+        """
+        placeholder_ids = list(range(-1, -1 - len(ids), -1))
+        if pair_ids is None:
+            return placeholder_ids, None
+        return placeholder_ids, list(range(-1 - len(ids), -1 - len(ids) - len(pair_ids), -1))
+
+    @staticmethod
+    def _resolve_placeholder_ids(
+        encoded_inputs: Dict[str, Any],
+        ids: List[int],
+        pair_ids: Optional[List[int]],
+        alignment: Tuple[np.ndarray, np.ndarray],
+        pair_alignment: Optional[Tuple[np.ndarray, np.ndarray]],
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Replaces in place the placeholder ids of `encoded_inputs` (see `_get_placeholder_ids`) by the actual ids, and
+        adds their offset mapping. Returns the word ids and sequence ids of the tokens as int32 arrays, with -1 for the
+        special tokens (and padding).
+        """
+        pair_ids = pair_ids or []
+        offsets, word_ids = alignment
+        pair_offsets, pair_word_ids = pair_alignment if pair_alignment is not None else (offsets[:0], word_ids[:0])
+        # The last item of each array is used for the special tokens
+        all_ids = np.array(ids + pair_ids + [0], dtype=np.int64)
+        all_offsets = np.concatenate([offsets, pair_offsets, np.zeros((1, 2), dtype=np.int32)])
+        all_word_ids = np.concatenate([word_ids, pair_word_ids, [-1]]).astype(np.int32)
+        all_sequence_ids = np.repeat(np.array([0, 1, -1], dtype=np.int32), [len(ids), len(pair_ids), 1])
+
+        sequence = np.asarray(encoded_inputs["input_ids"], dtype=np.int64)
+        is_special = sequence >= 0
+        index = np.where(is_special, len(all_ids) - 1, -1 - sequence)
+        encoded_inputs["input_ids"] = np.where(is_special, sequence, all_ids[index]).tolist()
+        if "overflowing_tokens" in encoded_inputs:
+            overflowing_tokens = np.asarray(encoded_inputs["overflowing_tokens"], dtype=np.int64)
+            encoded_inputs["overflowing_tokens"] = all_ids[-1 - overflowing_tokens].tolist()
+        encoded_inputs["offset_mapping"] = list(map(tuple, all_offsets[index].tolist()))
+        return all_word_ids[index], all_sequence_ids[index]
+
     def convert_tokens_to_ids(self, tokens: Union[str, List[str]]) -> Union[int, List[int]]:
         """
         Converts a token string (or a sequence of tokens) in a single integer id (or a sequence of ids), using the
@@ -638,13 +976,34 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
                     )
 
         if return_offsets_mapping:
-            raise NotImplementedError(
-                "return_offset_mapping is not available when using Python tokenizers. "
-                "To use this feature, change your tokenizer to one deriving from "
-                "transformers.PreTrainedTokenizerFast. "
-                "More information on available tokenizers at "
-                "https://github.com/huggingface/transformers/pull/2674"
+            first_ids, first_alignment = self._get_input_ids_and_alignment(text, is_split_into_words, **kwargs)
+            second_ids, second_alignment = (
+                self._get_input_ids_and_alignment(text_pair, is_split_into_words, **kwargs)
+                if text_pair is not None
+                else (None, None)
+            )
+            encoded_inputs = self.prepare_for_model(
+                *self._get_placeholder_ids(first_ids, second_ids),
+                add_special_tokens=add_special_tokens,
+                padding=padding_strategy.value,
+                truncation=truncation_strategy.value,
+                max_length=max_length,
+                stride=stride,
+                pad_to_multiple_of=pad_to_multiple_of,
+                return_attention_mask=return_attention_mask,
+                return_token_type_ids=return_token_type_ids,
+                return_overflowing_tokens=return_overflowing_tokens,
+                return_special_tokens_mask=return_special_tokens_mask,
+                return_length=return_length,
+                verbose=verbose,
             )
+            word_ids, sequence_ids = self._resolve_placeholder_ids(
+                encoded_inputs, first_ids, second_ids, first_alignment, second_alignment
+            )
+            encoded_inputs = BatchEncoding(encoded_inputs.data, tensor_type=return_tensors, prepend_batch_axis=True)
+            encoded_inputs._word_ids = _concatenate_to_ragged_array([word_ids])
+            encoded_inputs._sequence_ids = _concatenate_to_ragged_array([sequence_ids])
+            return encoded_inputs
 
         first_ids = get_input_ids(text)
         second_ids = get_input_ids(text_pair) if text_pair is not None else None
@@ -693,8 +1052,103 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
         return_offsets_mapping: bool = False,
         return_length: bool = False,
         verbose: bool = True,
+        num_proc: Optional[int] = None,
         **kwargs,
     ) -> BatchEncoding:
+        if num_proc is not None and num_proc > 1 and len(batch_text_or_text_pairs) > 1:
+            # a few chunks per process to balance the load, the results are returned in order
+            chunk_size = math.ceil(len(batch_text_or_text_pairs) / (4 * num_proc))
+            chunks = [
+                batch_text_or_text_pairs[i : i + chunk_size]
+                for i in range(0, len(batch_text_or_text_pairs), chunk_size)
+            ]
+            results = self._get_process_pool(num_proc).map(
+                _batch_get_input_ids_in_worker,
+                chunks,
+                itertools.repeat(is_split_into_words),
+                itertools.repeat({**kwargs, "return_offsets_mapping": return_offsets_mapping}),
+            )
+            input_ids = list(itertools.chain.from_iterable(results))
+        else:
+            input_ids = self._batch_get_input_ids(
+                batch_text_or_text_pairs,
+                is_split_into_words=is_split_into_words,
+                return_offsets_mapping=return_offsets_mapping,
+                **kwargs,
+            )
+
+        if return_offsets_mapping:
+            alignments = [ids_pair[2:] for ids_pair in input_ids]
+            input_ids = [ids_pair[:2] for ids_pair in input_ids]
+            batch_ids_pairs = [self._get_placeholder_ids(first_ids, second_ids) for first_ids, second_ids in input_ids]
+        else:
+            batch_ids_pairs = input_ids
+
+        batch_outputs = self._batch_prepare_for_model(
+            batch_ids_pairs,
+            add_special_tokens=add_special_tokens,
+            padding_strategy=padding_strategy,
+            truncation_strategy=truncation_strategy,
+            max_length=max_length,
+            stride=stride,
+            pad_to_multiple_of=pad_to_multiple_of,
+            return_attention_mask=return_attention_mask,
+            return_token_type_ids=return_token_type_ids,
+            return_overflowing_tokens=return_overflowing_tokens,
+            return_special_tokens_mask=return_special_tokens_mask,
+            return_length=return_length,
+            return_tensors=None if return_offsets_mapping else return_tensors,
+            verbose=verbose,
+        )
+
+        if return_offsets_mapping:
+            batch_word_ids = []
+            batch_sequence_ids = []
+            offset_mapping = []
+            for i, ((first_ids, second_ids), (first_alignment, second_alignment)) in enumerate(
+                zip(input_ids, alignments)
+            ):
+                encoded_inputs = {
+                    key: batch_outputs[key][i] for key in ("input_ids", "overflowing_tokens") if key in batch_outputs
+                }
+                word_ids, sequence_ids = self._resolve_placeholder_ids(
+                    encoded_inputs, first_ids, second_ids, first_alignment, second_alignment
+                )
+                for key, value in encoded_inputs.items():
+                    if key == "offset_mapping":
+                        offset_mapping.append(value)
+                    else:
+                        batch_outputs[key][i] = value
+                batch_word_ids.append(word_ids)
+                batch_sequence_ids.append(sequence_ids)
+            batch_outputs["offset_mapping"] = offset_mapping
+            batch_outputs = BatchEncoding(batch_outputs.data, tensor_type=return_tensors)
+            batch_outputs._word_ids = _concatenate_to_ragged_array(batch_word_ids)
+            batch_outputs._sequence_ids = _concatenate_to_ragged_array(batch_sequence_ids)
+            return batch_outputs
+
+        return BatchEncoding(batch_outputs)
+
+    def _batch_get_input_ids(
+        self,
+        batch_text_or_text_pairs: Union[
+            List[TextInput],
+            List[TextInputPair],
+            List[PreTokenizedInput],
+            List[PreTokenizedInputPair],
+            List[EncodedInput],
+            List[EncodedInputPair],
+        ],
+        is_split_into_words: bool = False,
+        return_offsets_mapping: bool = False,
+        **kwargs,
+    ) -> List[Tuple[List[int], Optional[List[int]]]]:
+        """
+        Tokenizes and converts to ids each sequence (or pair of sequences) of a batch, without adding special tokens,
+        truncating or padding. With `return_offsets_mapping=True`, the alignment of the tokens of each sequence (see
+        `_get_input_ids_and_alignment`) is added after the ids of the pair.
+        """
+
         def get_input_ids(text):
             if isinstance(text, str):
                 tokens = self.tokenize(text, **kwargs)
@@ -714,13 +1168,6 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
                     "Input is not valid. Should be a string, a list/tuple of strings or a list/tuple of integers."
                 )
 
-        if return_offsets_mapping:
-            raise NotImplementedError(
-                "return_offset_mapping is not available when using Python tokenizers. "
-                "To use this feature, change your tokenizer to one deriving from "
-                "transformers.PreTrainedTokenizerFast."
-            )
-
         input_ids = []
         for ids_or_pair_ids in batch_text_or_text_pairs:
             if not isinstance(ids_or_pair_ids, (list, tuple)):
@@ -730,28 +1177,20 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
             else:
                 ids, pair_ids = ids_or_pair_ids
 
-            first_ids = get_input_ids(ids)
-            second_ids = get_input_ids(pair_ids) if pair_ids is not None else None
-            input_ids.append((first_ids, second_ids))
-
-        batch_outputs = self._batch_prepare_for_model(
-            input_ids,
-            add_special_tokens=add_special_tokens,
-            padding_strategy=padding_strategy,
-            truncation_strategy=truncation_strategy,
-            max_length=max_length,
-            stride=stride,
-            pad_to_multiple_of=pad_to_multiple_of,
-            return_attention_mask=return_attention_mask,
-            return_token_type_ids=return_token_type_ids,
-            return_overflowing_tokens=return_overflowing_tokens,
-            return_special_tokens_mask=return_special_tokens_mask,
-            return_length=return_length,
-            return_tensors=return_tensors,
-            verbose=verbose,
-        )
+            if return_offsets_mapping:
+                first_ids, first_alignment = self._get_input_ids_and_alignment(ids, is_split_into_words, **kwargs)
+                second_ids, second_alignment = (
+                    self._get_input_ids_and_alignment(pair_ids, is_split_into_words, **kwargs)
+                    if pair_ids is not None
+                    else (None, None)
+                )
+                input_ids.append((first_ids, second_ids, first_alignment, second_alignment))
+            else:
+                first_ids = get_input_ids(ids)
+                second_ids = get_input_ids(pair_ids) if pair_ids is not None else None
+                input_ids.append((first_ids, second_ids))
 
-        return BatchEncoding(batch_outputs)
+        return input_ids
 
     @add_end_docstrings(ENCODE_KWARGS_DOCSTRING, ENCODE_PLUS_ADDITIONAL_KWARGS_DOCSTRING)
     def _batch_prepare_for_model(
@@ -901,10 +1340,11 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
                 return self.added_tokens_decoder[ids]
             else:
                 return self._convert_id_to_token(ids)
+        special_ids = self._get_special_ids() if skip_special_tokens else ()
         tokens = []
         for index in ids:
             index = int(index)
-            if skip_special_tokens and index in self.all_special_ids:
+            if index in special_ids:
                 continue
             if index in self.added_tokens_decoder:
                 tokens.append(self.added_tokens_decoder[index])
@@ -929,24 +1369,32 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
         self._decode_use_source_tokenizer = kwargs.pop("use_source_tokenizer", False)
 
         filtered_tokens = self.convert_ids_to_tokens(token_ids, skip_special_tokens=skip_special_tokens)
+        is_added = [token in self.added_tokens_encoder for token in filtered_tokens]
+
+        return self._tokens_to_text(
+            filtered_tokens,
+            is_added,
+            clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+            spaces_between_special_tokens=spaces_between_special_tokens,
+        )
 
+    def _tokens_to_text(
+        self,
+        tokens: List[str],
+        is_added: List[bool],
+        clean_up_tokenization_spaces: bool = None,
+        spaces_between_special_tokens: bool = True,
+    ) -> str:
         # To avoid mixing byte-level and unicode for byte-level BPT
         # we need to build string separately for added tokens and byte-level tokens
         # cf. https://github.com/huggingface/transformers/issues/1133
         sub_texts = []
-        current_sub_text = []
-        for token in filtered_tokens:
-            if skip_special_tokens and token in self.all_special_ids:
-                continue
-            if token in self.added_tokens_encoder:
-                if current_sub_text:
-                    sub_texts.append(self.convert_tokens_to_string(current_sub_text))
-                    current_sub_text = []
-                sub_texts.append(token)
+        for added, group in itertools.groupby(zip(tokens, is_added), key=lambda item: item[1]):
+            group_tokens = [token for token, _ in group]
+            if added:
+                sub_texts.extend(group_tokens)
             else:
-                current_sub_text.append(token)
-        if current_sub_text:
-            sub_texts.append(self.convert_tokens_to_string(current_sub_text))
+                sub_texts.append(self.convert_tokens_to_string(group_tokens))
 
         if spaces_between_special_tokens:
             text = " ".join(sub_texts)
@@ -963,3 +1411,62 @@ class PreTrainedTokenizer(PreTrainedTokenizerBase):
             return clean_text
         else:
             return text
+
+    def batch_decode(
+        self,
+        sequences: Union[List[int], List[List[int]], "np.ndarray", "torch.Tensor", "tf.Tensor"],
+        skip_special_tokens: bool = False,
+        clean_up_tokenization_spaces: bool = None,
+        **kwargs,
+    ) -> List[str]:
+        # Tokenizers customizing the decoding go through `decode` for each sequence
+        if (
+            type(self).decode is not PreTrainedTokenizerBase.decode
+            or type(self)._decode is not PreTrainedTokenizer._decode
+            or type(self).convert_ids_to_tokens is not PreTrainedTokenizer.convert_ids_to_tokens
+        ):
+            return super().batch_decode(
+                sequences,
+                skip_special_tokens=skip_special_tokens,
+                clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+                **kwargs,
+            )
+
+        self._decode_use_source_tokenizer = kwargs.get("use_source_tokenizer", False)
+        tables = self._get_decode_tables()
+        if not isinstance(sequences, (list, tuple)):
+            sequences = to_numpy(sequences)
+
+        texts = []
+        for sequence in sequences:
+            token_ids = sequence if isinstance(sequence, (list, tuple, np.ndarray)) else to_py_obj(sequence)
+            token_ids = np.asarray(token_ids)
+            if (
+                tables is None
+                or token_ids.ndim != 1
+                or (token_ids.size > 0 and token_ids.dtype.kind not in "iu")
+                or (token_ids.size > 0 and (token_ids.min() < 0 or token_ids.max() >= len(tables[0])))
+            ):
+                texts.append(
+                    self.decode(
+                        sequence,
+                        skip_special_tokens=skip_special_tokens,
+                        clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+                        **kwargs,
+                    )
+                )
+                continue
+
+            pieces, is_special, is_added = tables
+            token_ids = token_ids.astype(np.int64)
+            if skip_special_tokens:
+                token_ids = token_ids[~is_special[token_ids]]
+            texts.append(
+                self._tokens_to_text(
+                    pieces[token_ids].tolist(),
+                    is_added[token_ids].tolist(),
+                    clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+                    spaces_between_special_tokens=kwargs.get("spaces_between_special_tokens", True),
+                )
+            )
+        return texts
@@ -19,6 +19,7 @@ of output with special method for the Fast tokenizers)
 """
 
 import copy
+import itertools
 import json
 import os
 import re
@@ -161,6 +162,130 @@ class TokenSpan(NamedTuple):
     end: int
 
 
+class RaggedArray:
+    """
+    Batch of variable length sequences stored as a single flat NumPy array holding all the values one sequence after
+    the other, and the offsets at which each sequence starts (like Arrow list arrays). Fast tokenizers fill it directly
+    from their encodings with `return_ragged=True`, which avoids allocating one Python list per sequence.
+
+    Indexing with an integer returns a view on the values of a sequence, indexing with a slice returns a
+    [`RaggedArray`] sharing the same values.
+
+    Args:
+        values (`np.ndarray`):
+            The values of all the sequences, concatenated along the first axis.
+        offsets (`np.ndarray`):
+            One-dimensional array of `len(self) + 1` integers: the i-th sequence is `values[offsets[i]:offsets[i + 1]]`.
+    """
+
+    def __init__(self, values: np.ndarray, offsets: np.ndarray):
+        self.values = values
+        self.offsets = offsets
+
+    @classmethod
+    def from_sequences(cls, sequences: Sequence[Sequence], dtype=np.int64) -> "RaggedArray":
+        """
+        Builds a [`RaggedArray`] from a sequence of sequences of integers, or of tuples of integers (like offset
+        mappings).
+        """
+        lengths = np.fromiter((len(sequence) for sequence in sequences), dtype=np.int64, count=len(sequences))
+        offsets = np.zeros(len(sequences) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        flat = itertools.chain.from_iterable(sequences)
+        first = next((sequence[0] for sequence in sequences if len(sequence) > 0), None)
+        if isinstance(first, (list, tuple)):
+            width = len(first)
+            values = np.fromiter(itertools.chain.from_iterable(flat), dtype=dtype, count=int(offsets[-1]) * width)
+            values = values.reshape(-1, width)
+        else:
+            values = np.fromiter(flat, dtype=dtype, count=int(offsets[-1]))
+        return cls(values, offsets)
+
+    @classmethod
+    def concatenate(cls, arrays: Sequence["RaggedArray"]) -> "RaggedArray":
+        """
+        Builds a [`RaggedArray`] holding the sequences of all `arrays`, one array after the other.
+        """
+        values = np.concatenate([array.values[array.offsets[0] : array.offsets[-1]] for array in arrays])
+        lengths = np.concatenate([array.lengths for array in arrays])
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(values, offsets)
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """
+        `np.ndarray`: The length of each sequence.
+        """
+        return np.diff(self.offsets)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[np.ndarray, "RaggedArray"]:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("RaggedArray only supports contiguous slices.")
+            return RaggedArray(self.values, self.offsets[start : max(start, stop) + 1])
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"Index {index} is out of range for a RaggedArray of {len(self)} sequences.")
+        return self.values[self.offsets[index] : self.offsets[index + 1]]
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+    def __repr__(self) -> str:
+        return f"RaggedArray({self.tolist()})"
+
+    def tolist(self) -> List[list]:
+        """
+        Converts the sequences to a list of Python lists, as returned without `return_ragged`.
+        """
+        return [sequence.tolist() for sequence in self]
+
+    def to_padded(self, padding_value: int = 0, padding_side: str = "right", max_length: Optional[int] = None):
+        """
+        Copies the sequences in a `[len(self), max_length, ...]` array filled with `padding_value`. If all sequences
+        already have a length of `max_length`, the result is a view on `values`.
+
+        Args:
+            padding_value (`int`, *optional*, defaults to 0):
+                The value of the padded positions.
+            padding_side (`str`, *optional*, defaults to `"right"`):
+                Whether to pad the sequences on the `"right"` or on the `"left"`.
+            max_length (`int`, *optional*):
+                The length of the padded sequences. Defaults to the length of the longest sequence.
+        """
+        lengths = self.lengths
+        if max_length is None:
+            max_length = int(lengths.max()) if len(lengths) > 0 else 0
+        if len(lengths) > 0 and lengths.max() > max_length:
+            raise ValueError(f"Some sequences are longer than max_length={max_length}.")
+        values = self.values[self.offsets[0] : self.offsets[-1]]
+        if (lengths == max_length).all():
+            return values.reshape(len(self), max_length, *values.shape[1:])
+
+        positions = np.arange(max_length)
+        if padding_side == "right":
+            mask = positions < lengths[:, None]
+        elif padding_side == "left":
+            mask = positions >= max_length - lengths[:, None]
+        else:
+            raise ValueError("Invalid padding strategy:" + str(padding_side))
+        padded = np.full((len(self), max_length, *values.shape[1:]), padding_value, dtype=values.dtype)
+        padded[mask] = values
+        return padded
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, RaggedArray):
+            other = other.tolist()
+        return self.tolist() == other
+
+
 class BatchEncoding(UserDict):
     """
     Holds the output of the [`~tokenization_utils_base.PreTrainedTokenizerBase.__call__`],
@@ -208,6 +333,11 @@ class BatchEncoding(UserDict):
 
         self._n_sequences = n_sequences
 
+        # Word and sequence ids of the tokens computed by Python tokenizers with `return_offsets_mapping=True`, -1
+        # standing for `None`
+        self._word_ids: Optional[RaggedArray] = None
+        self._sequence_ids: Optional[RaggedArray] = None
+
         self.convert_to_tensors(tensor_type=tensor_type, prepend_batch_axis=prepend_batch_axis)
 
     @property
@@ -256,7 +386,12 @@ class BatchEncoding(UserDict):
             raise AttributeError
 
     def __getstate__(self):
-        return {"data": self.data, "encodings": self._encodings}
+        return {
+            "data": self.data,
+            "encodings": self._encodings,
+            "word_ids": self._word_ids,
+            "sequence_ids": self._sequence_ids,
+        }
 
     def __setstate__(self, state):
         if "data" in state:
@@ -265,6 +400,9 @@ class BatchEncoding(UserDict):
         if "encodings" in state:
             self._encodings = state["encodings"]
 
+        self._word_ids = state.get("word_ids")
+        self._sequence_ids = state.get("sequence_ids")
+
     def keys(self):
         return self.data.keys()
 
@@ -322,9 +460,11 @@ class BatchEncoding(UserDict):
             sequence.
         """
         if not self._encodings:
+            if self._sequence_ids is not None:
+                return [None if index < 0 else index for index in self._sequence_ids[batch_index].tolist()]
             raise ValueError(
                 "sequence_ids() is not available when using non-fast tokenizers (e.g. instance of a `XxxTokenizerFast`"
-                " class)."
+                " class) without `return_offsets_mapping=True`."
             )
         return self._encodings[batch_index].sequence_ids
 
@@ -354,7 +494,8 @@ class BatchEncoding(UserDict):
 
     def word_ids(self, batch_index: int = 0) -> List[Optional[int]]:
         """
-        Return a list mapping the tokens to their actual word in the initial sentence for a fast tokenizer.
+        Return a list mapping the tokens to their actual word in the initial sentence for a fast tokenizer, or for a
+        Python tokenizer called with `return_offsets_mapping=True`.
 
         Args:
             batch_index (`int`, *optional*, defaults to 0): The index to access in the batch.
@@ -365,9 +506,11 @@ class BatchEncoding(UserDict):
             (several tokens will be mapped to the same word index if they are parts of that word).
         """
         if not self._encodings:
+            if self._word_ids is not None:
+                return [None if index < 0 else index for index in self._word_ids[batch_index].tolist()]
             raise ValueError(
                 "word_ids() is not available when using non-fast tokenizers (e.g. instance of a `XxxTokenizerFast`"
-                " class)."
+                " class) without `return_offsets_mapping=True`."
             )
         return self._encodings[batch_index].word_ids
 
@@ -727,6 +870,19 @@ class BatchEncoding(UserDict):
                 if prepend_batch_axis:
                     value = [value]
 
+                if isinstance(value, RaggedArray):
+                    # Sequences of the same length are converted without going through Python lists
+                    lengths = value.lengths
+                    if len(lengths) > 0 and (lengths != lengths[0]).any():
+                        if tensor_type != TensorType.NUMPY:
+                            raise ValueError(f"The sequences of `{key}` have different lengths.")
+                        value = value.tolist()
+                    else:
+                        value = value.to_padded()
+                        if tensor_type == TensorType.PYTORCH:
+                            value = torch.from_numpy(value)
+                        self[key] = value
+
                 if not is_tensor(value):
                     tensor = as_tensor(value)
 
@@ -1387,12 +1543,27 @@ ENCODE_PLUS_ADDITIONAL_KWARGS_DOCSTRING = r"""
             return_offsets_mapping (`bool`, *optional*, defaults to `False`):
                 Whether or not to return `(char_start, char_end)` for each token.
 
-                This is only available on fast tokenizers inheriting from [`PreTrainedTokenizerFast`], if using
-                Python's tokenizer, this method will raise `NotImplementedError`.
+                Python tokenizers compute the offsets by finding the tokens in the input text, and only support text
+                inputs (or lists of words with `is_split_into_words=True`). They may differ from the ones of the fast
+                tokenizer for unknown tokens and text changed by the tokenization.
             return_length  (`bool`, *optional*, defaults to `False`):
                 Whether or not to return the lengths of the encoded inputs.
             verbose (`bool`, *optional*, defaults to `True`):
                 Whether or not to print more information and warnings.
+            num_proc (`int`, *optional*):
+                The number of processes used to tokenize a batch of inputs. Only available on Python tokenizers
+                inheriting from [`PreTrainedTokenizer`] (fast tokenizers already encode batches in parallel). The
+                process pool is created on the first call and reused by the following ones.
+            return_ragged (`bool`, *optional*, defaults to `False`):
+                Whether or not to return the sequences of a batch as [`RaggedArray`] (a flat NumPy array of values and
+                the offsets of each sequence) instead of lists of lists, which takes much less memory. Only available
+                on fast tokenizers inheriting from [`PreTrainedTokenizerFast`]. The result can be padded to tensors
+                with [`~PreTrainedTokenizerBase.pad`].
+            num_threads (`int`, *optional*):
+                The number of threads used to encode a batch of inputs in chunks. Only available on fast tokenizers
+                inheriting from [`PreTrainedTokenizerFast`]: the backend tokenizer releases the GIL while encoding, so
+                the next chunks are encoded while the first ones are converted to Python objects. This mostly helps
+                with very large batches on hosts with many cores.
             **kwargs: passed to the `self.tokenize()` method
 
         Return:
@@ -3041,7 +3212,8 @@ class PreTrainedTokenizerBase(SpecialTokensMixin, PushToHubMixin):
         )
 
         required_input = encoded_inputs[self.model_input_names[0]]
-        if required_input and not isinstance(required_input[0], (list, tuple)):
+        is_ragged = isinstance(required_input, RaggedArray)
+        if not is_ragged and required_input and not isinstance(required_input[0], (list, tuple)):
             encoded_inputs = self._pad(
                 encoded_inputs,
                 max_length=max_length,
@@ -3056,6 +3228,36 @@ class PreTrainedTokenizerBase(SpecialTokensMixin, PushToHubMixin):
             len(v) == batch_size for v in encoded_inputs.values()
         ), "Some items in the output dictionary have a different batch size than others."
 
+        # Tensors are padded in a single preallocated array per key, unless a subclass customizes `_pad`
+        if (
+            return_tensors in (TensorType.NUMPY, TensorType.PYTORCH)
+            and padding_strategy != PaddingStrategy.DO_NOT_PAD
+            and type(self)._pad is PreTrainedTokenizerBase._pad
+        ):
+            batch_outputs = self._pad_batch(
+                encoded_inputs,
+                max_length=max_length,
+                padding_strategy=padding_strategy,
+                pad_to_multiple_of=pad_to_multiple_of,
+                return_attention_mask=return_attention_mask,
+            )
+            if batch_outputs is not None:
+                if return_tensors == TensorType.PYTORCH:
+                    import torch
+
+                    batch_outputs = {
+                        key: torch.from_numpy(value) if isinstance(value, np.ndarray) else value
+                        for key, value in batch_outputs.items()
+                    }
+                return BatchEncoding(batch_outputs, tensor_type=return_tensors)
+
+        if is_ragged:
+            encoded_inputs = {
+                key: value.tolist() if isinstance(value, RaggedArray) else value
+                for key, value in encoded_inputs.items()
+            }
+            required_input = encoded_inputs[self.model_input_names[0]]
+
         if padding_strategy == PaddingStrategy.LONGEST:
             max_length = max(len(inputs) for inputs in required_input)
             padding_strategy = PaddingStrategy.MAX_LENGTH
@@ -3450,6 +3652,70 @@ class PreTrainedTokenizerBase(SpecialTokensMixin, PushToHubMixin):
 
         return encoded_inputs
 
+    def _pad_batch(
+        self,
+        encoded_inputs: Dict[str, List[EncodedInput]],
+        max_length: Optional[int] = None,
+        padding_strategy: PaddingStrategy = PaddingStrategy.LONGEST,
+        pad_to_multiple_of: Optional[int] = None,
+        return_attention_mask: Optional[bool] = None,
+    ) -> Optional[dict]:
+        """
+        Pad a batch of encoded inputs like `_pad` does for each of them, but into a `[batch_size, max_length]` NumPy
+        array per padded key, filled with the padding value and in which the sequences are copied all at once (see
+        [`RaggedArray.to_padded`]). The other keys are returned untouched.
+
+        Returns `None` if the batch cannot be padded into arrays (sequences of something else than integers, sequences
+        longer than `max_length` or keys with different lengths), in which case the caller should fall back to `_pad`.
+        """
+        if return_attention_mask is None:
+            return_attention_mask = "attention_mask" in self.model_input_names
+
+        main_input_name = self.model_input_names[0]
+        required_input = encoded_inputs[main_input_name]
+        if not isinstance(required_input, RaggedArray):
+            first_id = next((ids[0] for ids in required_input if len(ids) > 0), None)
+            if first_id is not None and not isinstance(first_id, (int, np.integer)):
+                return None
+            required_input = RaggedArray.from_sequences(required_input)
+        lengths = required_input.lengths
+
+        if padding_strategy == PaddingStrategy.LONGEST:
+            max_length = int(lengths.max())
+        if max_length is None:
+            return None
+        if pad_to_multiple_of is not None and (max_length % pad_to_multiple_of != 0):
+            max_length = ((max_length // pad_to_multiple_of) + 1) * pad_to_multiple_of
+        if lengths.max() > max_length:
+            return None
+
+        padding_values = {
+            main_input_name: self.pad_token_id,
+            "token_type_ids": self.pad_token_type_id,
+            "special_tokens_mask": 1,
+        }
+        if return_attention_mask:
+            padding_values["attention_mask"] = 0
+
+        batch_outputs = {}
+        for key, value in encoded_inputs.items():
+            if key not in padding_values:
+                batch_outputs[key] = value
+                continue
+            if key == main_input_name:
+                value = required_input
+            elif not isinstance(value, RaggedArray):
+                value = RaggedArray.from_sequences(value)
+            if not np.array_equal(value.lengths, lengths):
+                return None
+            batch_outputs[key] = value.to_padded(padding_values[key], self.padding_side, max_length)
+
+        if return_attention_mask and "attention_mask" not in batch_outputs:
+            ones = RaggedArray(np.ones(required_input.offsets[-1], dtype=np.int64), required_input.offsets)
+            batch_outputs["attention_mask"] = ones.to_padded(0, self.padding_side, max_length)
+
+        return batch_outputs
+
     def convert_tokens_to_string(self, tokens: List[str]) -> str:
         """
         Converts a sequence of tokens in a single string. The most simple way to do it is `" ".join(tokens)` but we
@@ -17,10 +17,13 @@
  see tokenization_utils.py
 """
 import copy
+import itertools
 import json
+import math
 import os
 from collections import defaultdict
-from typing import Any, Dict, List, Optional, Tuple, Union
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple, Union
 
 import tokenizers.pre_tokenizers as pre_tokenizers_fast
 from tokenizers import Encoding as EncodingFast
@@ -37,12 +40,30 @@ from .tokenization_utils_base import (
     PreTokenizedInput,
     PreTokenizedInputPair,
     PreTrainedTokenizerBase,
+    RaggedArray,
     SpecialTokensMixin,
     TextInput,
     TextInputPair,
     TruncationStrategy,
 )
-from .utils import PaddingStrategy, add_end_docstrings, logging
+from .utils import (
+    PaddingStrategy,
+    TensorType,
+    add_end_docstrings,
+    is_tf_available,
+    is_torch_available,
+    logging,
+    to_py_obj,
+)
+
+
+if TYPE_CHECKING:
+    import numpy as np
+
+    if is_torch_available():
+        import torch
+    if is_tf_available():
+        import tensorflow as tf
 
 
 logger = logging.get_logger(__name__)
@@ -74,6 +95,18 @@ MODEL_TO_TRAINER_MAPPING = {
 VOCAB_FILES_NAMES = {"tokenizer_file": TOKENIZER_FILE}
 
 
+# Thread pools used to encode batches with `num_threads`, per number of threads. They are shared by all the tokenizers.
+_ENCODING_THREAD_POOLS = {}
+
+
+def _get_encoding_thread_pool(num_threads: int) -> ThreadPoolExecutor:
+    if num_threads not in _ENCODING_THREAD_POOLS:
+        _ENCODING_THREAD_POOLS[num_threads] = ThreadPoolExecutor(
+            max_workers=num_threads, thread_name_prefix="tokenizer"
+        )
+    return _ENCODING_THREAD_POOLS[num_threads]
+
+
 @add_end_docstrings(INIT_TOKENIZER_DOCSTRING)
 class PreTrainedTokenizerFast(PreTrainedTokenizerBase):
     """
@@ -232,6 +265,131 @@ class PreTrainedTokenizerFast(PreTrainedTokenizerBase):
 
         return encoding_dict, encodings
 
+    def _convert_encodings(
+        self,
+        encodings: List[EncodingFast],
+        return_token_type_ids: Optional[bool] = None,
+        return_attention_mask: Optional[bool] = None,
+        return_overflowing_tokens: bool = False,
+        return_special_tokens_mask: bool = False,
+        return_offsets_mapping: bool = False,
+        return_length: bool = False,
+        return_ragged: bool = False,
+    ) -> Tuple[Dict[str, Any], List[EncodingFast]]:
+        """
+        Batched version of `_convert_encoding`: each key is built in one pass over all the encodings (and their
+        overflows), as a list of lists or as a [`RaggedArray`] with `return_ragged=True`.
+
+        Output shape: (batch * overflows, sequence length)
+        """
+        if return_token_type_ids is None:
+            return_token_type_ids = "token_type_ids" in self.model_input_names
+        if return_attention_mask is None:
+            return_attention_mask = "attention_mask" in self.model_input_names
+
+        if return_overflowing_tokens:
+            groups = [[e] + (e.overflowing if e.overflowing is not None else []) for e in encodings]
+            encodings = [e for group in groups for e in group]
+
+        convert = RaggedArray.from_sequences if return_ragged else list
+        encoding_dict = {"input_ids": convert([e.ids for e in encodings])}
+        if return_token_type_ids:
+            encoding_dict["token_type_ids"] = convert([e.type_ids for e in encodings])
+        if return_attention_mask:
+            encoding_dict["attention_mask"] = convert([e.attention_mask for e in encodings])
+        if return_special_tokens_mask:
+            encoding_dict["special_tokens_mask"] = convert([e.special_tokens_mask for e in encodings])
+        if return_offsets_mapping:
+            encoding_dict["offset_mapping"] = convert([e.offsets for e in encodings])
+        if return_length:
+            encoding_dict["length"] = (
+                encoding_dict["input_ids"].lengths.tolist()
+                if return_ragged
+                else [len(ids) for ids in encoding_dict["input_ids"]]
+            )
+        if return_overflowing_tokens:
+            encoding_dict["overflow_to_sample_mapping"] = [i for i, group in enumerate(groups) for _ in group]
+
+        return encoding_dict, encodings
+
+    def _encode_batch_in_chunks(
+        self,
+        batch_text_or_text_pairs: List,
+        add_special_tokens: bool = True,
+        is_split_into_words: bool = False,
+        num_threads: Optional[int] = None,
+    ) -> Iterator[List[EncodingFast]]:
+        """
+        Encodes a batch with the backend tokenizer and yields the encodings in order, by chunks. With `num_threads`,
+        the chunks are encoded from a thread pool and yielded as soon as they (and the previous ones) are ready.
+        """
+        if num_threads is None or num_threads <= 1 or len(batch_text_or_text_pairs) <= 1:
+            yield self._tokenizer.encode_batch(
+                batch_text_or_text_pairs, add_special_tokens=add_special_tokens, is_pretokenized=is_split_into_words
+            )
+            return
+
+        # a few chunks per thread to balance the load
+        chunk_size = math.ceil(len(batch_text_or_text_pairs) / (4 * num_threads))
+        pool = _get_encoding_thread_pool(num_threads)
+        futures = [
+            pool.submit(
+                self._tokenizer.encode_batch,
+                batch_text_or_text_pairs[i : i + chunk_size],
+                add_special_tokens=add_special_tokens,
+                is_pretokenized=is_split_into_words,
+            )
+            for i in range(0, len(batch_text_or_text_pairs), chunk_size)
+        ]
+
+        padding = self._tokenizer.padding
+        if padding is None or padding["length"] is not None:
+            for future in futures:
+                yield future.result()
+            return
+
+        # Each chunk is padded to its longest sequence, the shorter chunks are padded again to the longest sequence of
+        # the whole batch (overflowing tokens included)
+        chunks = [future.result() for future in futures]
+        length = max(len(chunk[0]) for chunk in chunks)
+        for chunk in chunks:
+            if len(chunk[0]) < length:
+                for encoding in chunk:
+                    encoding.pad(
+                        length,
+                        direction=padding["direction"],
+                        pad_id=padding["pad_id"],
+                        pad_type_id=padding["pad_type_id"],
+                        pad_token=padding["pad_token"],
+                    )
+        yield from chunks
+
+    @staticmethod
+    def _concatenate_converted_encodings(
+        chunks: List[Tuple[Dict[str, Any], List[EncodingFast]]]
+    ) -> Tuple[Dict[str, Any], List[EncodingFast]]:
+        """
+        Concatenates the outputs of `_convert_encodings` on consecutive chunks of a batch.
+        """
+        if len(chunks) == 1:
+            return chunks[0]
+
+        encoding_dict = {}
+        for key, value in chunks[0][0].items():
+            values = [chunk_dict[key] for chunk_dict, _ in chunks]
+            if key == "overflow_to_sample_mapping":
+                # Sample indices are relative to the chunk
+                num_samples = 0
+                for i, mapping in enumerate(values):
+                    values[i] = [index + num_samples for index in mapping]
+                    num_samples += mapping[-1] + 1 if mapping else 0
+            if isinstance(value, RaggedArray):
+                encoding_dict[key] = RaggedArray.concatenate(values)
+            else:
+                encoding_dict[key] = list(itertools.chain.from_iterable(values))
+        encodings = [e for _, chunk_encodings in chunks for e in chunk_encodings]
+        return encoding_dict, encodings
+
     def convert_tokens_to_ids(self, tokens: Union[str, List[str]]) -> Union[int, List[int]]:
         """
         Converts a token string (or a sequence of tokens) in a single integer id (or a sequence of ids), using the
@@ -407,6 +565,8 @@ class PreTrainedTokenizerFast(PreTrainedTokenizerBase):
         return_offsets_mapping: bool = False,
         return_length: bool = False,
         verbose: bool = True,
+        return_ragged: bool = False,
+        num_threads: Optional[int] = None,
     ) -> BatchEncoding:
         if not isinstance(batch_text_or_text_pairs, (tuple, list)):
             raise TypeError(
@@ -422,12 +582,39 @@ class PreTrainedTokenizerFast(PreTrainedTokenizerBase):
             pad_to_multiple_of=pad_to_multiple_of,
         )
 
-        encodings = self._tokenizer.encode_batch(
+        encoding_chunks = self._encode_batch_in_chunks(
             batch_text_or_text_pairs,
             add_special_tokens=add_special_tokens,
-            is_pretokenized=is_split_into_words,
+            is_split_into_words=is_split_into_words,
+            num_threads=num_threads,
         )
 
+        if type(self)._convert_encoding is PreTrainedTokenizerFast._convert_encoding:
+            # NumPy and PyTorch tensors are built from flat arrays rather than from lists of lists
+            return_ragged = return_ragged or return_tensors in (TensorType.NUMPY, TensorType.PYTORCH)
+            sanitized_tokens, sanitized_encodings = self._concatenate_converted_encodings(
+                [
+                    self._convert_encodings(
+                        encodings,
+                        return_token_type_ids=return_token_type_ids,
+                        return_attention_mask=return_attention_mask,
+                        return_overflowing_tokens=return_overflowing_tokens,
+                        return_special_tokens_mask=return_special_tokens_mask,
+                        return_offsets_mapping=return_offsets_mapping,
+                        return_length=return_length,
+                        return_ragged=return_ragged,
+                    )
+                    for encodings in encoding_chunks
+                ]
+            )
+            input_ids = sanitized_tokens["input_ids"]
+            if len(input_ids) > 0:
+                longest = input_ids[int(input_ids.lengths.argmax())] if return_ragged else max(input_ids, key=len)
+                self._eventual_warn_about_too_long_sequence(longest, max_length, verbose)
+            return BatchEncoding(sanitized_tokens, sanitized_encodings, tensor_type=return_tensors)
+
+        encodings = [encoding for encodings in encoding_chunks for encoding in encodings]
+
         # Convert encoding to dict
         # `Tokens` has type: Tuple[
         #                       List[Dict[str, List[List[int]]]] or List[Dict[str, 2D-Tensor]],
@@ -519,7 +706,9 @@ class PreTrainedTokenizerFast(PreTrainedTokenizerBase):
         if return_tensors is None and not return_overflowing_tokens:
             batched_output = BatchEncoding(
                 {
-                    key: value[0] if len(value) > 0 and isinstance(value[0], list) else value
+                    key: value[0]
+                    if isinstance(value, RaggedArray) or (len(value) > 0 and isinstance(value[0], list))
+                    else value
                     for key, value in batched_output.items()
                 },
                 batched_output.encodings,
@@ -556,6 +745,42 @@ class PreTrainedTokenizerFast(PreTrainedTokenizerBase):
         else:
             return text
 
+    def batch_decode(
+        self,
+        sequences: Union[List[int], List[List[int]], "np.ndarray", "torch.Tensor", "tf.Tensor"],
+        skip_special_tokens: bool = False,
+        clean_up_tokenization_spaces: bool = None,
+        **kwargs,
+    ) -> List[str]:
+        # Tokenizers customizing the decoding go through `decode` for each sequence
+        if (
+            type(self).decode is not PreTrainedTokenizerBase.decode
+            or type(self)._decode is not PreTrainedTokenizerFast._decode
+        ):
+            return super().batch_decode(
+                sequences,
+                skip_special_tokens=skip_special_tokens,
+                clean_up_tokenization_spaces=clean_up_tokenization_spaces,
+                **kwargs,
+            )
+
+        self._decode_use_source_tokenizer = kwargs.pop("use_source_tokenizer", False)
+        if not isinstance(sequences, (list, tuple)):
+            sequences = to_py_obj(sequences)
+        sequences = [sequence if isinstance(sequence, list) else to_py_obj(sequence) for sequence in sequences]
+        sequences = [[sequence] if isinstance(sequence, int) else sequence for sequence in sequences]
+        # The sequences are decoded in parallel by the Rust tokenizer
+        texts = self._tokenizer.decode_batch(sequences, skip_special_tokens=skip_special_tokens)
+
+        clean_up_tokenization_spaces = (
+            clean_up_tokenization_spaces
+            if clean_up_tokenization_spaces is not None
+            else self.clean_up_tokenization_spaces
+        )
+        if clean_up_tokenization_spaces:
+            texts = [self.clean_up_tokenization(text) for text in texts]
+        return texts
+
     def _save_pretrained(
         self,
         save_directory: Union[str, os.PathLike],
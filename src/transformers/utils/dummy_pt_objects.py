@@ -51,6 +51,13 @@ class LineByLineWithSOPTextDataset(metaclass=DummyObject):
         requires_backends(self, ["torch"])
 
 
+class PackedTextIterableDataset(metaclass=DummyObject):
+    _backends = ["torch"]
+
+    def __init__(self, *args, **kwargs):
+        requires_backends(self, ["torch"])
+
+
 class SquadDataset(metaclass=DummyObject):
     _backends = ["torch"]
 
@@ -6297,6 +6304,13 @@ class RwkvPreTrainedModel(metaclass=DummyObject):
         requires_backends(self, ["torch"])
 
 
+class RwkvStateStore(metaclass=DummyObject):
+    _backends = ["torch"]
+
+    def __init__(self, *args, **kwargs):
+        requires_backends(self, ["torch"])
+
+
 SAM_PRETRAINED_MODEL_ARCHIVE_LIST = None
 
 
@@ -0,0 +1,219 @@
+# coding=utf-8
+# Copyright 2023 The HuggingFace Inc. team.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""
+Layer-wise inference for models that do not fit in RAM: the weights of the repeated blocks of the model are read from
+memory-mapped safetensors shards right before each block runs, and released right after. The weights of the next block
+are prefetched in a background thread while the current one computes.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from . import logging
+from .import_utils import is_safetensors_available, is_torch_available
+
+
+if is_torch_available():
+    import torch
+    from torch import nn
+
+if is_safetensors_available():
+    from safetensors import safe_open
+
+
+logger = logging.get_logger(__name__)
+
+
+def get_streamed_layers(model: "nn.Module") -> List[str]:
+    """
+    Returns the names of the outermost submodules of `model` whose class is one of `model._no_split_modules`, in
+    execution order. Those are the blocks whose weights get streamed.
+    """
+    no_split_modules = getattr(model, "_no_split_modules", None)
+    if not no_split_modules:
+        raise ValueError(
+            f"{model.__class__.__name__} does not support layer streaming. To implement support, the model class needs "
+            "to implement the `_no_split_modules` attribute."
+        )
+
+    layers = []
+    for name, module in model.named_modules():
+        if module.__class__.__name__ not in no_split_modules:
+            continue
+        if any(name.startswith(f"{layer}.") for layer in layers):
+            continue
+        layers.append(name)
+    if len(layers) == 0:
+        raise ValueError(f"No module of {model.__class__.__name__} is an instance of {no_split_modules}.")
+    return layers
+
+
+def get_safetensors_checkpoint_keys(checkpoint_file: str) -> List[str]:
+    """
+    Reads the names of the tensors stored in a safetensors file without loading them.
+    """
+    with safe_open(checkpoint_file, framework="pt") as f:
+        return list(f.keys())
+
+
+def get_safetensors_checkpoint_dtype(checkpoint_file: str) -> "torch.dtype":
+    """
+    Returns the dtype of the first floating point tensor of a safetensors file, loading one tensor at a time.
+    """
+    dtype = None
+    with safe_open(checkpoint_file, framework="pt") as f:
+        for key in f.keys():
+            tensor = f.get_tensor(key)
+            if tensor.is_floating_point():
+                return tensor.dtype
+            dtype = tensor.dtype if dtype is None else dtype
+    return dtype
+
+
+class LayerStreamer:
+    """
+    Runs a model whose repeated blocks (`model._no_split_modules`) stay on the meta device and are only materialized on
+    CPU for the duration of their forward pass. Their weights are read from memory-mapped safetensors shards, so the
+    peak memory is the size of the other weights (embeddings, final norm, heads) plus two blocks, whatever the depth of
+    the model.
+
+    Args:
+        model (`torch.nn.Module`):
+            A model instantiated on the meta device (for instance under `accelerate.init_empty_weights`).
+        checkpoint_files (`List[str]`):
+            The safetensors shards containing the weights of `model`.
+        prefix (`str`, *optional*, defaults to `""`):
+            The base model prefix. Used to match checkpoints saved with (or without) a head on top of the base model.
+        prefetch (`bool`, *optional*, defaults to `True`):
+            Whether or not to load the weights of the next block in a background thread while the current block runs.
+    """
+
+    def __init__(self, model: "nn.Module", checkpoint_files: List[str], prefix: str = "", prefetch: bool = True):
+        if not is_safetensors_available():
+            raise ImportError("Layer streaming requires safetensors: `pip install safetensors`.")
+
+        self.model = model
+        self.prefix = prefix
+        # `safe_open` memory-maps the file: tensors are only read from disk when they are requested
+        self._handles = [safe_open(checkpoint_file, framework="pt") for checkpoint_file in checkpoint_files]
+        self._weight_map = {}
+        for handle in self._handles:
+            for key in handle.keys():
+                self._weight_map[key] = handle
+
+        self.layers = get_streamed_layers(model)
+        self._meta_params = []
+        for layer in self.layers:
+            module = model.get_submodule(layer)
+            self._meta_params.append({f"{layer}.{name}": param for name, param in module.named_parameters()})
+
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="layer-streaming") if prefetch else None
+        self._pending = {}
+        self._hooks = []
+
+    def _checkpoint_key(self, name: str) -> Optional[str]:
+        candidates = [name]
+        if self.prefix:
+            if name.startswith(f"{self.prefix}."):
+                candidates.append(name[len(self.prefix) + 1 :])
+            else:
+                candidates.append(f"{self.prefix}.{name}")
+        for candidate in candidates:
+            if candidate in self._weight_map:
+                return candidate
+        return None
+
+    def _read_tensors(self, params: Dict[str, "nn.Parameter"]) -> Dict[str, "torch.Tensor"]:
+        tensors = {}
+        for name, param in params.items():
+            key = self._checkpoint_key(name)
+            if key is None:
+                raise ValueError(f"The weight {name} is missing from the checkpoint and cannot be streamed.")
+            tensor = self._weight_map[key].get_tensor(key)
+            if tensor.is_floating_point():
+                tensor = tensor.to(param.dtype)
+            tensors[name] = tensor
+        return tensors
+
+    def _set_tensors(self, tensors: Dict[str, "torch.Tensor"]):
+        for name, tensor in tensors.items():
+            module_name, _, tensor_name = name.rpartition(".")
+            module = self.model.get_submodule(module_name)
+            if isinstance(tensor, nn.Parameter):
+                module._parameters[tensor_name] = tensor
+            else:
+                module._parameters[tensor_name] = nn.Parameter(tensor, requires_grad=False)
+
+    def _schedule(self, index: int):
+        if self._executor is not None and index not in self._pending:
+            self._pending[index] = self._executor.submit(self._read_tensors, self._meta_params[index])
+
+    def _pre_forward(self, index: int):
+        if self._executor is not None:
+            self._schedule(index)
+            tensors = self._pending.pop(index).result()
+            # wraps around so that the first block of the next forward pass is read while the head computes
+            self._schedule((index + 1) % len(self.layers))
+        else:
+            tensors = self._read_tensors(self._meta_params[index])
+        self._set_tensors(tensors)
+
+    def _post_forward(self, index: int):
+        self._set_tensors(self._meta_params[index])
+
+    def _is_streamed(self, name: str) -> bool:
+        return any(name.startswith(f"{layer}.") for layer in self.layers)
+
+    def load_resident_weights(self):
+        """
+        Loads all the parameters that are not part of a streamed block and are present in the checkpoint.
+        """
+        params = {}
+        for name, param in self.model.named_parameters():
+            if not self._is_streamed(name) and self._checkpoint_key(name) is not None:
+                params[name] = param
+        self._set_tensors(self._read_tensors(params))
+
+    def get_missing_resident_weights(self) -> List[str]:
+        """
+        Returns the names of the parameters that are not part of a streamed block and are still on the meta device.
+        """
+        return [
+            name
+            for name, param in self.model.named_parameters()
+            if not self._is_streamed(name) and param.device.type == "meta"
+        ]
+
+    def attach(self):
+        """
+        Registers the hooks materializing and releasing the weights of each streamed block.
+        """
+        for index, layer in enumerate(self.layers):
+            module = self.model.get_submodule(layer)
+            self._hooks.append(module.register_forward_pre_hook(lambda *args, index=index: self._pre_forward(index)))
+            self._hooks.append(module.register_forward_hook(lambda *args, index=index: self._post_forward(index)))
+        self.model._layer_streamer = self
+
+    def detach(self):
+        """
+        Removes the hooks and stops the prefetching thread. The streamed blocks are left on the meta device.
+        """
+        for hook in self._hooks:
+            hook.remove()
+        self._hooks = []
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self._pending = {}
+        self.model._layer_streamer = None
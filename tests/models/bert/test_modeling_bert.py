@@ -175,6 +175,38 @@ class BertModelTester:
         self.parent.assertEqual(result.last_hidden_state.shape, (self.batch_size, self.seq_length, self.hidden_size))
         self.parent.assertEqual(result.pooler_output.shape, (self.batch_size, self.hidden_size))
 
+    def create_and_check_model_unpad_inputs(
+        self, config, input_ids, token_type_ids, input_mask, sequence_labels, token_labels, choice_labels
+    ):
+        model = BertModel(config=config)
+        model.to(torch_device)
+        model.eval()
+
+        # skewed lengths, so that several sequences fit in one row, with left padding for the last sequence
+        lengths = [self.seq_length] + [2] * (self.batch_size - 1)
+        input_mask = torch.zeros_like(input_ids)
+        for i, length in enumerate(lengths):
+            input_mask[i, :length] = 1
+        input_mask[-1] = input_mask[-1].flip(0)
+
+        result = model(input_ids, attention_mask=input_mask, token_type_ids=token_type_ids)
+        model.config.unpad_inputs = True
+        result_unpadded = model(
+            input_ids, attention_mask=input_mask, token_type_ids=token_type_ids, output_hidden_states=True
+        )
+
+        real_tokens = input_mask.bool()
+        self.parent.assertTrue(
+            torch.allclose(
+                result.last_hidden_state[real_tokens], result_unpadded.last_hidden_state[real_tokens], atol=1e-5
+            )
+        )
+        self.parent.assertTrue(
+            torch.allclose(result.pooler_output[:-1], result_unpadded.pooler_output[:-1], atol=1e-5)
+        )
+        self.parent.assertEqual(len(result_unpadded.hidden_states), config.num_hidden_layers + 1)
+        self.parent.assertTrue(torch.all(result_unpadded.last_hidden_state[~real_tokens] == 0))
+
     def create_and_check_model_as_decoder(
         self,
         config,
@@ -491,6 +523,12 @@ class BertModelTest(ModelTesterMixin, GenerationTesterMixin, PipelineTesterMixin
             config_and_inputs[0].position_embedding_type = type
             self.model_tester.create_and_check_model(*config_and_inputs)
 
+    def test_model_unpad_inputs(self):
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        for type in ["absolute", "relative_key", "relative_key_query"]:
+            config_and_inputs[0].position_embedding_type = type
+            self.model_tester.create_and_check_model_unpad_inputs(*config_and_inputs)
+
     def test_model_as_decoder(self):
         config_and_inputs = self.model_tester.prepare_config_and_inputs_for_decoder()
         self.model_tester.create_and_check_model_as_decoder(*config_and_inputs)
@@ -38,6 +38,7 @@ if is_torch_available():
         BloomModel,
         BloomTokenizerFast,
     )
+    from transformers.models.bloom.modeling_bloom import build_alibi_slopes, build_alibi_tensor
 
 
 @require_torch
@@ -390,6 +391,23 @@ class BloomModelTest(ModelTesterMixin, GenerationTesterMixin, PipelineTesterMixi
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_bloom_weight_initialization(*config_and_inputs)
 
+    def test_bloom_alibi_slopes_cached(self):
+        config = self.model_tester.get_config()
+        config.n_head = 6  # not a power of 2
+        config.hidden_size = 36
+        model = BloomModel(config).to(torch_device).eval()
+        attention_mask = torch.tensor([[0, 1, 1, 1], [1, 1, 0, 1]], device=torch_device)
+
+        alibi = model.build_alibi_tensor(attention_mask, config.n_head, dtype=torch.float32)
+        expected_alibi = build_alibi_tensor(attention_mask, config.n_head, dtype=torch.float32)
+        self.assertTrue(torch.equal(alibi, expected_alibi))
+        self.assertTrue(torch.equal(model._alibi_slopes, build_alibi_slopes(config.n_head, device=torch_device)))
+
+        # the slopes are computed once and then reused
+        slopes = model._alibi_slopes
+        model.build_alibi_tensor(attention_mask, config.n_head, dtype=torch.float32)
+        self.assertIs(model._alibi_slopes, slopes)
+
     @unittest.skip("Bloom has a non-standard KV cache format.")
     def test_past_key_values_format(self):
         pass
@@ -130,6 +130,30 @@ class DistilBertModelTester(object):
         result = model(input_ids)
         self.parent.assertEqual(result.last_hidden_state.shape, (self.batch_size, self.seq_length, self.hidden_size))
 
+    def create_and_check_distilbert_model_unpad_inputs(
+        self, config, input_ids, input_mask, sequence_labels, token_labels, choice_labels
+    ):
+        model = DistilBertModel(config=config)
+        model.to(torch_device)
+        model.eval()
+
+        # skewed lengths, so that several sequences fit in one row
+        lengths = [self.seq_length] + [2] * (self.batch_size - 1)
+        input_mask = torch.zeros_like(input_ids)
+        for i, length in enumerate(lengths):
+            input_mask[i, :length] = 1
+
+        result = model(input_ids, input_mask)
+        model.config.unpad_inputs = True
+        result_unpadded = model(input_ids, input_mask)
+
+        real_tokens = input_mask.bool()
+        self.parent.assertTrue(
+            torch.allclose(
+                result.last_hidden_state[real_tokens], result_unpadded.last_hidden_state[real_tokens], atol=1e-5
+            )
+        )
+
     def create_and_check_distilbert_for_masked_lm(
         self, config, input_ids, input_mask, sequence_labels, token_labels, choice_labels
     ):
@@ -237,6 +261,10 @@ class DistilBertModelTest(ModelTesterMixin, PipelineTesterMixin, unittest.TestCa
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_distilbert_model(*config_and_inputs)
 
+    def test_distilbert_model_unpad_inputs(self):
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_distilbert_model_unpad_inputs(*config_and_inputs)
+
     def test_for_masked_lm(self):
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_distilbert_for_masked_lm(*config_and_inputs)
@@ -15,6 +15,7 @@
 """ Testing suite for the PyTorch LLaMA model. """
 
 
+import copy
 import unittest
 
 from transformers import LlamaConfig, is_torch_available
@@ -329,6 +330,49 @@ class LlamaModelTest(ModelTesterMixin, GenerationTesterMixin, PipelineTesterMixi
         result = model(input_ids, attention_mask=attention_mask, labels=sequence_labels)
         self.assertEqual(result.logits.shape, (self.model_tester.batch_size, self.model_tester.num_labels))
 
+    def test_model_grouped_query_attention(self):
+        config, input_dict = self.model_tester.prepare_config_and_inputs_for_common()
+        config.num_key_value_heads = 2
+        input_ids = input_dict["input_ids"]
+        attention_mask = input_dict["attention_mask"]
+        gqa_model = LlamaModel(config).to(torch_device).eval()
+
+        # a regular multi-head model with every key/value head repeated for its group of query heads
+        mha_config = copy.deepcopy(config)
+        mha_config.num_key_value_heads = config.num_attention_heads
+        mha_model = LlamaModel(mha_config).to(torch_device).eval()
+        groups = config.num_attention_heads // config.num_key_value_heads
+        head_dim = config.hidden_size // config.num_attention_heads
+        state_dict = gqa_model.state_dict()
+        for name, param in state_dict.items():
+            if name.endswith(("k_proj.weight", "v_proj.weight")):
+                param = param.view(config.num_key_value_heads, head_dim, -1).repeat_interleave(groups, dim=0)
+                state_dict[name] = param.reshape(config.hidden_size, -1)
+        mha_model.load_state_dict(state_dict)
+
+        with torch.no_grad():
+            gqa_outputs = gqa_model(input_ids, attention_mask=attention_mask, use_cache=True)
+            mha_outputs = mha_model(input_ids, attention_mask=attention_mask, use_cache=True)
+        self.assertTrue(torch.allclose(gqa_outputs.last_hidden_state, mha_outputs.last_hidden_state, atol=1e-5))
+
+        # only the key/value heads are cached
+        batch_size, seq_length = input_ids.shape
+        for key, value in gqa_outputs.past_key_values:
+            self.assertEqual(key.shape, (batch_size, config.num_key_value_heads, seq_length, head_dim))
+            self.assertEqual(value.shape, (batch_size, config.num_key_value_heads, seq_length, head_dim))
+
+        # incremental decoding from the grouped cache
+        next_tokens = ids_tensor((batch_size, 1), config.vocab_size)
+        next_attention_mask = torch.cat([attention_mask, attention_mask.new_ones((batch_size, 1))], dim=-1)
+        with torch.no_grad():
+            gqa_next = gqa_model(
+                next_tokens, attention_mask=next_attention_mask, past_key_values=gqa_outputs.past_key_values
+            )
+            mha_next = mha_model(
+                next_tokens, attention_mask=next_attention_mask, past_key_values=mha_outputs.past_key_values
+            )
+        self.assertTrue(torch.allclose(gqa_next.last_hidden_state, mha_next.last_hidden_state, atol=1e-5))
+
     @unittest.skip("LLaMA buffers include complex numbers, which breaks this test")
     def test_save_load_fast_init_from_base(self):
         pass
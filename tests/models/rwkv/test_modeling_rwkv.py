@@ -33,6 +33,11 @@ if is_torch_available():
         RWKV_PRETRAINED_MODEL_ARCHIVE_LIST,
         RwkvForCausalLM,
         RwkvModel,
+        RwkvStateStore,
+    )
+    from transformers.models.rwkv.modeling_rwkv import (
+        rwkv_linear_attention_cpu,
+        rwkv_linear_attention_cpu_chunked,
     )
     from transformers.pytorch_utils import is_torch_greater_or_equal_than_2_0
 else:
@@ -228,6 +233,33 @@ class RwkvModelTester:
 
         self.parent.assertTrue(torch.allclose(torch.cat([output_one, output_two], dim=1), output_whole, atol=1e-5))
 
+    def create_and_check_state_store(self, config, input_ids, input_mask, head_mask, token_type_ids, *args):
+        model = RwkvModel(config=config)
+        model.to(torch_device)
+        model.eval()
+
+        outputs = model(input_ids)
+        output_whole = outputs.last_hidden_state
+
+        outputs = model(input_ids[:, :2], use_cache=True)
+        store = RwkvStateStore(max_sessions=self.batch_size - 1)
+        for i in range(self.batch_size):
+            store.save(i, outputs.state, batch_index=i)
+        # the first session has been evicted
+        self.parent.assertEqual(len(store), self.batch_size - 1)
+        self.parent.assertNotIn(0, store)
+
+        session_ids = list(range(1, self.batch_size))
+        state = store.load_batch(session_ids, device=torch_device)
+        outputs = model(input_ids[1:, 2:], state=state)
+        self.parent.assertTrue(torch.allclose(outputs.last_hidden_state, output_whole[1:, 2:], atol=1e-5))
+
+        # the stored states are not modified by the forward pass and survive serialization
+        restored_store = RwkvStateStore()
+        restored_store.from_bytes("restored", store.to_bytes(1))
+        outputs = model(input_ids[1:2, 2:], state=restored_store.load("restored", device=torch_device))
+        self.parent.assertTrue(torch.allclose(outputs.last_hidden_state, output_whole[1:2, 2:], atol=1e-5))
+
     def create_and_check_forward_and_backwards(
         self, config, input_ids, input_mask, head_mask, token_type_ids, *args, gradient_checkpointing=False
     ):
@@ -320,6 +352,31 @@ class RwkvModelTest(ModelTesterMixin, GenerationTesterMixin, PipelineTesterMixin
         config_and_inputs = self.model_tester.prepare_config_and_inputs()
         self.model_tester.create_and_check_state_equivalency(*config_and_inputs)
 
+    def test_state_store(self):
+        config_and_inputs = self.model_tester.prepare_config_and_inputs()
+        self.model_tester.create_and_check_state_store(*config_and_inputs)
+
+    def test_linear_attention_cpu_chunked(self):
+        batch_size, seq_length, hidden_size = 2, 37, 16
+        time_decay = torch.linspace(-5, 3, hidden_size)
+        time_first = torch.randn(hidden_size)
+        key = torch.randn(batch_size, seq_length, hidden_size) * 3
+        value = torch.randn(batch_size, seq_length, hidden_size)
+
+        expected_output, expected_state = rwkv_linear_attention_cpu(
+            time_decay, time_first, key, value, return_state=True
+        )
+        output, state = rwkv_linear_attention_cpu_chunked(
+            time_decay, time_first, key, value, return_state=True, chunk_size=8
+        )
+        self.assertTrue(torch.allclose(output, expected_output, atol=1e-4))
+
+        # the states have to lead to the same outputs afterwards
+        key, value = key[:, :5], value[:, :5]
+        expected_output, _ = rwkv_linear_attention_cpu(time_decay, time_first, key, value, state=expected_state)
+        output, _ = rwkv_linear_attention_cpu(time_decay, time_first, key, value, state=state)
+        self.assertTrue(torch.allclose(output, expected_output, atol=1e-4))
+
     def test_initialization(self):
         config, _ = self.model_tester.prepare_config_and_inputs_for_common()
 
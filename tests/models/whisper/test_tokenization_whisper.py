@@ -14,8 +14,15 @@
 
 import unittest
 
+import numpy as np
+
 from transformers.models.whisper import WhisperTokenizer, WhisperTokenizerFast
-from transformers.models.whisper.tokenization_whisper import _combine_tokens_into_words, _find_longest_common_sequence
+from transformers.models.whisper.tokenization_whisper import (
+    _combine_tokens_into_words,
+    _count_overlap_matches,
+    _find_longest_common_sequence,
+    _find_longest_common_substring,
+)
 from transformers.testing_utils import slow
 
 from ...test_tokenization_common import TokenizerTesterMixin
@@ -194,6 +201,45 @@ class WhisperTokenizerTest(TokenizerTesterMixin, unittest.TestCase):
         merge = _find_longest_common_sequence([seq1, seq2, seq3])
         self.assertEqual(merge, [1, 2, 3, 4, 5, 6, 7, 8])
 
+    def test_count_overlap_matches(self):
+        # Overlaps of 1 to 5 tokens: [3] / [3], [2, 3] / [3, 2], [1, 2, 3] / [3, 2, 1], [1, 2] / [2, 1], [1] / [1]
+        self.assertEqual(_count_overlap_matches([1, 2, 3], [3, 2, 1]).tolist(), [1, 0, 1, 0, 1])
+        self.assertEqual(_count_overlap_matches([1, 2, 3], [2, 3, 4, 5]).tolist(), [0, 2, 0, 0, 0, 0])
+        self.assertEqual(_count_overlap_matches([], [1, 2]).tolist(), [0])
+
+        rng = np.random.default_rng(0)
+        left, right = rng.integers(0, 4, size=20), rng.integers(0, 4, size=13)
+        expected = [
+            sum(left[len(left) - i + k] == right[k] for k in range(len(right)) if 0 <= len(left) - i + k < len(left))
+            for i in range(1, len(left) + len(right))
+        ]
+        self.assertEqual(_count_overlap_matches(left, right).tolist(), expected)
+
+    def test_find_longest_common_substring(self):
+        self.assertEqual(_find_longest_common_substring([1, 2, 3, 4], [0, 2, 3, 4, 5]), (1, 1, 3))
+        self.assertEqual(_find_longest_common_substring([1, 2, 3], [4, 5]), (-1, -1, 0))
+        self.assertEqual(_find_longest_common_substring([], [4, 5]), (-1, -1, 0))
+        # The last of the longest runs
+        self.assertEqual(_find_longest_common_substring([1, 2, 7, 1, 2], [1, 2, 8, 1, 2]), (3, 3, 2))
+
+        rng = np.random.default_rng(0)
+        for _ in range(20):
+            left, right = rng.integers(0, 3, size=rng.integers(1, 15)), rng.integers(0, 3, size=rng.integers(1, 15))
+            expected = (-1, -1, 0)
+            for index_left in range(len(left)):
+                for index_right in range(len(right)):
+                    length = 0
+                    while (
+                        index_left + length < len(left)
+                        and index_right + length < len(right)
+                        and left[index_left + length] == right[index_right + length]
+                    ):
+                        length += 1
+                    # Ties go to the run ending last in the left sequence, then in the right one
+                    if length > 0 and length >= expected[2]:
+                        expected = (index_left, index_right, length)
+            self.assertEqual(_find_longest_common_substring(left, right), expected)
+
     def test_skip_special_tokens_skips_prompt_ids(self):
         tokenizer = self.get_tokenizer()
         rust_tokenizer = self.get_rust_tokenizer()
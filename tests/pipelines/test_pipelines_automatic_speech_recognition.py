@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import json
+import os
+import tempfile
 import unittest
 
 import numpy as np
@@ -26,12 +29,21 @@ from transformers import (
     AutoProcessor,
     AutoTokenizer,
     Speech2TextForConditionalGeneration,
+    Wav2Vec2Config,
+    Wav2Vec2CTCTokenizer,
+    Wav2Vec2FeatureExtractor,
     Wav2Vec2ForCTC,
     WhisperForConditionalGeneration,
 )
+from transformers.models.whisper.tokenization_whisper import _find_longest_common_sequence
 from transformers.pipelines import AutomaticSpeechRecognitionPipeline, pipeline
 from transformers.pipelines.audio_utils import chunk_bytes_iter
-from transformers.pipelines.automatic_speech_recognition import _find_timestamp_sequence, chunk_iter
+from transformers.pipelines.automatic_speech_recognition import (
+    _find_timestamp_sequence,
+    _IncrementalDecoder,
+    _IncrementalSequenceMerger,
+    chunk_iter,
+)
 from transformers.testing_utils import (
     is_pipeline_test,
     is_torch_available,
@@ -1187,6 +1199,90 @@ class AutomaticSpeechRecognitionPipelineTests(unittest.TestCase):
         # (85, 100)
         self.assertEqual(nested_simplify(input_values[:, 80:100]), nested_simplify(outs[4]["input_values"]))
 
+    @require_torch
+    def test_chunk_iterator_blocks(self):
+        feature_extractor = Wav2Vec2FeatureExtractor(do_normalize=False)
+        inputs = np.arange(100, dtype=np.float32)
+        for chunk_len, stride_left, stride_right in [(100, 0, 0), (50, 0, 0), (80, 0, 0), (36, 6, 6), (90, 20, 0)]:
+            expected = list(chunk_iter(inputs, feature_extractor, chunk_len, stride_left, stride_right))
+            for block_size in [1, 7, 50, 100]:
+                blocks = (inputs[i : i + block_size] for i in range(0, len(inputs), block_size))
+                outs = list(chunk_iter(blocks, feature_extractor, chunk_len, stride_left, stride_right))
+                self.assertEqual([o["stride"] for o in outs], [o["stride"] for o in expected])
+                self.assertEqual([o["is_last"] for o in outs], [o["is_last"] for o in expected])
+                self.assertEqual(
+                    nested_simplify([o["input_values"] for o in outs]),
+                    nested_simplify([o["input_values"] for o in expected]),
+                )
+
+    def test_incremental_sequence_merger(self):
+        sequences = [[1, 2, 3, 4, 5], [3, 4, 5, 6, 7], [6, 7, 8, 9], [10, 11], [11, 12, 3]]
+        merger = _IncrementalSequenceMerger()
+        merged = []
+        for sequence in sequences:
+            merged.extend(merger.add(sequence))
+        merged.extend(merger.flush())
+        self.assertEqual(merged, _find_longest_common_sequence(sequences))
+        self.assertEqual(merger.flush(), [])
+
+    def test_incremental_decoder(self):
+        words = ["a", "bb", "ccc", "d"]
+        decoder = _IncrementalDecoder(lambda ids: " ".join(words[i] for i in ids), window=2)
+        self.assertEqual(decoder.add([0, 1]), "a ")
+        self.assertEqual(decoder.add([2]), "bb ")
+        self.assertEqual(decoder.add([3, 0, 1]), "ccc d a ")
+        # Only the last ids are kept
+        self.assertEqual(decoder.ids, [0, 1])
+        self.assertEqual(decoder.flush(), "bb")
+
+    @require_torch
+    def test_stream_ctc(self):
+        torch.manual_seed(0)
+        vocab = {"<pad>": 0, "<s>": 1, "</s>": 2, "<unk>": 3, "|": 4, "A": 5, "B": 6, "C": 7, "D": 8, "E": 9}
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.json")
+            with open(vocab_file, "w", encoding="utf-8") as f:
+                json.dump(vocab, f)
+            tokenizer = Wav2Vec2CTCTokenizer(vocab_file)
+        config = Wav2Vec2Config(
+            vocab_size=len(vocab),
+            hidden_size=16,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=16,
+            conv_dim=(8, 8),
+            conv_stride=(5, 4),
+            conv_kernel=(5, 4),
+            num_conv_pos_embeddings=4,
+            num_conv_pos_embedding_groups=2,
+        )
+        model = Wav2Vec2ForCTC(config).eval()
+        with torch.no_grad():
+            # Random but not empty transcriptions
+            model.lm_head.weight.normal_(0, 10)
+            model.lm_head.bias[:4] = -100
+        feature_extractor = Wav2Vec2FeatureExtractor(do_normalize=False)
+        speech_recognizer = pipeline(
+            task="automatic-speech-recognition", model=model, tokenizer=tokenizer, feature_extractor=feature_extractor
+        )
+
+        rng = np.random.RandomState(0)
+        audio = rng.randn(3 * 16_000).astype(np.float32)
+        expected = speech_recognizer(audio, chunk_length_s=0.5, stride_length_s=0.1)["text"]
+        self.assertGreater(len(expected.split()), 5)
+
+        block_sizes = rng.randint(1, 5000, size=len(audio))
+        block_starts = np.cumsum(np.concatenate([[0], block_sizes]))
+        blocks = (audio[start:stop] for start, stop in zip(block_starts, block_starts[1:]) if start < len(audio))
+        outputs = list(speech_recognizer.stream(blocks, chunk_length_s=0.5, stride_length_s=0.1))
+        self.assertEqual("".join(output["text"] for output in outputs), expected)
+        self.assertEqual([output["is_last"] for output in outputs], [False] * (len(outputs) - 1) + [True])
+        # The text is returned as it comes
+        self.assertNotEqual(outputs[0]["text"], "")
+
+        with self.assertRaises(ValueError):
+            next(speech_recognizer.stream(iter([audio]), chunk_length_s=0))
+
     @require_torch
     def test_stride(self):
         speech_recognizer = pipeline(
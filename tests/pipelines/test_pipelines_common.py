@@ -486,6 +486,261 @@ class PipelineUtilsTest(unittest.TestCase):
         outputs = list(dataset)
         self.assertEqual(outputs, [[{"id": 2}, {"id": 3}, {"id": 4}, {"id": 5}]])
 
+    @require_torch
+    def test_pipeline_bucket_iterator(self):
+        import torch
+
+        from transformers.pipelines.base import no_collate_fn, pad_collate_fn
+        from transformers.pipelines.pt_utils import PipelineBucketIterator
+
+        lengths = [3, 1, 5, 2, 4, 1, 6]
+        dummy_dataset = [{"input_ids": torch.ones((1, n), dtype=torch.long) * n} for n in lengths]
+
+        class DummyTokenizer:
+            pad_token_id = 0
+            padding_side = "right"
+
+        batch_shapes = []
+
+        def forward(batch):
+            batch_shapes.append(tuple(batch["input_ids"].shape))
+            return {"length": batch["input_ids"].max(dim=1).values}
+
+        def check(expected_batch_shapes, **kwargs):
+            batch_shapes.clear()
+            dataset = PipelineBucketIterator(
+                dummy_dataset, forward, {}, collate_fn=pad_collate_fn(DummyTokenizer(), None), **kwargs
+            )
+            outputs = list(dataset)
+            # The outputs are in the order of the inputs
+            self.assertEqual([output["length"].item() for output in outputs], lengths)
+            self.assertEqual(batch_shapes, expected_batch_shapes)
+
+        check([(2, 6), (2, 4), (2, 2), (1, 1)], batch_size=2, window_size=7)
+        # Items are only sorted within each window
+        check([(2, 5), (1, 1), (2, 4), (1, 1), (1, 6)], batch_size=2, window_size=3)
+        # A token budget instead of a fixed batch size
+        check([(1, 6), (2, 5), (3, 3), (1, 1)], batch_size=1, window_size=7, max_batch_tokens=10)
+
+        self.assertEqual(no_collate_fn([dummy_dataset[0]]), dummy_dataset[0])
+
+    @require_torch
+    def test_pipeline_length_bucketing(self):
+        from transformers import BertConfig, BertForSequenceClassification, BertForTokenClassification, BertTokenizer
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=8,
+        )
+        texts = ["want", "unwanted running " * 10, "running", "unwanted " * 5, "wanted want", "runn " * 20]
+
+        classifier = pipeline(
+            "text-classification", model=BertForSequenceClassification(config).eval(), tokenizer=tokenizer
+        )
+        expected = classifier(texts)
+        self.assertEqual(nested_simplify(classifier(texts, batch_size=2, bucket_window=4)), nested_simplify(expected))
+        self.assertEqual(
+            nested_simplify(classifier(texts, bucket_window=6, max_batch_tokens=40)), nested_simplify(expected)
+        )
+        with self.assertRaises(ValueError):
+            classifier(texts, max_batch_tokens=40)
+
+        # Chunk pipelines
+        token_classifier = pipeline(
+            "token-classification", model=BertForTokenClassification(config).eval(), tokenizer=tokenizer
+        )
+        expected = token_classifier(texts)
+        outputs = token_classifier(texts, batch_size=3, bucket_window=6)
+        self.assertEqual(nested_simplify(outputs), nested_simplify(expected))
+
+    @require_torch
+    def test_pipeline_threaded_iterator(self):
+        import threading
+        import time
+
+        from transformers.pipelines.pt_utils import PipelineThreadedIterator
+
+        threads = set()
+
+        def infer(item, delay):
+            threads.add(threading.get_ident())
+            # Later items are processed faster, the outputs must still be in order
+            time.sleep(delay * (10 - item))
+            return item * 2
+
+        dataset = PipelineThreadedIterator(range(10), infer, {"delay": 0.001}, num_threads=4)
+        self.assertEqual(list(dataset), [item * 2 for item in range(10)])
+        # The first item is processed by the current thread, the others by the pool
+        self.assertIn(threading.get_ident(), threads)
+        self.assertGreater(len(threads), 1)
+
+        # Generators are only read ahead by `max_pending` items
+        read = []
+
+        def generator():
+            for item in range(10):
+                read.append(item)
+                yield item
+
+        iterator = iter(PipelineThreadedIterator(generator(), infer, {"delay": 0}, num_threads=2, max_pending=3))
+        self.assertEqual(next(iterator), 0)
+        self.assertEqual(next(iterator), 2)
+        self.assertEqual(read, [0, 1, 2, 3])
+        iterator.close()
+
+        # Like `PipelineChunkIterator`
+        dataset = PipelineThreadedIterator([1, 2, 3], lambda item: iter(range(item)), {}, num_threads=2, chunked=True)
+        self.assertEqual(list(dataset), [0, 0, 1, 0, 1, 2])
+
+    @require_torch
+    def test_pipeline_num_threads(self):
+        from transformers import BertConfig, BertForSequenceClassification, BertForTokenClassification, BertTokenizer
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=8,
+        )
+        texts = ["want", "unwanted running " * 10, "running", "unwanted " * 5, "wanted want", "runn " * 20]
+
+        classifier = pipeline(
+            "text-classification", model=BertForSequenceClassification(config).eval(), tokenizer=tokenizer
+        )
+        expected = nested_simplify(classifier(texts))
+        self.assertEqual(nested_simplify(classifier(texts, num_threads=2)), expected)
+        self.assertEqual(nested_simplify(classifier(texts, batch_size=2, num_threads=2)), expected)
+        outputs = classifier((text for text in texts), batch_size=2, bucket_window=4, num_threads=3)
+        self.assertEqual(nested_simplify(list(outputs)), expected)
+
+        # Chunk pipelines
+        token_classifier = pipeline(
+            "token-classification",
+            model=BertForTokenClassification(config).eval(),
+            tokenizer=tokenizer,
+            num_threads=2,
+        )
+        expected = token_classifier(texts, num_threads=None)
+        outputs = token_classifier((text for text in texts), batch_size=3)
+        self.assertEqual(nested_simplify(list(outputs)), nested_simplify(expected))
+
+    def get_tiny_bert_classifier(self, **kwargs):
+        from transformers import BertConfig, BertForSequenceClassification, BertTokenizer
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=8,
+        )
+        model = BertForSequenceClassification(config).eval()
+        return pipeline("text-classification", model=model, tokenizer=tokenizer, **kwargs)
+
+    @require_torch
+    def test_pipeline_result_cache(self):
+        from unittest.mock import patch
+
+        from transformers import PipelineResultCache
+
+        cache = PipelineResultCache(max_size=3)
+        classifier = self.get_tiny_bert_classifier(result_cache=cache)
+        texts = ["want", "unwanted running", "want", "runn"]
+        reference = pipeline("text-classification", model=classifier.model, tokenizer=classifier.tokenizer)
+        expected = nested_simplify(reference(texts, top_k=None))
+
+        with patch.object(classifier, "_forward", wraps=classifier._forward) as forward:
+            # Duplicated inputs are only run once
+            self.assertEqual(nested_simplify(classifier(texts, top_k=None)), expected)
+            self.assertEqual(forward.call_count, 3)
+            self.assertEqual(cache.stats(), {"size": 3, "hits": 0, "misses": 3, "evictions": 0, "hit_rate": 0.0})
+
+            # Only the missing results are computed
+            outputs = classifier(["wanted", "want"], top_k=None)
+            self.assertEqual(nested_simplify(outputs[1]), expected[0])
+            self.assertEqual(forward.call_count, 4)
+            self.assertEqual(nested_simplify(classifier("runn", top_k=None)), expected[3])
+            self.assertEqual(forward.call_count, 4)
+            self.assertEqual((cache.hits, cache.misses, cache.evictions), (2, 4, 1))
+
+            # The parameters are part of the keys
+            classifier("runn", top_k=1)
+            self.assertEqual(forward.call_count, 5)
+            # The results are copies
+            outputs = classifier("runn", top_k=None)
+            outputs[0]["label"] = "modified"
+            self.assertEqual(nested_simplify(classifier("runn", top_k=None)), expected[3])
+
+            # Not used for generators
+            list(classifier((text for text in ["runn"]), top_k=None))
+            self.assertEqual(forward.call_count, 6)
+
+        # Not used in training mode
+        classifier.model.train()
+        self.assertFalse(classifier._can_cache_results({}))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+        self.assertEqual(cache.hit_rate, 0.0)
+
+    @require_torch
+    def test_pipeline_sqlite_result_cache(self):
+        from transformers import SQLitePipelineResultCache
+
+        classifier = self.get_tiny_bert_classifier()
+        texts = ["want", "unwanted running", "wanted want"]
+        expected = nested_simplify(classifier(texts))
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, "results.sqlite")
+            classifier.result_cache = SQLitePipelineResultCache(path, max_size=2)
+            self.assertEqual(nested_simplify(classifier(texts)), expected)
+            self.assertEqual(classifier.result_cache.stats()["evictions"], 1)
+            classifier.result_cache.close()
+
+            # The results are kept across processes, the least recently used one was evicted
+            cache = SQLitePipelineResultCache(path, max_size=2)
+            classifier.result_cache = cache
+            self.assertEqual(len(cache), 2)
+            self.assertEqual(nested_simplify(classifier(texts[1:])), expected[1:])
+            self.assertEqual((cache.hits, cache.misses), (2, 0))
+            self.assertEqual(nested_simplify(classifier(texts[0])), [expected[0]])
+            self.assertEqual((cache.hits, cache.misses, len(cache)), (2, 1, 2))
+            cache.close()
+
+    @require_torch
+    def test_pipeline_result_cache_sampling(self):
+        from transformers import GPT2Config, GPT2LMHeadModel, PipelineResultCache
+
+        model = GPT2LMHeadModel(GPT2Config(vocab_size=11, n_embd=8, n_layer=1, n_head=2)).eval()
+        tokenizer = self.get_tiny_bert_classifier().tokenizer
+        generator = pipeline("text-generation", model=model, tokenizer=tokenizer, result_cache=PipelineResultCache())
+        self.assertTrue(generator._can_cache_results({}))
+        self.assertFalse(generator._can_cache_results({"do_sample": True}))
+        model.generation_config.do_sample = True
+        self.assertFalse(generator._can_cache_results({}))
+        self.assertTrue(generator._can_cache_results({"do_sample": False}))
+
     def test_pipeline_negative_device(self):
         # To avoid regressing, pipeline used to accept device=-1
         classifier = pipeline("text-generation", "hf-internal-testing/tiny-random-bert", device=-1)
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import tempfile
 import unittest
 
 import numpy as np
@@ -21,6 +23,8 @@ from transformers import (
     IMAGE_PROCESSOR_MAPPING,
     MODEL_MAPPING,
     TF_MODEL_MAPPING,
+    BertConfig,
+    BertTokenizer,
     FeatureExtractionPipeline,
     LxmertConfig,
     is_tf_available,
@@ -158,6 +162,69 @@ class FeatureExtractionPipelineTests(unittest.TestCase):
         outputs = feature_extractor("This is a test", return_tensors=True)
         self.assertTrue(tf.is_tensor(outputs))
 
+    def get_tiny_bert_pipeline(self):
+        from transformers import BertModel
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "this", "is", "a", "test", "longer", "one"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=8,
+        )
+        return FeatureExtractionPipeline(model=BertModel(config).eval(), tokenizer=tokenizer)
+
+    @require_torch
+    def test_pooling(self):
+        feature_extractor = self.get_tiny_bert_pipeline()
+        texts = ["this is a test", "this is a longer test , this one", "test"]
+        features = [np.array(feature_extractor(text)[0]) for text in texts]
+
+        for pooling, pool in [("mean", lambda f: f.mean(0)), ("max", lambda f: f.max(0)), ("cls", lambda f: f[0])]:
+            expected = [pool(f) for f in features]
+            # The padding tokens of the batches are ignored
+            for batch_size in [1, 3]:
+                outputs = feature_extractor(texts, pooling=pooling, batch_size=batch_size)
+                self.assertEqual([np.array(output).shape for output in outputs], [(1, 8)] * 3)
+                for output, expected_output in zip(outputs, expected):
+                    self.assertTrue(np.allclose(output[0], expected_output, atol=1e-5))
+
+        with self.assertRaises(ValueError):
+            feature_extractor("this is a test", pooling="sum")
+
+    @require_torch
+    def test_export_embeddings(self):
+        feature_extractor = self.get_tiny_bert_pipeline()
+        texts = ["this is a test", "this is a longer test", "test", "a test", "this one"]
+        expected = np.concatenate([np.array(feature_extractor(text, pooling="mean")) for text in texts])
+
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            path = os.path.join(tmpdirname, "embeddings.npy")
+            embeddings = feature_extractor.export_embeddings(texts, path, batch_size=2, flush_every=2)
+            self.assertEqual(embeddings.shape, (5, 8))
+            self.assertTrue(np.allclose(np.load(path), expected, atol=1e-5))
+            with open(f"{path}.progress") as f:
+                self.assertEqual(f.read(), "5")
+
+            # Resume an export interrupted after 3 inputs, only the remaining ones are computed
+            path = os.path.join(tmpdirname, "resumed.npy")
+            feature_extractor.export_embeddings(texts[:3] + ["", ""], path, dtype="float16", flush_every=3)
+            with open(f"{path}.progress", "w") as f:
+                f.write("3")
+            feature_extractor.export_embeddings(texts, path, dtype="float16")
+            embeddings = np.load(path)
+            self.assertEqual(embeddings.dtype, np.float16)
+            self.assertTrue(np.allclose(embeddings, expected, atol=1e-2))
+
+            with self.assertRaises(ValueError):
+                feature_extractor.export_embeddings(texts[:4], path, dtype="float16")
+
     def get_shape(self, input_, shape=None):
         if shape is None:
             shape = []
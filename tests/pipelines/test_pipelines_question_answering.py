@@ -14,6 +14,8 @@
 
 import unittest
 
+import numpy as np
+
 from transformers import (
     MODEL_FOR_QUESTION_ANSWERING_MAPPING,
     TF_MODEL_FOR_QUESTION_ANSWERING_MAPPING,
@@ -22,6 +24,7 @@ from transformers import (
 )
 from transformers.data.processors.squad import SquadExample
 from transformers.pipelines import QuestionAnsweringArgumentHandler, pipeline
+from transformers.pipelines.question_answering import _select_starts_ends_batched, decode_spans, select_starts_ends
 from transformers.testing_utils import (
     is_pipeline_test,
     nested_simplify,
@@ -502,3 +505,52 @@ class QuestionAnsweringArgumentHandlerTests(unittest.TestCase):
 
         with self.assertRaises(ValueError):
             qa(1)
+
+
+class QuestionAnsweringDecodingTests(unittest.TestCase):
+    def test_decode_spans(self):
+        rng = np.random.RandomState(0)
+        start, end = rng.rand(20), rng.rand(20)
+        undesired_tokens = np.ones(20, dtype=int)
+        undesired_tokens[[0, 1, 2, 7]] = 0
+        starts, ends, scores = decode_spans(start, end, 10, 4, undesired_tokens)
+
+        # All the spans of at most 4 tokens without undesired tokens at their ends, from the best
+        expected = sorted(
+            (
+                (start[s] * end[e], s, e)
+                for s in range(20)
+                for e in range(s, min(s + 4, 20))
+                if s > 2 and s != 7 and e != 7
+            ),
+            reverse=True,
+        )[:10]
+        self.assertEqual(list(zip(scores.tolist(), starts.tolist(), ends.tolist())), expected)
+
+    def test_select_starts_ends_batched(self):
+        rng = np.random.RandomState(0)
+        lengths = [12, 30, 7]
+        start = [rng.randn(1, length).astype(np.float32) for length in lengths]
+        end = [rng.randn(1, length).astype(np.float32) for length in lengths]
+        p_mask = [np.array([[0] + [1] * 3 + [0] * (length - 5) + [1]]) for length in lengths]
+        attention_mask = [np.ones((1, length), dtype=int) for length in lengths]
+        attention_mask[1][0, -10:] = 0
+
+        features, starts, ends, scores, min_null_score = _select_starts_ends_batched(
+            start, end, p_mask, attention_mask, top_k=5, handle_impossible_answer=True, max_answer_len=6
+        )
+
+        # Same spans as decoding each feature on its own
+        expected = []
+        expected_min_null_score = 1000000
+        for i in range(len(lengths)):
+            feature_starts, feature_ends, feature_scores, expected_min_null_score = select_starts_ends(
+                start[i], end[i], p_mask[i], attention_mask[i], expected_min_null_score, 5, True, 6
+            )
+            expected.extend((score, i, s, e) for s, e, score in zip(feature_starts, feature_ends, feature_scores))
+        expected = sorted(expected, reverse=True)[:5]
+        self.assertEqual(
+            nested_simplify(list(zip(scores.tolist(), features.tolist(), starts.tolist(), ends.tolist()))),
+            nested_simplify([tuple(span) for span in expected]),
+        )
+        self.assertAlmostEqual(min_null_score, expected_min_null_score)
@@ -12,6 +12,8 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import tempfile
 import unittest
 
 import numpy as np
@@ -21,7 +23,10 @@ from transformers import (
     TF_MODEL_FOR_TOKEN_CLASSIFICATION_MAPPING,
     AutoModelForTokenClassification,
     AutoTokenizer,
+    BertConfig,
+    BertTokenizerFast,
     TokenClassificationPipeline,
+    is_torch_available,
     pipeline,
 )
 from transformers.pipelines import AggregationStrategy, TokenClassificationArgumentHandler
@@ -37,6 +42,10 @@ from transformers.testing_utils import (
 from .test_pipelines_common import ANY
 
 
+if is_torch_available():
+    import torch
+
+
 VALID_INPUTS = ["A simple string", ["list of strings", "A simple string that is quite a bit longer"]]
 
 # These 2 model types require different inputs than those of the usual text models.
@@ -62,8 +71,8 @@ class TokenClassificationPipelineTests(unittest.TestCase):
     def run_pipeline_test(self, token_classifier, _):
         model = token_classifier.model
         tokenizer = token_classifier.tokenizer
-        if not tokenizer.is_fast:
-            return  # Slow tokenizers do not return offsets mappings, so this test will fail
+        if not tokenizer.is_fast and not tokenizer._supports_offsets_mapping:
+            return  # This tokenizer does not return offsets mappings, so this test will fail
 
         outputs = token_classifier("A simple string")
         self.assertIsInstance(outputs, list)
@@ -762,6 +771,77 @@ class TokenClassificationPipelineTests(unittest.TestCase):
             [("▁I", False), ("▁play", False), ("▁the", False), ("▁there", False), ("min", True)],
         )
 
+    def get_tiny_bert_pipeline(self, num_hidden_layers=1):
+        from transformers import BertForTokenClassification
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "new", "york", "##er", "city", "is", "big", "##gest", "."]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizerFast(vocab_file)
+        labels = ["O", "B-LOC", "I-LOC", "B-MISC", "I-MISC", "PER"]
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=num_hidden_layers,
+            num_attention_heads=2,
+            intermediate_size=8,
+            id2label=dict(enumerate(labels)),
+            label2id={label: i for i, label in enumerate(labels)},
+        )
+        model = BertForTokenClassification(config).eval()
+        with torch.no_grad():
+            model.classifier.weight.normal_(0, 5)
+        return TokenClassificationPipeline(model=model, tokenizer=tokenizer)
+
+    @require_torch
+    def test_aggregation_matches_pre_entities(self):
+        torch.manual_seed(0)
+        token_classifier = self.get_tiny_bert_pipeline()
+        sentence = "new yorker city is the biggest . new new york city is big , newer"
+
+        model_outputs = [token_classifier.forward(inputs) for inputs in token_classifier.preprocess(sentence)]
+        logits = model_outputs[0]["logits"][0].numpy()
+        scores = np.exp(logits) / np.exp(logits).sum(axis=-1, keepdims=True)
+        for aggregation_strategy in AggregationStrategy:
+            pre_entities = token_classifier.gather_pre_entities(
+                sentence,
+                model_outputs[0]["input_ids"][0].numpy(),
+                scores,
+                model_outputs[0]["offset_mapping"][0].numpy(),
+                model_outputs[0]["special_tokens_mask"][0].numpy(),
+                aggregation_strategy,
+            )
+            expected = [
+                entity
+                for entity in token_classifier.aggregate(pre_entities, aggregation_strategy)
+                if entity.get("entity", entity.get("entity_group")) != "O"
+            ]
+            outputs = token_classifier.postprocess(model_outputs, aggregation_strategy=aggregation_strategy)
+            self.assertGreater(len(outputs), 0)
+            self.assertEqual(nested_simplify(outputs), nested_simplify(expected))
+
+    @require_torch
+    def test_overlap_strategy_tokens(self):
+        torch.manual_seed(0)
+        # Without layers nor position embeddings, the predictions of a token don't depend on the chunk
+        token_classifier = self.get_tiny_bert_pipeline(num_hidden_layers=0)
+        with torch.no_grad():
+            token_classifier.model.bert.embeddings.position_embeddings.weight.zero_()
+        sentence = "new yorker city is the biggest . new new york city is big , newer new york"
+        expected = token_classifier(sentence, aggregation_strategy="first")
+
+        token_classifier.tokenizer.model_max_length = 8
+        for stride in [1, 2, 3]:
+            outputs = token_classifier(
+                sentence, aggregation_strategy="first", stride=stride, overlap_strategy="tokens"
+            )
+            self.assertEqual(nested_simplify(outputs), nested_simplify(expected))
+
+        with self.assertRaises(ValueError):
+            token_classifier(sentence, aggregation_strategy="first", stride=2, overlap_strategy="words")
+
     @require_tf
     def test_tf_only(self):
         model_name = "hf-internal-testing/tiny-random-bert-tf-only"  # This model only has a TensorFlow version
@@ -783,7 +863,7 @@ class TokenClassificationPipelineTests(unittest.TestCase):
         )
 
     @require_torch
-    def test_no_offset_tokenizer(self):
+    def test_slow_tokenizer_offsets(self):
         model_name = "hf-internal-testing/tiny-bert-for-token-classification"
         tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=False)
         token_classifier = pipeline(task="token-classification", model=model_name, tokenizer=tokenizer, framework="pt")
@@ -791,8 +871,8 @@ class TokenClassificationPipelineTests(unittest.TestCase):
         self.assertEqual(
             nested_simplify(outputs),
             [
-                {"entity": "I-MISC", "score": 0.115, "index": 1, "word": "this", "start": None, "end": None},
-                {"entity": "I-MISC", "score": 0.115, "index": 2, "word": "is", "start": None, "end": None},
+                {"entity": "I-MISC", "score": 0.115, "index": 1, "word": "this", "start": 0, "end": 4},
+                {"entity": "I-MISC", "score": 0.115, "index": 2, "word": "is", "start": 5, "end": 7},
             ],
         )
 
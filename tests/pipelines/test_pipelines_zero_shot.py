@@ -12,20 +12,40 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import os
+import tempfile
 import unittest
+from unittest.mock import patch
+
+import numpy as np
 
 from transformers import (
     MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING,
     TF_MODEL_FOR_SEQUENCE_CLASSIFICATION_MAPPING,
+    BertConfig,
+    BertTokenizer,
     Pipeline,
     ZeroShotClassificationPipeline,
     pipeline,
 )
-from transformers.testing_utils import is_pipeline_test, nested_simplify, require_tf, require_torch, slow
+from transformers.testing_utils import (
+    is_pipeline_test,
+    is_torch_available,
+    nested_simplify,
+    require_tf,
+    require_torch,
+    slow,
+)
 
 from .test_pipelines_common import ANY
 
 
+if is_torch_available():
+    import torch
+
+    from transformers import BertForSequenceClassification, BertModel
+
+
 # These 2 model types require different inputs than those of the usual text models.
 _TO_SKIP = {"LayoutLMv2Config", "LayoutLMv3Config"}
 
@@ -156,6 +176,103 @@ class ZeroShotClassificationPipelineTests(unittest.TestCase):
             "Who are you voting for in 2020?" * 100, candidate_labels=["politics", "public health", "science"]
         )
 
+    def get_tiny_bert(self, model_class):
+        vocab_tokens = [
+            "[UNK]",
+            "[CLS]",
+            "[SEP]",
+            "[PAD]",
+            "this",
+            "example",
+            "is",
+            "about",
+            "sports",
+            "politics",
+            ".",
+        ]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file, model_max_length=16)
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=8,
+            label2id={"contradiction": 0, "neutral": 1, "entailment": 2},
+            id2label={0: "contradiction", 1: "neutral", 2: "entailment"},
+        )
+        return model_class(config).eval(), tokenizer
+
+    @require_torch
+    def test_cached_hypotheses(self):
+        model, tokenizer = self.get_tiny_bert(BertForSequenceClassification)
+        zero_shot_classifier = ZeroShotClassificationPipeline(model=model, tokenizer=tokenizer)
+        # Long enough to be truncated
+        sequences = ["this is about sports", "politics . " * 10]
+        candidate_labels = ["sports", "politics", "sports politics"]
+
+        for sequence in sequences:
+            inputs = list(zero_shot_classifier.preprocess(sequence, candidate_labels=candidate_labels))
+            expected = [
+                zero_shot_classifier._parse_and_tokenize([[sequence, f"This example is {label}."]])
+                for label in candidate_labels
+            ]
+            for model_input, expected_input in zip(inputs, expected):
+                for key in expected_input:
+                    self.assertEqual(model_input[key].tolist(), expected_input[key].tolist())
+        self.assertTrue(zero_shot_classifier._can_build_pairs)
+        self.assertEqual(
+            list(zero_shot_classifier._hypotheses_cache),
+            [
+                (
+                    "ids",
+                    "This example is {}.",
+                    ("This example is sports.", "This example is politics.", "This example is sports politics."),
+                )
+            ],
+        )
+
+        outputs = zero_shot_classifier(sequences, candidate_labels=candidate_labels, batch_size=3)
+        self.assertEqual(
+            nested_simplify(outputs),
+            nested_simplify(
+                [zero_shot_classifier(sequence, candidate_labels=candidate_labels) for sequence in sequences]
+            ),
+        )
+
+    @require_torch
+    def test_dual_encoder(self):
+        model, tokenizer = self.get_tiny_bert(BertModel)
+        zero_shot_classifier = ZeroShotClassificationPipeline(model=model, tokenizer=tokenizer)
+        candidate_labels = ["sports", "politics"]
+        outputs = zero_shot_classifier(
+            ["this is about sports", "politics ."], candidate_labels=candidate_labels, multi_label=True
+        )
+
+        def embed(texts):
+            inputs = tokenizer(texts, padding=True, return_tensors="pt")
+            with torch.no_grad():
+                hidden_states = model(**inputs).last_hidden_state.numpy()
+            mask = inputs["attention_mask"].numpy()[..., None]
+            embeddings = (hidden_states * mask).sum(1) / mask.sum(1)
+            return embeddings / np.linalg.norm(embeddings, axis=-1, keepdims=True)
+
+        hypotheses = embed(["This example is sports.", "This example is politics."])
+        for output, sequence in zip(outputs, ["this is about sports", "politics ."]):
+            similarities = (embed([sequence]) @ hypotheses.T)[0]
+            self.assertEqual(output["sequence"], sequence)
+            self.assertEqual(output["labels"], [candidate_labels[i] for i in reversed(similarities.argsort())])
+            self.assertEqual(nested_simplify(output["scores"]), nested_simplify(sorted(similarities.tolist())[::-1]))
+
+        # The hypotheses are only embedded once
+        with patch.object(zero_shot_classifier, "forward", wraps=zero_shot_classifier.forward) as forward:
+            outputs = zero_shot_classifier("this is about sports", candidate_labels=candidate_labels)
+        self.assertEqual(forward.call_count, 1)
+        self.assertAlmostEqual(sum(outputs["scores"]), 1.0, places=5)
+
     @require_torch
     def test_small_model_pt(self):
         zero_shot_classifier = pipeline(
@@ -74,6 +74,9 @@ if is_torch_available():
         BertConfig,
         BertModel,
         CLIPTextModel,
+        GPT2Config,
+        GPT2LMHeadModel,
+        GPT2Model,
         PreTrainedModel,
         T5Config,
         T5ForConditionalGeneration,
@@ -868,6 +871,44 @@ class ModelUtilsTest(TestCasePlus):
         for p1, p2 in zip(safetensors_model.parameters(), pytorch_model.parameters()):
             self.assertTrue(torch.allclose(p1, p2))
 
+    @require_accelerate
+    @require_safetensors
+    def test_from_pretrained_layer_streaming(self):
+        config = GPT2Config(n_layer=3, n_embd=32, n_head=4, vocab_size=99, n_positions=64)
+        model = GPT2LMHeadModel(config).eval()
+        input_ids = torch.randint(0, config.vocab_size, (2, 8))
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            model.save_pretrained(tmp_dir, safe_serialization=True, max_shard_size="20kB")
+            self.assertTrue(os.path.isfile(os.path.join(tmp_dir, SAFE_WEIGHTS_INDEX_NAME)))
+
+            streamed_model = GPT2LMHeadModel.from_pretrained(tmp_dir, layer_streaming=True)
+            # the blocks stay on the meta device outside of their forward pass
+            for name, param in streamed_model.named_parameters():
+                self.assertEqual(param.device.type, "meta" if name.startswith("transformer.h.") else "cpu")
+            self.assertIs(streamed_model.lm_head.weight, streamed_model.transformer.wte.weight)
+
+            with torch.no_grad():
+                self.assertTrue(torch.allclose(model(input_ids).logits, streamed_model(input_ids).logits, atol=1e-6))
+                # second pass, starting from the prefetched first block
+                self.assertTrue(torch.allclose(model(input_ids).logits, streamed_model(input_ids).logits, atol=1e-6))
+            self.assertTrue(all(param.device.type == "meta" for param in streamed_model.transformer.h.parameters()))
+
+            # base model from a checkpoint with a head
+            base_model = GPT2Model.from_pretrained(tmp_dir, layer_streaming=True)
+            with torch.no_grad():
+                self.assertTrue(
+                    torch.allclose(
+                        model.transformer(input_ids).last_hidden_state,
+                        base_model(input_ids).last_hidden_state,
+                        atol=1e-6,
+                    )
+                )
+            streamed_model._layer_streamer.detach()
+            base_model._layer_streamer.detach()
+
+            with self.assertRaises(ValueError):
+                GPT2LMHeadModel.from_pretrained(tmp_dir, layer_streaming=True, use_safetensors=False)
+
     def test_base_model_to_head_model_load(self):
         base_model = BaseModel(PretrainedConfig())
         with tempfile.TemporaryDirectory() as tmp_dir:
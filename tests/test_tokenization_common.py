@@ -3049,7 +3049,7 @@ class TokenizerTesterMixin:
                     # "return_attention_mask": True,  # Use the defaults for each tokenizers
                     "return_overflowing_tokens": False,
                     "return_special_tokens_mask": True,
-                    "return_offsets_mapping": False,  # Not implemented in python tokenizers
+                    "return_offsets_mapping": False,  # Computed differently by python tokenizers
                     # "add_special_tokens": False,
                 }
                 batch_kwargs = {
@@ -3058,7 +3058,7 @@ class TokenizerTesterMixin:
                     # "return_attention_mask": True,  # Use the defaults for each tokenizers
                     "return_overflowing_tokens": False,
                     "return_special_tokens_mask": True,
-                    "return_offsets_mapping": False,  # Not implemented in python tokenizers
+                    "return_offsets_mapping": False,  # Computed differently by python tokenizers
                     # "add_special_tokens": False,
                 }
                 # Test encode_plus for pretokenized inputs
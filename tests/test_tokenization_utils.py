@@ -272,6 +272,30 @@ class TrieTest(unittest.TestCase):
         trie.add("CD")
         self.assertEqual(trie.split("ABCD"), ["ABC", "D"])
 
+    def test_trie_failed_partial_match(self):
+        # "B" is found inside the failed partial match "AB" of "ABD"
+        trie = Trie()
+        trie.add("B")
+        trie.add("ABD")
+        self.assertEqual(trie.split("ABCD"), ["A", "B", "CD"])
+        self.assertEqual(trie.split("ABABD"), ["A", "B", "ABD"])
+
+    def test_trie_add_after_split(self):
+        trie = Trie()
+        trie.add("[CLS]")
+        self.assertEqual(trie.split("[CLS] extra_id_100"), ["[CLS]", " extra_id_100"])
+        trie.add("extra_id_100")
+        self.assertEqual(trie.split("[CLS] extra_id_100"), ["[CLS]", " ", "extra_id_100"])
+
+    def test_trie_large_vocabulary(self):
+        trie = Trie()
+        for i in range(10000):
+            trie.add(f"<tok_{i}>")
+        self.assertEqual(
+            trie.split("a<tok_1><tok_12> <tok_9999><tok_10000>"),
+            ["a", "<tok_1>", "<tok_12>", " ", "<tok_9999>", "<tok_10000>"],
+        )
+
     def test_cut_text_hardening(self):
         # Even if the offsets are wrong, we necessarily output correct string
         # parts.
@@ -0,0 +1,107 @@
+# coding=utf-8
+# Copyright 2023 HuggingFace Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from transformers import BertTokenizer, BertTokenizerFast, TokenizationCache
+from transformers.testing_utils import require_tokenizers, require_torch
+from transformers.utils import to_py_obj
+
+
+class TokenizationCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdirname = tempfile.mkdtemp()
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        self.vocab_file = os.path.join(self.tmpdirname, "vocab.txt")
+        with open(self.vocab_file, "w", encoding="utf-8") as vocab_writer:
+            vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+        self.cache_dir = os.path.join(self.tmpdirname, "cache")
+        self.texts = ["unwanted running", "want", "", "running unwanted want wanted", "want"]
+
+    def check_cache(self, tokenizer):
+        kwargs = {"truncation": True, "max_length": 6, "return_special_tokens_mask": True}
+        expected = tokenizer(self.texts, **kwargs)
+
+        with TokenizationCache(tokenizer, self.cache_dir) as cache:
+            self.assertEqual(cache(self.texts, **kwargs).data, expected.data)
+
+        # All the texts are read from disk by a new cache
+        expected_single = tokenizer(self.texts[1], **kwargs)
+        cache = TokenizationCache(tokenizer, self.cache_dir)
+        with mock.patch.object(tokenizer, "_batch_encode_plus", side_effect=AssertionError("cache miss")):
+            self.assertEqual(cache(self.texts, **kwargs).data, expected.data)
+            self.assertEqual(cache(self.texts[1], **kwargs).data, expected_single.data)
+
+        # Other arguments or a modified tokenizer don't use the same encodings
+        expected = tokenizer(self.texts, text_pair=self.texts[::-1])
+        self.assertEqual(cache(self.texts, text_pair=self.texts[::-1]).data, expected.data)
+        tokenizer.add_tokens(["running"])
+        self.assertEqual(cache(self.texts, **kwargs).data, tokenizer(self.texts, **kwargs).data)
+        cache.flush()
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+
+        cache.clear()
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+    def test_cache_slow_tokenizer(self):
+        self.check_cache(BertTokenizer(self.vocab_file))
+
+    @require_tokenizers
+    def test_cache_fast_tokenizer(self):
+        self.check_cache(BertTokenizerFast(self.vocab_file))
+
+    @require_tokenizers
+    def test_offsets_and_length(self):
+        tokenizer = BertTokenizerFast(self.vocab_file)
+        kwargs = {"return_offsets_mapping": True, "return_length": True}
+        with TokenizationCache(tokenizer, self.cache_dir) as cache:
+            cache(self.texts, **kwargs)
+        self.assertEqual(
+            TokenizationCache(tokenizer, self.cache_dir)(self.texts, **kwargs).data,
+            tokenizer(self.texts, **kwargs).data,
+        )
+
+    @require_torch
+    def test_padding_and_tensors(self):
+        tokenizer = BertTokenizer(self.vocab_file)
+        with TokenizationCache(tokenizer, self.cache_dir) as cache:
+            cache(self.texts)
+
+            for kwargs in [
+                {"padding": True},
+                {"padding": "max_length", "max_length": 12, "return_tensors": "pt"},
+                {"padding": True, "pad_to_multiple_of": 4, "return_tensors": "np"},
+            ]:
+                batch = cache(self.texts, **kwargs)
+                expected = tokenizer(self.texts, **kwargs)
+                self.assertEqual(list(batch.keys()), list(expected.keys()))
+                for key in expected:
+                    self.assertEqual(type(batch[key]), type(expected[key]))
+                    self.assertEqual(to_py_obj(batch[key]), to_py_obj(expected[key]))
+
+            batch = cache(self.texts[0], return_tensors="pt")
+            self.assertEqual(
+                batch["input_ids"].tolist(), tokenizer(self.texts[0], return_tensors="pt")["input_ids"].tolist()
+            )
+
+        # Padding does not change the fingerprint, `max_length` does as it is also used for truncation
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+    def test_overflowing_tokens_not_supported(self):
+        cache = TokenizationCache(BertTokenizer(self.vocab_file), self.cache_dir)
+        with self.assertRaises(ValueError):
+            cache(self.texts, max_length=3, truncation=True, return_overflowing_tokens=True)
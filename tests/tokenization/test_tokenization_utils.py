@@ -29,12 +29,14 @@ from transformers import (
     BertTokenizerFast,
     PreTrainedTokenizer,
     PreTrainedTokenizerFast,
+    RaggedArray,
     TensorType,
     TokenSpan,
     is_tokenizers_available,
 )
 from transformers.models.gpt2.tokenization_gpt2 import GPT2Tokenizer
 from transformers.testing_utils import CaptureStderr, require_flax, require_tf, require_tokenizers, require_torch, slow
+from transformers.tokenization_utils import LRUCache
 
 
 if is_tokenizers_available():
@@ -258,6 +260,114 @@ class TokenizerUtilsTest(unittest.TestCase):
         self.assertTrue(isinstance(batch["input_ids"], torch.Tensor))
         self.assertEqual(batch["input_ids"].tolist(), [[0, 1, 2, tokenizer.pad_token_id], [0, 1, 2, 3]])
 
+    @require_torch
+    def test_padding_batched_matches_per_example(self):
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+
+        texts = ["unwanted running", "want", "", "running unwanted want wanted"]
+        features = [tokenizer(text, return_special_tokens_mask=True) for text in texts]
+        for i, feature in enumerate(features):
+            feature["labels"] = i
+
+        for padding_side in ["right", "left"]:
+            tokenizer.padding_side = padding_side
+            for kwargs in [{}, {"pad_to_multiple_of": 8}, {"padding": "max_length", "max_length": 12}]:
+                for return_tensors in ["np", "pt"]:
+                    batch = tokenizer.pad(features, return_tensors=return_tensors, **kwargs)
+                    # The per-example path is the one used for Python lists
+                    expected = BatchEncoding(tokenizer.pad(features, **kwargs).data, tensor_type=return_tensors)
+                    self.assertEqual(list(batch.keys()), list(expected.keys()))
+                    for key in expected:
+                        self.assertEqual(type(batch[key]), type(expected[key]))
+                        self.assertEqual(batch[key].dtype, expected[key].dtype)
+                        self.assertEqual(batch[key].tolist(), expected[key].tolist())
+
+    def test_ragged_array(self):
+        ragged = RaggedArray.from_sequences([[1, 2, 3], [], [4]])
+        self.assertEqual(len(ragged), 3)
+        self.assertEqual(ragged.lengths.tolist(), [3, 0, 1])
+        self.assertEqual(ragged[0].tolist(), [1, 2, 3])
+        self.assertEqual(ragged[-1].tolist(), [4])
+        self.assertEqual(ragged[1:].tolist(), [[], [4]])
+        self.assertEqual(ragged, [[1, 2, 3], [], [4]])
+        self.assertEqual(ragged.to_padded(0).tolist(), [[1, 2, 3], [0, 0, 0], [4, 0, 0]])
+        self.assertEqual(ragged.to_padded(-1, "left", 4).tolist(), [[-1, 1, 2, 3], [-1, -1, -1, -1], [-1, -1, -1, 4]])
+
+        offsets = RaggedArray.from_sequences([[(0, 1), (1, 3)], [(0, 2)]])
+        self.assertEqual(offsets.to_padded().tolist(), [[[0, 1], [1, 3]], [[0, 2], [0, 0]]])
+
+        self.assertEqual(RaggedArray.concatenate([ragged[1:], ragged[:1]]), [[], [4], [1, 2, 3]])
+
+        batch = BatchEncoding({"input_ids": ragged[2:]}, tensor_type="np")
+        self.assertEqual(batch["input_ids"].tolist(), [[4]])
+        with self.assertRaises(ValueError):
+            BatchEncoding({"input_ids": ragged}, tensor_type="pt")
+
+    @require_tokenizers
+    @require_torch
+    def test_batch_encode_plus_return_ragged(self):
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizerFast(vocab_file)
+
+        texts = ["unwanted running", "want", "", "running unwanted want wanted"]
+        expected = tokenizer(texts, return_special_tokens_mask=True)
+        batch = tokenizer(texts, return_special_tokens_mask=True, return_ragged=True)
+        self.assertEqual(list(batch.keys()), list(expected.keys()))
+        for key in expected:
+            self.assertIsInstance(batch[key], RaggedArray)
+            self.assertEqual(batch[key].tolist(), expected[key])
+        self.assertEqual(len(batch.encodings), len(texts))
+
+        padded = tokenizer.pad(batch, return_tensors="pt")
+        expected_padded = tokenizer.pad(expected, return_tensors="pt")
+        for key in expected_padded:
+            self.assertEqual(padded[key].tolist(), expected_padded[key].tolist())
+
+        # tensors are built from the flat arrays, overflowing tokens included
+        kwargs = {"max_length": 4, "truncation": True, "padding": True, "return_overflowing_tokens": True}
+        batch = tokenizer(texts, return_tensors="pt", return_offsets_mapping=True, **kwargs)
+        expected = tokenizer(texts, return_offsets_mapping=True, **kwargs)
+        self.assertEqual(list(batch.keys()), list(expected.keys()))
+        for key in expected:
+            self.assertEqual(
+                batch[key].tolist(),
+                [list(map(list, x)) for x in expected[key]] if key == "offset_mapping" else expected[key],
+            )
+
+    @require_tokenizers
+    def test_batch_encode_plus_num_threads(self):
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizerFast(vocab_file)
+
+        texts = ["unwanted running", "want", "", "running unwanted want wanted", "un", "wanted running"] * 3
+        for kwargs in [
+            {"return_length": True},
+            # the chunks are padded to the longest sequence of the whole batch
+            {"padding": True, "pad_to_multiple_of": 4},
+            {"padding": "max_length", "max_length": 12, "return_offsets_mapping": True},
+            {"max_length": 4, "truncation": True, "padding": True, "return_overflowing_tokens": True},
+            {"max_length": 4, "truncation": True, "return_overflowing_tokens": True, "return_ragged": True},
+        ]:
+            expected = tokenizer(texts, **kwargs)
+            batch = tokenizer(texts, num_threads=2, **kwargs)
+            self.assertEqual(list(batch.keys()), list(expected.keys()))
+            for key in expected:
+                self.assertEqual(batch[key], expected[key])
+            self.assertEqual([e.ids for e in batch.encodings], [e.ids for e in expected.encodings])
+
     @require_tf
     def test_padding_accepts_tensors_tf(self):
         import tensorflow as tf
@@ -283,3 +393,125 @@ class TokenizerUtilsTest(unittest.TestCase):
         with tempfile.TemporaryDirectory() as tmpdirname:
             bert_tokenizer.save(os.path.join(tmpdirname, "tokenizer.json"))
             PreTrainedTokenizerFast(tokenizer_file=os.path.join(tmpdirname, "tokenizer.json"))
+
+    def test_batch_encode_plus_num_proc(self):
+        vocab_tokens = [
+            "[UNK]",
+            "[CLS]",
+            "[SEP]",
+            "[PAD]",
+            "[MASK]",
+            "want",
+            "##want",
+            "##ed",
+            "wa",
+            "un",
+            "runn",
+            "##ing",
+        ]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+
+        texts = ["UNwantéd,running", "unwanted", "running wa", "want"] * 5
+        pairs = list(zip(texts, reversed(texts)))
+        for inputs in [texts, pairs]:
+            expected = tokenizer(inputs, padding=True)
+            self.assertEqual(tokenizer(inputs, padding=True, num_proc=2).data, expected.data)
+
+        # the workers are updated when tokens are added
+        tokenizer.add_tokens(["unwanted"])
+        self.assertEqual(tokenizer(texts, num_proc=2).data, tokenizer(texts).data)
+        tokenizer._shutdown_process_pools()
+
+    def test_tokenize_special_tokens_cache(self):
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##ed", "un", "##want"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+
+        self.assertEqual(tokenizer.tokenize("UNwanted [MASK]"), ["un", "##want", "##ed", "[MASK]"])
+
+        # the cached structures are reset when tokens are added
+        tokenizer.add_tokens(["<New>"])
+        self.assertEqual(tokenizer.tokenize("want<New>"), ["want", "<new>"])
+
+        # and when the special tokens or the lowercasing change
+        tokenizer.add_special_tokens({"additional_special_tokens": ["<EXTRA>"]})
+        self.assertEqual(tokenizer.tokenize("WANT<EXTRA>"), ["want", "<EXTRA>"])
+        tokenizer.basic_tokenizer.do_lower_case = False
+        self.assertEqual(tokenizer.tokenize("WANT<EXTRA>"), ["[UNK]", "<EXTRA>"])
+
+    def test_lru_cache(self):
+        cache = LRUCache(max_size=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache["a"], 1)
+        cache["c"] = 3
+        self.assertEqual(list(cache.keys()), ["a", "c"])
+
+        cache = pickle.loads(pickle.dumps(cache))
+        self.assertEqual(cache.max_size, 2)
+        cache["d"] = 4
+        self.assertEqual(dict(cache), {"c": 3, "d": 4})
+
+    def test_batch_decode_matches_decode(self):
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        vocab_tokens += [",", ".", "'", "s"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizers = [BertTokenizer(vocab_file)]
+            if is_tokenizers_available():
+                tokenizers.append(BertTokenizerFast(vocab_file))
+
+        sequences = [[1, 8, 6, 7, 12, 9, 10, 2, 3, 3], [5, 13, 14, 11, 4, 5], [], [2]]
+        for tokenizer in tokenizers:
+            for kwargs in [{}, {"skip_special_tokens": True}, {"clean_up_tokenization_spaces": False}]:
+                expected = [tokenizer.decode(ids, **kwargs) for ids in sequences]
+                self.assertEqual(tokenizer.batch_decode(sequences, **kwargs), expected)
+                self.assertEqual(tokenizer.batch_decode([np.array(ids) for ids in sequences], **kwargs), expected)
+
+            # added and special tokens are taken into account once registered
+            tokenizer.add_tokens(["<new>"])
+            tokenizer.add_special_tokens({"additional_special_tokens": ["<extra>"]})
+            ids = np.array([[5, len(vocab_tokens), 6, len(vocab_tokens) + 1], [1, 5, 2, 3]])
+            for skip_special_tokens in [True, False]:
+                self.assertEqual(
+                    tokenizer.batch_decode(ids, skip_special_tokens=skip_special_tokens),
+                    [tokenizer.decode(row, skip_special_tokens=skip_special_tokens) for row in ids],
+                )
+
+    @require_tokenizers
+    def test_offsets_mapping_slow_tokenizer(self):
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        vocab_tokens += ["cafe", "##s", ",", "!"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer_p = BertTokenizer(vocab_file)
+            tokenizer_r = BertTokenizerFast(vocab_file)
+
+        # accents, punctuation and unknown words
+        texts = ["UNwantéd,running", "  Cafés  xyz wanted!", "two unknown words", ""]
+        for inputs, kwargs in [
+            (texts[0], {}),
+            (texts, {"padding": True}),
+            (list(zip(texts, texts[::-1])), {"truncation": True, "max_length": 12}),
+            ([text.split() for text in texts[:3]], {"is_split_into_words": True}),
+        ]:
+            output_p = tokenizer_p(inputs, return_offsets_mapping=True, **kwargs)
+            output_r = tokenizer_r(inputs, return_offsets_mapping=True, **kwargs)
+            self.assertEqual(output_p.data, output_r.data)
+            for i in range(len(output_p["input_ids"]) if isinstance(inputs, list) else 1):
+                self.assertEqual(output_p.word_ids(i), output_r.word_ids(i))
+                self.assertEqual(output_p.sequence_ids(i), output_r.sequence_ids(i))
+
+        with self.assertRaises(ValueError):
+            tokenizer_p([[5, 6]], return_offsets_mapping=True)
@@ -26,6 +26,7 @@ from transformers import (
     DataCollatorForTokenClassification,
     DataCollatorForWholeWordMask,
     DataCollatorWithPadding,
+    PackedTextIterableDataset,
     default_data_collator,
     is_tf_available,
     is_torch_available,
@@ -360,6 +361,72 @@ class DataCollatorIntegrationTest(unittest.TestCase):
         self.assertEqual(batch["sentence_order_label"].shape, torch.Size((2,)))
 
 
+@require_torch
+class PackedTextIterableDatasetTest(unittest.TestCase):
+    def setUp(self):
+        self.tmpdirname = tempfile.mkdtemp()
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "a", "b", "c", "d"]
+        self.vocab_file = os.path.join(self.tmpdirname, "vocab.txt")
+        with open(self.vocab_file, "w", encoding="utf-8") as vocab_writer:
+            vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+        self.text_files = [os.path.join(self.tmpdirname, "text_0.txt"), os.path.join(self.tmpdirname, "text_1.txt")]
+        with open(self.text_files[0], "w", encoding="utf-8") as f:
+            f.write("a b c\nd d\n\n\nc\n")
+        with open(self.text_files[1], "w", encoding="utf-8") as f:
+            f.write("a a a a a a a a\n \nb\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdirname)
+
+    def test_packing(self):
+        tokenizer = BertTokenizer(self.vocab_file)
+        # [SEP] (2) is used as separator
+        dataset = PackedTextIterableDataset(tokenizer, self.text_files, block_size=4, return_position_ids=True)
+        examples = list(dataset)
+        self.assertEqual(
+            [example["input_ids"].tolist() for example in examples],
+            [[5, 6, 7, 2], [8, 8, 2, 7], [2, 5, 5, 5], [5, 5, 5, 5], [5, 2, 6, 2]],
+        )
+        self.assertEqual(
+            [example["position_ids"].tolist() for example in examples],
+            [[0, 1, 2, 3], [0, 1, 2, 0], [0, 0, 1, 2], [0, 1, 2, 3], [0, 1, 0, 1]],
+        )
+
+        # Each batch of lines is tokenized separately
+        dataset = PackedTextIterableDataset(tokenizer, self.text_files, block_size=4, batch_size=1)
+        self.assertEqual(
+            [example["input_ids"].tolist() for example in dataset],
+            [[5, 6, 7, 2], [8, 8, 2, 7], [2, 5, 5, 5], [5, 5, 5, 5], [5, 2, 6, 2]],
+        )
+        self.assertEqual(list(examples[0].keys()), ["input_ids", "position_ids"])
+        self.assertEqual(list(next(iter(dataset)).keys()), ["input_ids"])
+
+    def test_documents_separated_by_empty_lines(self):
+        tokenizer = BertTokenizer(self.vocab_file)
+        dataset = PackedTextIterableDataset(
+            tokenizer, self.text_files, block_size=3, line_by_line=False, batch_size=1, return_position_ids=True
+        )
+        examples = list(dataset)
+        self.assertEqual(
+            [example["input_ids"].tolist() for example in examples],
+            [[5, 6, 7], [8, 8, 2], [7, 2, 5], [5, 5, 5], [5, 5, 5], [5, 2, 6]],
+        )
+        self.assertEqual(
+            [example["position_ids"].tolist() for example in examples],
+            [[0, 1, 2], [0, 1, 2], [0, 1, 0], [0, 1, 2], [0, 1, 2], [0, 1, 0]],
+        )
+        # The last token, which doesn't fill a whole example, is dropped
+        self.assertEqual(sum(len(example["input_ids"]) for example in examples), 18)
+
+    def test_invalid_arguments(self):
+        tokenizer = BertTokenizer(self.vocab_file)
+        with self.assertRaises(ValueError):
+            PackedTextIterableDataset(tokenizer, os.path.join(self.tmpdirname, "missing.txt"), block_size=4)
+        with self.assertRaises(ValueError):
+            PackedTextIterableDataset(tokenizer, self.text_files, block_size=0)
+
+
 @require_tf
 class TFDataCollatorIntegrationTest(unittest.TestCase):
     def setUp(self):
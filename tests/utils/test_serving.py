@@ -0,0 +1,102 @@
+# coding=utf-8
+# Copyright 2023 The HuggingFace Team. All rights reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+import os
+import tempfile
+import threading
+import unittest
+
+from transformers import BertTokenizer, TextClassificationPipeline, pipeline
+from transformers.commands.serving import PipelineRequestBatcher
+from transformers.testing_utils import nested_simplify, require_torch
+
+
+class RecordingPipeline(TextClassificationPipeline):
+    """Records the inputs of its calls, the first call waiting until `release` is set."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.calls = []
+        self.release = threading.Event()
+
+    def __call__(self, inputs, **kwargs):
+        self.release.wait()
+        self.calls.append(list(inputs))
+        if "boom" in inputs:
+            raise ValueError("boom")
+        return super().__call__(inputs, **kwargs)
+
+
+@require_torch
+class PipelineRequestBatcherTest(unittest.TestCase):
+    def setUp(self):
+        from transformers import BertConfig, BertForSequenceClassification
+
+        vocab_tokens = ["[UNK]", "[CLS]", "[SEP]", "[PAD]", "[MASK]", "want", "##want", "##ed", "un", "runn", "##ing"]
+        with tempfile.TemporaryDirectory() as tmpdirname:
+            vocab_file = os.path.join(tmpdirname, "vocab.txt")
+            with open(vocab_file, "w", encoding="utf-8") as vocab_writer:
+                vocab_writer.write("".join([x + "\n" for x in vocab_tokens]))
+            tokenizer = BertTokenizer(vocab_file)
+        config = BertConfig(
+            vocab_size=len(vocab_tokens),
+            hidden_size=8,
+            num_hidden_layers=1,
+            num_attention_heads=2,
+            intermediate_size=8,
+        )
+        self.model = BertForSequenceClassification(config).eval()
+        self.tokenizer = tokenizer
+        self.classifier = pipeline("text-classification", model=self.model, tokenizer=tokenizer)
+
+    def test_batched_requests(self):
+        pipe = RecordingPipeline(model=self.model, tokenizer=self.tokenizer)
+        batcher = PipelineRequestBatcher(pipe, max_batch_size=3, max_wait=1)
+        requests = ["want", ["unwanted running", "running"], "wanted", "runn"]
+        futures = [batcher.submit(inputs) for inputs in requests]
+        pipe.release.set()
+        outputs = [future.result(timeout=10) for future in futures]
+        batcher.close()
+
+        # The first three requests fill a batch, the last one is run after `max_wait`
+        self.assertEqual(pipe.calls, [["want", "unwanted running", "running", "wanted"], ["runn"]])
+        expected = [self.classifier(inputs) for inputs in requests]
+        self.assertEqual(nested_simplify(outputs), nested_simplify(expected))
+
+    def test_max_batch_tokens(self):
+        pipe = RecordingPipeline(model=self.model, tokenizer=self.tokenizer)
+        # "want" is 3 tokens long and "unwanted running" 7 with the special tokens
+        batcher = PipelineRequestBatcher(pipe, max_batch_size=8, max_wait=1, max_batch_tokens=14)
+        futures = [batcher.submit(inputs) for inputs in ["want", "want", "unwanted running", "want"]]
+        pipe.release.set()
+        for future in futures:
+            future.result(timeout=10)
+        batcher.close()
+
+        self.assertEqual(pipe.calls, [["want", "want"], ["unwanted running", "want"]])
+
+    def test_failed_request(self):
+        pipe = RecordingPipeline(model=self.model, tokenizer=self.tokenizer)
+        batcher = PipelineRequestBatcher(pipe, max_batch_size=3, max_wait=1)
+        futures = [batcher.submit(inputs) for inputs in ["want", "boom", "runn"]]
+        pipe.release.set()
+
+        # Only the faulty request fails, the others are run again one by one
+        self.assertEqual(nested_simplify(futures[0].result(timeout=10)), nested_simplify(self.classifier("want")))
+        with self.assertRaises(ValueError):
+            futures[1].result(timeout=10)
+        self.assertEqual(nested_simplify(futures[2].result(timeout=10)), nested_simplify(self.classifier("runn")))
+        batcher.close()
+        self.assertEqual(pipe.calls, [["want", "boom", "runn"], ["want"], ["boom"], ["runn"]])